@@ -1,13 +1,54 @@
 import streamlit as st
-import numpy as np
-import joblib
+import contextlib
+import importlib
 import os
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime
+from types import MappingProxyType
 import math
+import sys
+import time
+
+import numpy as np
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access.
+
+    pandas and Plotly Express cost hundreds of milliseconds to import; static
+    pages never touch them, so cold starts do not pay for them up front. The
+    proxy is deliberately not registered in sys.modules, so introspection
+    that walks sys.modules (inspect.stack, warnings) cannot trigger the import.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        setattr(self, attr, value)  # later lookups skip __getattr__
+        return value
+
+
+pd = LazyModule("pandas")
+px = LazyModule("plotly.express")
+go = LazyModule("plotly.graph_objects")
+
+# Make the project root importable so the app can use the shared `src` package
+PROJECT_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.agronomy import (
+    KB, CROP_NUTRIENT_IMPACT, CROP_REQUIREMENTS, CROP_SEASONS, SOIL_NPK_BENCHMARKS,
+    get_reduction_plan, recommend_additions, get_health_grade,
+    suggest_rotation, get_current_season, rank_crop_suitability,
+)
+from src.history_store import HistoryStore, DEFAULT_DB_PATH
+from src.inference import top_crops
+from src.model_cache import ModelCache
+from src.model_registry import LiveModel
+from src.timeseries import FieldSeries
+from src import profiling, telemetry
 
 # ─── Page Configuration ──────────────────────────────────────────────────────
 st.set_page_config(
@@ -257,540 +298,340 @@ footer {visibility: hidden;}
 """, unsafe_allow_html=True)
 
 
-# ─── Crop Knowledge Base ─────────────────────────────────────────────────────
-# Nutrient impact: how much a crop depletes (negative) or adds (positive) each nutrient
-CROP_NUTRIENT_IMPACT = {
-    'Rice':      {'N': -40, 'P': -15, 'K': -20, 'family': 'cereal',    'emoji': '🌾'},
-    'Wheat':     {'N': -35, 'P': -18, 'K': -15, 'family': 'cereal',    'emoji': '🌿'},
-    'Corn':      {'N': -50, 'P': -20, 'K': -30, 'family': 'cereal',    'emoji': '🌽'},
-    'Barley':    {'N': -25, 'P': -10, 'K': -12, 'family': 'cereal',    'emoji': '🌾'},
-    'Soybean':   {'N': +20, 'P': -10, 'K': -15, 'family': 'legume',    'emoji': '🫘'},
-    'Cotton':    {'N': -30, 'P': -25, 'K': -35, 'family': 'cash_crop', 'emoji': '🧶'},
-    'Sugarcane': {'N': -60, 'P': -25, 'K': -40, 'family': 'grass',     'emoji': '🎋'},
-    'Tomato':    {'N': -35, 'P': -30, 'K': -45, 'family': 'solanaceae', 'emoji': '🍅'},
-    'Potato':    {'N': -25, 'P': -20, 'K': -40, 'family': 'solanaceae', 'emoji': '🥔'},
-    'Onion':     {'N': -20, 'P': -15, 'K': -30, 'family': 'allium',    'emoji': '🧅'},
-}
+# ─── Load Model ──────────────────────────────────────────────────────────────
+# The served bundle comes from the model registry (src/model_registry.py):
+# `python -m src.model_registry activate <version>` hot-swaps it within a
+# second, without a restart. Without an active version the first bundle found
+# on the legacy paths is served. The LiveModel is a shared resource and the
+# bundle is read-only. joblib (and scikit-learn, pulled in by unpickling) load
+# on first use, so pages that do not need the model never import them.
+#
+# Regional / cooperative models are opened with `?tenant=<id>` and served from
+# a memory-capped LRU cache of bundles under NPK_TENANT_MODELS (see
+# src/model_cache.py), shared by every session in the process.
+# NPK_MODEL_COMPACT=uint8 (or float16) stores their forests compacted.
+MODEL_REGISTRY_DIR = os.environ.get("NPK_MODEL_REGISTRY", os.path.join(PROJECT_ROOT, 'models', 'registry'))
+TENANT_MODELS_DIR = os.environ.get("NPK_TENANT_MODELS", os.path.join(PROJECT_ROOT, 'models', 'tenants'))
+MODEL_CACHE_MB = float(os.environ.get("NPK_MODEL_CACHE_MB", "512"))
+MODEL_COMPACT = os.environ.get("NPK_MODEL_COMPACT") or None
+
+
+def _check_bundle(model_data):
+    # Scoring indexes knowledge-base arrays by label-encoder id
+    KB.check_classes(model_data['label_encoder'].classes_)
+
+
+@st.cache_resource(show_spinner=False)
+def get_live_model():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    candidates = [
+        os.path.join(PROJECT_ROOT, 'models', 'npk_crop_model.pkl'),
+        os.path.join(script_dir, 'models', 'npk_crop_model.pkl'),
+        os.path.normpath(os.path.join(script_dir, '..', 'ml', 'models', 'npk_crop_model.pkl')),
+    ]
+    fallback = next((p for p in candidates if os.path.exists(p)), None)
+    return LiveModel(MODEL_REGISTRY_DIR, fallback_path=fallback, validate=_check_bundle)
+
+
+@st.cache_resource(show_spinner=False)
+def get_model_cache():
+    return ModelCache(TENANT_MODELS_DIR, max_bytes=int(MODEL_CACHE_MB * 2 ** 20), validate=_check_bundle,
+                      compact=MODEL_COMPACT)
+
+
+def current_tenant():
+    """Tenant id from `?tenant=`, or None for the default model."""
+    return st.query_params.get("tenant") or None
 
-# Crop requirements for reference (optimal NPK ranges in mg/kg)
-CROP_REQUIREMENTS = {
-    'Rice':      {'N': (80, 120),  'P': (40, 60),   'K': (40, 60)},
-    'Wheat':     {'N': (100, 140), 'P': (50, 70),   'K': (50, 70)},
-    'Corn':      {'N': (120, 180), 'P': (60, 90),   'K': (60, 100)},
-    'Barley':    {'N': (60, 100),  'P': (30, 50),   'K': (40, 60)},
-    'Soybean':   {'N': (40, 80),   'P': (40, 80),   'K': (80, 120)},
-    'Cotton':    {'N': (100, 150), 'P': (50, 80),   'K': (80, 120)},
-    'Sugarcane': {'N': (150, 200), 'P': (60, 100),  'K': (100, 150)},
-    'Tomato':    {'N': (120, 160), 'P': (80, 120),  'K': (150, 200)},
-    'Potato':    {'N': (100, 140), 'P': (60, 100),  'K': (120, 180)},
-    'Onion':     {'N': (80, 120),  'P': (50, 80),   'K': (100, 140)},
-}
 
-# Seasonal calendar for Indian agriculture
-CROP_SEASONS = {
-    'Kharif':  {'months': 'Jun – Oct', 'crops': ['Rice', 'Corn', 'Cotton', 'Soybean', 'Sugarcane'], 'color': 'season-kharif'},
-    'Rabi':    {'months': 'Nov – Mar', 'crops': ['Wheat', 'Barley', 'Potato', 'Onion'], 'color': 'season-rabi'},
-    'Zaid':    {'months': 'Mar – Jun', 'crops': ['Tomato', 'Onion'], 'color': 'season-zaid'},
-}
+def load_model():
+    """The model bundle for this session's tenant, or None (with an error shown) when none can be served."""
+    tenant = current_tenant()
+    if tenant is not None:
+        cache = get_model_cache()
+        try:
+            with st.spinner("Loading regional model…") if tenant not in cache else contextlib.nullcontext():
+                return cache.get(tenant)
+        except (FileNotFoundError, ValueError):
+            st.error(f"⚠️ No model for tenant `{tenant}`. Remove `?tenant=` to use the default model.")
+            return None
+        except Exception as e:
+            st.error(f"⚠️ Error loading model for tenant `{tenant}`: {e}")
+            return None
+    live = get_live_model()
+    try:
+        with st.spinner("Loading model…") if not live.loaded else contextlib.nullcontext():
+            return live.get()
+    except FileNotFoundError:
+        st.error("⚠️ Model file not found. Please ensure the model is trained and saved in the 'models' folder.")
+        return None
+    except Exception as e:
+        st.error(f"⚠️ Error loading model: {e}")
+        return None
 
-# Rotation companion rules
-ROTATION_RULES = {
-    'cereal':     ['legume', 'allium', 'solanaceae'],
-    'legume':     ['cereal', 'solanaceae', 'grass'],
-    'cash_crop':  ['legume', 'cereal', 'allium'],
-    'grass':      ['legume', 'allium', 'cereal'],
-    'solanaceae': ['legume', 'cereal', 'allium'],
-    'allium':     ['cereal', 'legume', 'solanaceae'],
-}
 
-# ─── Rapid NPK Reduction Methods (< 1 week) ─────────────────────────────────
-# Methods to quickly lower soil nutrient levels before planting a target crop
-# Written in simple farmer-friendly language
-NPK_REDUCTION_METHODS = {
-    'N': {
-        'name': 'Nitrogen (N)',
-        'icon': '🟢',
-        'methods': [
-            {
-                'title': '🚿 Heavy Watering (Leaching)',
-                'time': '2–4 days',
-                'effect': 'High',
-                'description': 'Give your field a very heavy watering — like flooding it. Extra nitrogen dissolves in water and sinks deep down below where roots can reach it. This is called "leaching".',
-                'what_is': '💧 **What is leaching?** Think of it like a tea stain on a cloth — when you pour water over it, the stain washes away. Similarly, when you flood your soil with water, the extra nitrogen gets "washed" deep down below the roots where your crop can\'t absorb it.',
-                'steps': [
-                    'Flood the field with 3–4 inches of water over 2 days',
-                    'Let the water drain out completely for 24 hours',
-                    'Repeat the heavy watering once more',
-                    'This can reduce N by 15–30 mg/kg'
-                ],
-                'caution': 'Avoid on clay or waterlogged soils. Other nutrients may also wash away.'
-            },
-            {
-                'title': '🌿 Mix in Dry Straw or Sawdust (Carbon Mulching)',
-                'time': '3–7 days',
-                'effect': 'Medium–High',
-                'description': 'Mix dry straw, sawdust, or wood chips into your topsoil. The tiny living organisms (bacteria) in your soil will eat these dry materials, and to digest them, they use up the extra nitrogen from the soil.',
-                'what_is': '🦠 **How does this work?** Your soil is full of tiny bacteria. When you mix in dry straw or sawdust, these bacteria need nitrogen as "food" to break down the dry material. They eat up the extra nitrogen from the soil — so nitrogen goes down naturally!',
-                'steps': [
-                    'Spread 2–3 inches of dry straw or sawdust over the field',
-                    'Till it lightly into the top 6 inches of soil',
-                    'Keep the soil moist so the bacteria stay active',
-                    'Can lock up 10–25 mg/kg of N in 3–5 days'
-                ],
-                'caution': 'Don\'t add too much — it can temporarily starve the next crop of nitrogen for a few days.'
-            },
-            {
-                'title': '🌾 Sow Fast-Growing Grass (Cover Cropping)',
-                'time': '5–7 days',
-                'effect': 'Medium',
-                'description': 'Sow fast-growing grass seeds like oats, rye, or millet. These plants grow very quickly and drink up extra nitrogen from the soil through their roots.',
-                'what_is': '🧽 **Think of it like a sponge.** Just like a sponge soaks up spilled water, these fast-growing grasses soak up extra nitrogen from the soil through their roots. After 5–7 days, you cut the grass and remove it from the field — taking the nitrogen with it!',
-                'steps': [
-                    'Broadcast seeds densely — 2× the normal seeding rate',
-                    'Water immediately and keep the soil moist',
-                    'After 5–7 days, cut the grass and remove it from the field (do NOT mix it back into the soil)',
-                    'This removes 8–15 mg/kg of N'
-                ],
-                'caution': 'You must remove the cut grass from the field — if you till it back in, the nitrogen will return to the soil!'
-            }
-        ]
-    },
-    'P': {
-        'name': 'Phosphorus (P)',
-        'icon': '🔵',
-        'methods': [
-            {
-                'title': '⚗️ Aluminium Sulphate / Iron Sulphate (Chemical Binding)',
-                'time': '1–3 days',
-                'effect': 'High',
-                'description': 'When you mix aluminium sulphate or iron sulphate into your soil, they grab onto the extra phosphorus and "lock" it up — the phosphorus stays in the soil but your plants can no longer absorb it.',
-                'what_is': '🔒 **How does this work?** Think of how iron rusts — iron grabs oxygen from the air and holds it tight. Similarly, iron/aluminium in the soil grabs phosphorus and holds it so tightly that plant roots can\'t pull it away. The available P goes down!',
-                'steps': [
-                    'Apply 2–4 kg of aluminium sulphate per 100 sq meters',
-                    'Mix it well into the top 4–6 inches of soil',
-                    'Water lightly to start the chemical reaction',
-                    'Can reduce available P by 10–20 mg/kg'
-                ],
-                'caution': 'May make soil slightly acidic. Test the pH after application.'
-            },
-            {
-                'title': '🧱 Add Iron-Rich Red Soil (Laterite)',
-                'time': '3–5 days',
-                'effect': 'Medium',
-                'description': 'Add iron-rich red soil (laterite) to your field. The iron in red soil naturally grabs phosphorus and holds it tight. This is a natural method — no chemicals needed. Mix it with some raw compost for best results.',
-                'what_is': '🧲 **Think of it like a magnet.** The iron in red soil acts like a magnet for phosphorus — it pulls phosphorus towards itself and holds it tight, so your plants can\'t absorb the excess.',
-                'steps': [
-                    'Spread 1–2 inches of iron-rich red soil or laterite',
-                    'Mix with an equal amount of raw compost',
-                    'Till into the top 6 inches of soil',
-                    'Reduces available P by 5–15 mg/kg'
-                ],
-                'caution': 'Slower than chemical methods. Best for moderate excess.'
-            },
-            {
-                'title': '🚜 Remove the Top Layer of Soil (Topsoil Scraping)',
-                'time': '1–2 days',
-                'effect': 'High',
-                'description': 'Phosphorus mostly sits in the top 2–3 inches of soil because it doesn\'t dissolve in water and doesn\'t move down. So simply scraping off the top layer of soil and replacing it is the most direct way to reduce phosphorus.',
-                'what_is': '📐 **Why does this work?** Unlike nitrogen, phosphorus does NOT dissolve in water — so it stays stuck in the top layer of soil. Remove the top 2–3 inches = phosphorus is gone!',
-                'steps': [
-                    'Use a tractor or machinery to scrape off the top 2–3 inches of soil',
-                    'Move the scraped soil to a less fertile area of your farm',
-                    'Replace with low-P subsoil or fresh compost',
-                    'Instantly removes 15–30 mg/kg of P'
-                ],
-                'caution': 'Labor-intensive. You may also remove beneficial organic matter along with the topsoil.'
-            }
-        ]
-    },
-    'K': {
-        'name': 'Potassium (K)',
-        'icon': '🟠',
-        'methods': [
-            {
-                'title': '🚿 Heavy Watering (Leaching)',
-                'time': '2–4 days',
-                'effect': 'Medium–High',
-                'description': 'Potassium partly dissolves in water. If your soil is sandy or loamy, heavy watering will flush potassium down below the root zone. This works less well on heavy clay soils because clay holds potassium tightly.',
-                'what_is': '💧 **Why does soil type matter?** Sandy soil has big gaps between particles — water (and potassium) flows through easily. Clay soil has tiny, sticky particles that grab potassium and don\'t let go, even when you add lots of water.',
-                'steps': [
-                    'Apply 4–5 inches of water over 2–3 days',
-                    'Ensure good drainage so the water carries K below the root zone',
-                    'Works best in sandy or loamy soils',
-                    'Can reduce K by 10–20 mg/kg in light soils'
-                ],
-                'caution': 'Less effective in heavy clay soils — potassium sticks to clay particles.'
-            },
-            {
-                'title': '⚪ Gypsum (Calcium Sulphate) Application',
-                'time': '2–5 days',
-                'effect': 'Medium',
-                'description': 'Gypsum contains calcium, which takes potassium\'s place in the soil. Once potassium is displaced, it washes away with irrigation water.',
-                'what_is': '🪑 **Think of it like a chair.** Potassium is sitting in a "chair" in the soil (called an exchange site). When you add gypsum, calcium comes and pushes potassium out of the chair. Without a chair, potassium has nothing to hold onto and washes away with water.',
-                'steps': [
-                    'Apply 3–5 kg of gypsum per 100 sq meters',
-                    'Mix into the top 6 inches of soil',
-                    'Follow with heavy irrigation (3+ inches of water)',
-                    'Can reduce K by 10–15 mg/kg'
-                ],
-                'caution': 'May temporarily increase soil salinity. Test after application.'
-            },
-            {
-                'title': '🥬 Plant Fast-Growing Vegetables (K-Hungry Crops)',
-                'time': '5–7 days',
-                'effect': 'Medium',
-                'description': 'Radish, mustard greens, and turnips are fast-growing vegetables that are very "hungry" for potassium. They germinate in just 3–4 days and quickly absorb potassium from the soil through their roots.',
-                'what_is': '🌱 **Think of it this way:** These vegetables are "potassium-hungry" — they drink up potassium from the soil very quickly. Grow them densely for a week, then harvest and remove all the plants — the potassium leaves with them!',
-                'steps': [
-                    'Sow radish or mustard seeds at 3× the normal density',
-                    'Water generously for rapid germination',
-                    'After 5–7 days, harvest and remove ALL the plants from the field',
-                    'Can absorb 8–15 mg/kg of K'
-                ],
-                'caution': 'You must remove all the harvested plants completely. Dense sowing uses more seed.'
-            }
-        ]
-    }
-}
+# ─── History Store ───────────────────────────────────────────────────────────
+# Readings persist in SQLite (see src/history_store.py), keyed by user and field.
+HISTORY_USER = 'default'
+DEFAULT_FIELD = 'Field A'
+HISTORY_CHART_POINTS = 600    # Max points per trace, roughly the chart's pixel width
+HISTORY_ROLLING_WINDOW = 20    # Readings in the moving mean/min/max window
+HISTORY_PAGE_SIZE = 50         # Rows per page of the history table
 
-# Crop-specific reduction tips — extra advice tailored per crop
-CROP_REDUCTION_TIPS = {
-    'Rice':      {'N': 'Rice paddy flooding naturally washes away excess N. Drain and refill the paddy 2–3 times.',
-                  'P': 'Add iron-rich red soil (laterite) to the paddy bed — commonly available in rice-growing areas.',
-                  'K': 'The flood-and-drain cycle in paddy fields also helps reduce K in lighter soils.'},
-    'Wheat':     {'N': 'Irrigate heavily 5 days before sowing wheat — the nitrogen will wash down below the root zone.',
-                  'P': 'Apply gypsum — it also improves root zone structure for wheat.',
-                  'K': 'Wheat tolerates moderate K excess. Only take action if K is more than 30 mg/kg above optimal.'},
-    'Corn':      {'N': 'Corn is a heavy nitrogen feeder — slight excess is tolerable. Only reduce if more than 40 mg/kg above target.',
-                  'P': 'Mix sawdust + iron sulphate into the soil before planting corn.',
-                  'K': 'Corn uses potassium efficiently. Mild excess may not need correction.'},
-    'Barley':    {'N': '⚠️ Barley is very sensitive to high nitrogen — it causes the crop to fall over (lodging)! Reduce N aggressively if it is high.',
-                  'P': 'Barley tolerates moderate P excess. Apply aluminium sulphate only if P is heavily in excess.',
-                  'K': 'Barley needs balanced K. Wash out with heavy watering if excess is more than 20 mg/kg above optimal.'},
-    'Soybean':   {'N': '⚠️ Soybean makes its own nitrogen through its roots! Excess soil nitrogen stops this natural process. It is critical to reduce N before sowing soybean!',
-                  'P': 'Moderate P excess actually helps soybean. Only reduce if more than 40 mg/kg above target.',
-                  'K': 'Soybean needs a lot of K — excess K is generally beneficial. No need to reduce.'},
-    'Cotton':    {'N': '⚠️ Excess nitrogen in cotton causes lots of leaves but poor boll (cotton ball) formation! Reduce N before planting.',
-                  'P': 'Cotton responds well to P. Only reduce extreme excess (more than 50 mg/kg above target).',
-                  'K': 'Cotton needs high K for fiber quality. Only reduce extreme K excess.'},
-    'Sugarcane': {'N': 'Sugarcane is a very heavy nitrogen feeder. Unless excess is extreme (more than 60 mg/kg), no reduction is needed.',
-                  'P': 'Apply iron-rich soil amendments near the root zone of sugarcane sets.',
-                  'K': 'Sugarcane needs high K for sugar content. Only reduce if more than 50 mg/kg above optimal.'},
-    'Tomato':    {'N': '⚠️ Excess nitrogen in tomato causes heavy leaf growth but NO fruit! It is critical to reduce N before transplanting!',
-                  'P': 'Tomato loves phosphorus. Only reduce extreme excess.',
-                  'K': 'High K actually improves tomato fruit quality. Only reduce if more than 60 mg/kg above target.'},
-    'Potato':    {'N': 'Excess N delays tuber (potato) formation. Wash out nitrogen with heavy watering 4–5 days before planting.',
-                  'P': 'Potato benefits from high P. Only reduce extreme excess.',
-                  'K': 'Potato is a heavy K user. Moderate excess is generally well-tolerated.'},
-    'Onion':     {'N': '⚠️ Excess nitrogen makes onion bulbs soft and prone to rotting! Reduce N before transplanting!',
-                  'P': 'Onion tolerates moderate P excess. Only reduce if heavily excessive.',
-                  'K': 'Onion needs moderate K. Wash out with heavy watering if more than 25 mg/kg above optimal.'},
-}
 
+@st.cache_resource(show_spinner=False)
+def get_history_store():
+    """Open the shared history store once per process."""
+    return HistoryStore(os.path.join(PROJECT_ROOT, DEFAULT_DB_PATH))
 
-def get_reduction_plan(cur_n, cur_p, cur_k, target_crop, targets):
-    """Generate crop-specific reduction plan for any excess nutrients."""
-    plan = []
-    excess = {
-        'N': round(cur_n - targets['N'], 2),
-        'P': round(cur_p - targets['P'], 2),
-        'K': round(cur_k - targets['K'], 2),
-    }
-    for nut in ['N', 'P', 'K']:
-        if excess[nut] > 5:  # Only if meaningfully excess
-            severity = 'high' if excess[nut] > 30 else ('moderate' if excess[nut] > 15 else 'mild')
-            methods = NPK_REDUCTION_METHODS[nut]
-            crop_tip = CROP_REDUCTION_TIPS.get(target_crop, {}).get(nut, '')
-            plan.append({
-                'nutrient': nut,
-                'name': methods['name'],
-                'icon': methods['icon'],
-                'excess': excess[nut],
-                'severity': severity,
-                'methods': methods['methods'],
-                'crop_tip': crop_tip
-            })
-    return plan
 
+@st.cache_resource(max_entries=32, show_spinner=False)
+def get_field_series(user_id, field_id):
+    """Keep one incrementally synced reading series per field in process memory."""
+    return FieldSeries(window=HISTORY_ROLLING_WINDOW)
 
-# ─── Load Model ──────────────────────────────────────────────────────────────
-@st.cache_data
-def load_model():
-    try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.normpath(os.path.join(script_dir, '..'))
-        candidate_root = os.path.join(project_root, 'models', 'npk_crop_model.pkl')
-        candidate_local = os.path.join(script_dir, 'models', 'npk_crop_model.pkl')
-        candidate_parent = os.path.normpath(os.path.join(script_dir, '..', 'ml', 'models', 'npk_crop_model.pkl'))
 
-        for p in [candidate_root, candidate_local, candidate_parent]:
-            if os.path.exists(p):
-                return joblib.load(p)
+def get_active_field():
+    """Return the field that new readings are recorded against."""
+    return st.session_state.get('active_field', DEFAULT_FIELD)
 
-        raise FileNotFoundError(f"Model file not found. Tried: {[candidate_root, candidate_local, candidate_parent]}")
-    except FileNotFoundError:
-        st.error("⚠️ Model file not found. Please ensure the model is trained and saved in the 'models' folder.")
-        return None
-    except Exception as e:
-        st.error(f"⚠️ Error loading model: {e}")
+
+# ─── Telemetry ───────────────────────────────────────────────────────────────
+# Latency histograms live in src/telemetry.py (process-wide). Prometheus can
+# scrape them when NPK_METRICS_PORT is set (on loopback unless NPK_METRICS_HOST
+# names a wider address); the Admin page shows them in-app when the URL carries
+# ?admin=<NPK_ADMIN_TOKEN>.
+ADMIN_PAGE = "🛠️ Admin · Metrics"
+MODEL_PAGES = ("🌾 Crop Prediction", "🧪 NPK Additions")
+
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_endpoint():
+    """Start the /metrics HTTP endpoint once per process, if a port is configured."""
+    port = os.environ.get("NPK_METRICS_PORT")
+    if not port or not telemetry.ENABLED:
         return None
+    return telemetry.serve(os.environ.get("NPK_METRICS_HOST", "127.0.0.1"), int(port))
 
 
-# ─── Helper Functions ─────────────────────────────────────────────────────────
-
-# ── Standard Soil NPK Benchmarks ──
-# Based on ICAR (Indian Council of Agricultural Research) / Soil Health Card standards
-# Converted from kg/ha to mg/kg using: 1 kg/ha ≈ 0.45 mg/kg (15cm depth, 1.33 g/cm³ bulk density)
-# References: ICAR Soil Testing Guidelines, Soil Health Card Scheme (Govt. of India),
-#             USDA NRCS Soil Nutrient Standards, FAO Soil Fertility Guidelines
-SOIL_NPK_BENCHMARKS = {
-    'N': {
-        'unit': 'mg/kg',
-        'ranges': [
-            {'label': 'Very Low',  'min': 0,   'max': 50,  'color': '#dc2626', 'desc': 'Severely deficient — crops will show yellowing and stunted growth'},
-            {'label': 'Low',       'min': 50,  'max': 108, 'color': '#ef4444', 'desc': 'Below optimal — most crops will need nitrogen supplementation'},
-            {'label': 'Medium',    'min': 108, 'max': 215, 'color': '#22c55e', 'desc': 'Adequate — suitable for most crops without additional N'},
-            {'label': 'High',      'min': 215, 'max': 320, 'color': '#f59e0b', 'desc': 'Above optimal — risk of excessive vegetative growth'},
-            {'label': 'Very High', 'min': 320, 'max': 999, 'color': '#dc2626', 'desc': 'Excessive — risk of nutrient toxicity and groundwater contamination'}
-        ],
-        'optimal_mid': 160,   # Midpoint of medium range
-        'optimal_range': (108, 215),
-        'source': 'ICAR: Low <240 kg/ha (<108 mg/kg), Medium 240-480 kg/ha (108-215 mg/kg), High >480 kg/ha (>215 mg/kg)'
-    },
-    'P': {
-        'unit': 'mg/kg',
-        'ranges': [
-            {'label': 'Very Low',  'min': 0,   'max': 5,   'color': '#dc2626', 'desc': 'Severely deficient — poor root development and low yields'},
-            {'label': 'Low',       'min': 5,   'max': 11,  'color': '#ef4444', 'desc': 'Below optimal — phosphorus supplementation recommended'},
-            {'label': 'Medium',    'min': 11,  'max': 25,  'color': '#22c55e', 'desc': 'Adequate — sufficient for most crops'},
-            {'label': 'High',      'min': 25,  'max': 50,  'color': '#f59e0b', 'desc': 'Above optimal — reduce P application, risk of runoff'},
-            {'label': 'Very High', 'min': 50,  'max': 999, 'color': '#dc2626', 'desc': 'Excessive — environmental risk, no P fertilizer needed'}
-        ],
-        'optimal_mid': 18,
-        'optimal_range': (11, 25),
-        'source': 'ICAR (Olsen-P): Low <11 kg/ha (<5 mg/kg), Medium 11-22 kg/ha (5-10 mg/kg), High >22 kg/ha (>10 mg/kg). Extended with Bray-P international standards.'
-    },
-    'K': {
-        'unit': 'mg/kg',
-        'ranges': [
-            {'label': 'Very Low',  'min': 0,   'max': 36,  'color': '#dc2626', 'desc': 'Severely deficient — weak stems, poor disease resistance'},
-            {'label': 'Low',       'min': 36,  'max': 55,  'color': '#ef4444', 'desc': 'Below optimal — potassium supplementation recommended'},
-            {'label': 'Medium',    'min': 55,  'max': 125, 'color': '#22c55e', 'desc': 'Adequate — sufficient for most crops'},
-            {'label': 'High',      'min': 125, 'max': 200, 'color': '#f59e0b', 'desc': 'Above optimal — no additional K needed'},
-            {'label': 'Very High', 'min': 200, 'max': 999, 'color': '#dc2626', 'desc': 'Excessive — may interfere with calcium/magnesium uptake'}
-        ],
-        'optimal_mid': 90,
-        'optimal_range': (55, 125),
-        'source': 'ICAR: Low <110 kg/ha (<49 mg/kg), Medium 110-280 kg/ha (49-125 mg/kg), High >280 kg/ha (>125 mg/kg)'
-    }
-}
+def is_admin():
+    """Admin pages require ?admin=<token> matching the NPK_ADMIN_TOKEN env var."""
+    token = os.environ.get("NPK_ADMIN_TOKEN")
+    return bool(token) and st.query_params.get("admin") == token
 
 
-def get_nutrient_status(value, nutrient):
-    """Return status label, color, and description for a nutrient value using ICAR benchmarks."""
-    benchmarks = SOIL_NPK_BENCHMARKS[nutrient]
-    for r in benchmarks['ranges']:
-        if r['min'] <= value < r['max']:
-            return r['label'], r['color']
-    # Fallback for edge case
-    return benchmarks['ranges'][-1]['label'], benchmarks['ranges'][-1]['color']
-
-
-def get_nutrient_detail(value, nutrient):
-    """Return full detail (label, color, description, range info) for a nutrient."""
-    benchmarks = SOIL_NPK_BENCHMARKS[nutrient]
-    for r in benchmarks['ranges']:
-        if r['min'] <= value < r['max']:
-            return r
-    return benchmarks['ranges'][-1]
-
-
-def predict_crop(n, p, k, model_data):
-    """Run the ML model and return (predicted_crop, probability_dict)."""
-    input_data = np.array([[n, p, k]])
-    input_scaled = model_data['scaler'].transform(input_data)
-    prediction = model_data['model'].predict(input_scaled)
-    predicted_crop = model_data['label_encoder'].inverse_transform(prediction)[0]
-    probabilities = model_data['model'].predict_proba(input_scaled)[0]
-    prob_dict = {crop: prob for crop, prob in zip(model_data['target_names'], probabilities)}
-    return predicted_crop, prob_dict
-
-
-def recommend_additions(cur_n, cur_p, cur_k, target_crop, strategy='mid'):
-    """Compute required NPK additions (mg/kg) to reach target crop ranges."""
-    if target_crop not in CROP_REQUIREMENTS:
-        raise ValueError(f"Unknown crop: {target_crop}")
-    req = CROP_REQUIREMENTS[target_crop]
-    if strategy == 'mid':
-        target_n = (req['N'][0] + req['N'][1]) / 2
-        target_p = (req['P'][0] + req['P'][1]) / 2
-        target_k = (req['K'][0] + req['K'][1]) / 2
-    else:
-        target_n, target_p, target_k = req['N'][0], req['P'][0], req['K'][0]
-    diffs = {
-        'N': round(target_n - cur_n, 2),
-        'P': round(target_p - cur_p, 2),
-        'K': round(target_k - cur_k, 2),
-    }
-    targets = {'N': round(target_n, 2), 'P': round(target_p, 2), 'K': round(target_k, 2)}
-    return diffs, targets
-
-
-def compute_soil_health(n, p, k):
-    """Compute a 0–100 soil health score based on ICAR standard NPK benchmarks.
-
-    Scoring methodology:
-    - Each nutrient scored 0-100 based on how close it is to the ICAR 'Medium' (optimal) range
-    - Within optimal range = 100 points
-    - Below/above optimal = score decreases proportionally
-    - Balanced ratio between nutrients gives a bonus
-    - Final weighted average: N=35%, P=30%, K=35%
+# Sampling profiles (see src/profiling.py) are written per page render when
+# NPK_PROFILE=1, or for a single request when an admin adds ?profile=1.
+PROFILE_DIR = os.path.join(PROJECT_ROOT, profiling.PROFILE_DIR)
+
+
+def profiling_requested():
+    """Whether this rerun's page render should be profiled."""
+    return profiling.ENABLED or (st.query_params.get("profile") == "1" and is_admin())
+
+
+# ─── Figure Cache ─────────────────────────────────────────────────────────────
+# Building and validating Plotly figures is one of the most expensive steps of a
+# rerun. Figures are cached as resources keyed on the hash of their input data,
+# so identical inputs reuse the already-validated figure spec across reruns and
+# sessions. Callers must treat the returned figures as read-only.
+CHART_CONFIG = {'responsive': True, 'displayModeBar': False}
+
+# Crop-wise views show the best entries only (top-k selection, not a full
+# sort), so page cost stays flat as the catalogue grows.
+SUITABILITY_CHART_TOP = 15
+ROTATION_RANKING_TOP = 25
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def build_suitability_chart(scores, title="All Crop Suitability Scores (out of 100)"):
+    """Build the suitability bar chart from a tuple of (crop, score) pairs."""
+    score_df = pd.DataFrame(list(scores), columns=['Crop', 'Suitability'])
+    score_df = score_df.sort_values('Suitability', ascending=True)
+    fig = px.bar(score_df, x='Suitability', y='Crop', orientation='h',
+                 color='Suitability', color_continuous_scale='Emrld',
+                 title=title,
+                 range_x=[0, 100])
+    fig.update_layout(
+        height=350, showlegend=False,
+        xaxis_title="Suitability Score (0–100)", yaxis_title="",
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='#94a3b8')
+    )
+    return fig
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def build_history_chart(raw, rolling, window):
+    """Build the NPK trend chart from downsampled points.
+
+    raw and rolling map each nutrient to an (x, y) pair of arrays holding the
+    readings and their rolling mean.
     """
-    def nutrient_score(value, nutrient):
-        bench = SOIL_NPK_BENCHMARKS[nutrient]
-        opt_low, opt_high = bench['optimal_range']
-        opt_mid = bench['optimal_mid']
-
-        # Within optimal range = full score
-        if opt_low <= value <= opt_high:
-            return 100.0
-
-        # Below optimal
-        if value < opt_low:
-            if value <= 0:
-                return 0.0
-            # Score proportionally: 0 at very_low_min, 60 at low boundary, 100 at optimal
-            very_low = bench['ranges'][0]['max']  # Very Low upper boundary
-            if value < very_low:
-                return max(0, (value / very_low) * 40)  # 0-40 for very low range
-            else:
-                # Low range: 40-100
-                return 40 + ((value - very_low) / (opt_low - very_low)) * 60
-
-        # Above optimal
-        if value > opt_high:
-            very_high = bench['ranges'][3]['max']  # High upper boundary
-            if value <= very_high:
-                # High range: 100 down to 50
-                return max(50, 100 - ((value - opt_high) / (very_high - opt_high)) * 50)
-            else:
-                # Very High: 50 down to 10
-                overshoot = value - very_high
-                return max(10, 50 - min(40, overshoot * 0.2))
+    fig = go.Figure()
+    colors = {'N': '#22c55e', 'P': '#f59e0b', 'K': '#60a5fa'}
+    for nut in ['N', 'P', 'K']:
+        x, y = raw[nut]
+        fig.add_trace(go.Scatter(
+            x=x, y=y,
+            mode='lines+markers' if len(x) <= 60 else 'lines',
+            name=nut,
+            line=dict(color=colors[nut], width=3 if len(x) <= 60 else 1),
+            marker=dict(size=8)
+        ))
+        rx, ry = rolling[nut]
+        fig.add_trace(go.Scatter(
+            x=rx, y=ry,
+            mode='lines',
+            name=f"{nut} ({window}-reading avg)",
+            line=dict(color=colors[nut], width=3, dash='dot'),
+        ))
+    fig.update_layout(
+        title="NPK Trends Across Readings",
+        xaxis_title="Reading #",
+        yaxis_title="mg/kg",
+        height=350,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='#94a3b8'),
+        legend=dict(orientation='h', y=1.15)
+    )
+    return fig
+
+
+# ─── Static Content ───────────────────────────────────────────────────────────
+# Reference pages are derived entirely from the constant knowledge dicts. Every
+# table and HTML fragment they show is rendered once per process into a
+# read-only mapping; a rerun only picks the variant it needs (current season,
+# selected crop). Tables are stored as Arrow tables, which st.dataframe ships
+# as-is instead of building and converting a DataFrame (~0.75 ms per table).
+ABOUT_NPK_CARDS = (
+    """
+        <div class="info-card">
+            <h4>🔵 Nitrogen (N)</h4>
+            <ul>
+                <li>Essential for leaf & stem growth</li>
+                <li>Promotes lush green foliage</li>
+                <li>Key for protein synthesis</li>
+                <li>Typical range: 40–200 mg/kg</li>
+                <li>Deficiency → yellowing leaves</li>
+            </ul>
+        </div>""",
+    """
+        <div class="info-card">
+            <h4>🟠 Phosphorus (P)</h4>
+            <ul>
+                <li>Critical for root development</li>
+                <li>Aids flower & fruit formation</li>
+                <li>Energy transfer in plants</li>
+                <li>Typical range: 20–120 mg/kg</li>
+                <li>Deficiency → stunted growth</li>
+            </ul>
+        </div>""",
+    """
+        <div class="info-card">
+            <h4>🟡 Potassium (K)</h4>
+            <ul>
+                <li>Regulates water uptake</li>
+                <li>Boosts disease resistance</li>
+                <li>Improves fruit quality</li>
+                <li>Typical range: 40–200 mg/kg</li>
+                <li>Deficiency → weak stems</li>
+            </ul>
+        </div>""",
+)
+ICAR_STANDARD_OPTION = 'General (ICAR Standard)'
 
-        return 50.0  # fallback
 
-    score_n = nutrient_score(n, 'N')
-    score_p = nutrient_score(p, 'P')
-    score_k = nutrient_score(k, 'K')
+def _season_card(season_name, info, active):
+    crops = "&nbsp;&nbsp;".join(
+        f"{CROP_NUTRIENT_IMPACT.get(c, {}).get('emoji', '🌱')} <strong>{c}</strong>" for c in info['crops']
+    )
+    return f"""
+        <div class="info-card" style="margin-bottom: 1rem; {'border-color: #22c55e; box-shadow: 0 0 20px rgba(34,197,94,0.1);' if active else ''}">
+            <h4>
+                <span class="season-badge {info['color']} {'season-active' if active else ''}">{season_name}</span>
+                &nbsp; {info['months']}{' — 📍 CURRENT' if active else ''}
+            </h4>
+            <p style="margin-top: 0.75rem;">
+                {crops}
+            </p>
+        </div>"""
 
-    # Weighted average (N and K slightly more impactful)
-    base = 0.35 * score_n + 0.30 * score_p + 0.35 * score_k
 
-    # Balance bonus: reward when nutrients are proportionally balanced
-    values = [n, p, k]
-    if min(values) > 0:
-        ratio = max(values) / min(values)
-        if ratio < 3.0:
-            balance_bonus = max(0, 8 * (1 - (ratio - 1) / 2.0))
-        else:
-            balance_bonus = 0
-    else:
-        balance_bonus = 0
-
-    return min(100, round(base + balance_bonus, 1))
-
-
-def get_health_grade(score):
-    """Return grade label, color, and description for a soil health score.
-    Based on Soil Health Card grading standards."""
-    if score >= 85:
-        return "Excellent", "#22c55e"
-    elif score >= 70:
-        return "Good", "#84cc16"
-    elif score >= 50:
-        return "Moderate", "#f59e0b"
-    elif score >= 30:
-        return "Poor", "#ef4444"
-    else:
-        return "Very Poor", "#dc2626"
-
-
-def suggest_rotation(previous_crop):
-    """Suggest the best next crops based on rotation science."""
-    if previous_crop not in CROP_NUTRIENT_IMPACT:
-        return []
-
-    prev = CROP_NUTRIENT_IMPACT[previous_crop]
-    prev_family = prev['family']
-    preferred_families = ROTATION_RULES.get(prev_family, [])
-
-    suggestions = []
-    for crop, info in CROP_NUTRIENT_IMPACT.items():
-        if crop == previous_crop:
-            continue
-
-        score = 0
-        reasons = []
-
-        # Family compatibility
-        if info['family'] in preferred_families:
-            rank = preferred_families.index(info['family'])
-            score += (3 - rank) * 25  # 75, 50, 25 based on rank
-            reasons.append(f"Good rotation after {prev_family}")
-
-        # Same family penalty
-        if info['family'] == prev_family:
-            score -= 40
-            reasons.append("⚠️ Same crop family — risk of disease buildup")
-
-        # Solanaceae back-to-back penalty
-        if prev_family == 'solanaceae' and info['family'] == 'solanaceae':
-            score -= 30
-            reasons.append("⚠️ Avoid Solanaceae back-to-back (blight risk)")
-
-        # N-fixer bonus after heavy N consumer
-        if prev['N'] < -30 and info.get('N', 0) > 0:
-            score += 40
-            reasons.append("🌱 Legume fixes nitrogen depleted by previous crop")
-
-        # Light feeder after heavy K consumer
-        if prev['K'] < -30 and info.get('K', 0) > -20:
-            score += 20
-            reasons.append("Gentle on potassium — lets soil recover")
-
-        # Nutrient balance: prefer crops that don't deplete the same nutrient heavily
-        if prev['N'] < -30 and info.get('N', 0) > -20:
-            score += 15
-            reasons.append("Low nitrogen demand")
-        if prev['P'] < -20 and info.get('P', 0) > -15:
-            score += 10
-            reasons.append("Low phosphorus demand")
-
-        suggestions.append({
-            'crop': crop,
-            'emoji': info['emoji'],
-            'score': score,
-            'reasons': reasons,
-            'family': info['family'],
-            'n_impact': info['N'],
-            'p_impact': info['P'],
-            'k_impact': info['K'],
-        })
+def _crop_card(crop):
+    info = CROP_NUTRIENT_IMPACT.get(crop, {})
+    req = CROP_REQUIREMENTS.get(crop, {})
+    n_range = f"{req.get('N', (0,0))[0]}–{req.get('N', (0,0))[1]}"
+    p_range = f"{req.get('P', (0,0))[0]}–{req.get('P', (0,0))[1]}"
+    k_range = f"{req.get('K', (0,0))[0]}–{req.get('K', (0,0))[1]}"
+    return f"""
+            <div class="info-card" style="text-align: center;">
+                <div style="font-size: 2.5rem;">{info.get('emoji', '🌱')}</div>
+                <h4 style="margin: 0.5rem 0 0.25rem;">{crop}</h4>
+                <p style="font-size: 0.8rem; margin: 0;">N: {n_range}<br>P: {p_range}<br>K: {k_range}</p>
+            </div>"""
 
-    suggestions.sort(key=lambda x: x['score'], reverse=True)
-    return suggestions
 
+@st.cache_resource(show_spinner=False)
+def build_static_content():
+    """Render all input-independent reference artifacts once per process."""
+    import pyarrow as pa
 
-def get_current_season():
-    """Return current Indian farming season based on month."""
-    month = datetime.now().month
-    if 6 <= month <= 10:
-        return 'Kharif'
-    elif month >= 11 or month <= 2:
-        return 'Rabi'
-    else:
-        return 'Zaid'
+    order = KB.display_order
+    season_matrix = {'Crop': [f"{KB.emoji[i]} {KB.crops[i]}" for i in order.tolist()]}
+    for s, sn in enumerate(KB.seasons):
+        season_matrix[sn] = np.where(KB.season_mask[s, order], "✅", "—").tolist()
+
+    crop_lookup, crop_reference = {}, {}
+    for crop, req in CROP_REQUIREMENTS.items():
+        crop_lookup[crop] = pa.table({
+            'Nutrient': ['N', 'P', 'K'],
+            'Min': [req['N'][0], req['P'][0], req['K'][0]],
+            'Max': [req['N'][1], req['P'][1], req['K'][1]],
+            'Midpoint': [(req[x][0] + req[x][1]) / 2 for x in 'NPK'],
+        })
+        crop_reference[crop] = pa.table({
+            'Nutrient': ['Nitrogen (N)', 'Phosphorus (P)', 'Potassium (K)'],
+            'Optimal Range (mg/kg)': [f"{req[x][0]} – {req[x][1]}" for x in 'NPK'],
+            'Midpoint (mg/kg)': [f"{(req[x][0] + req[x][1]) // 2}" for x in 'NPK'],
+        })
+
+    rotation_impact = {}
+    for crop, prev in CROP_NUTRIENT_IMPACT.items():
+        rotation_impact[crop] = pa.table({
+            'Nutrient': ['N', 'P', 'K'],
+            'Impact (mg/kg)': [prev['N'], prev['P'], prev['K']],
+            'Effect': [
+                '🌱 Adds nitrogen' if prev['N'] > 0 else '⬇️ Depletes nitrogen',
+                '🌱 Adds phosphorus' if prev['P'] > 0 else '⬇️ Depletes phosphorus',
+                '🌱 Adds potassium' if prev['K'] > 0 else '⬇️ Depletes potassium',
+            ]
+        })
+
+    health_options = {ICAR_STANDARD_OPTION: None}
+    for c in CROP_REQUIREMENTS:
+        health_options[f"{CROP_NUTRIENT_IMPACT.get(c, {}).get('emoji', '🌱')} {c}"] = c
+
+    return MappingProxyType({
+        'season_cards': MappingProxyType({
+            sn: (_season_card(sn, si, False), _season_card(sn, si, True)) for sn, si in CROP_SEASONS.items()
+        }),
+        'season_crop_cards': MappingProxyType({
+            sn: tuple(_crop_card(c) for c in si['crops']) for sn, si in CROP_SEASONS.items()
+        }),
+        'season_matrix': pa.table(season_matrix),
+        'icar_benchmarks': pa.table({
+            'Rating': ['Very Low', 'Low', 'Medium ✅', 'High', 'Very High'],
+            'N (mg/kg)': ['< 50', '50 – 108', '108 – 215', '215 – 320', '> 320'],
+            'P (mg/kg)': ['< 5', '5 – 11', '11 – 25', '25 – 50', '> 50'],
+            'K (mg/kg)': ['< 36', '36 – 55', '55 – 125', '125 – 200', '> 200'],
+        }),
+        'crop_lookup': MappingProxyType(crop_lookup),
+        'crop_reference': MappingProxyType(crop_reference),
+        'rotation_impact': MappingProxyType(rotation_impact),
+        'health_options': MappingProxyType(health_options),
+    })
 
 
 # ─── Hero Header ──────────────────────────────────────────────────────────────
@@ -827,56 +668,24 @@ def page_crop_prediction(model_data):
                 st.error("Please enter positive values for all NPK nutrients.")
             else:
                 with st.spinner("Analyzing soil composition..."):
-                    predicted_crop, probabilities = predict_crop(nitrogen, phosphorus, potassium, model_data)
+                    started = time.perf_counter()
+                    (predicted_crop, _), = top_crops(nitrogen, phosphorus, potassium, model_data, top=1)
+                    # Sampled requests are replayed against the shadow candidate, if any
+                    if current_tenant() is None:
+                        get_live_model().observe([[nitrogen, phosphorus, potassium]], [predicted_crop],
+                                                 time.perf_counter() - started)
 
                 # Save to history
-                if 'npk_history' not in st.session_state:
-                    st.session_state.npk_history = []
-                st.session_state.npk_history.append({
-                    'time': datetime.now().strftime('%H:%M:%S'),
-                    'N': nitrogen, 'P': phosphorus, 'K': potassium,
-                    'crop': predicted_crop
-                })
+                get_history_store().add_reading(
+                    HISTORY_USER, get_active_field(),
+                    nitrogen, phosphorus, potassium, crop=predicted_crop
+                )
 
                 emoji = CROP_NUTRIENT_IMPACT.get(predicted_crop, {}).get('emoji', '🌱')
                 st.success(f"### {emoji} Best Match: **{predicted_crop}**")
 
                 # ── Compute independent suitability scores (0-100 each) ──
-                def crop_suitability(n, p, k, crop_name):
-                    """Compute a 0-100 suitability score for a specific crop."""
-                    if crop_name not in CROP_REQUIREMENTS:
-                        return 0
-                    req = CROP_REQUIREMENTS[crop_name]
-
-                    def nutrient_fit(value, opt_low, opt_high):
-                        if opt_low <= value <= opt_high:
-                            return 100.0
-                        opt_width = opt_high - opt_low
-                        tolerance = max(opt_width * 0.3, 10)
-                        if value < opt_low:
-                            deficit = opt_low - value
-                            if deficit <= tolerance:
-                                return max(70, 100 - (deficit / tolerance) * 30)
-                            else:
-                                return max(0, 70 - ((deficit - tolerance) / max(opt_low, 1)) * 100)
-                        else:
-                            excess = value - opt_high
-                            if excess <= tolerance:
-                                return max(70, 100 - (excess / tolerance) * 30)
-                            else:
-                                return max(0, 70 - ((excess - tolerance) / max(opt_high, 1)) * 100)
-
-                    s_n = nutrient_fit(n, req['N'][0], req['N'][1])
-                    s_p = nutrient_fit(p, req['P'][0], req['P'][1])
-                    s_k = nutrient_fit(k, req['K'][0], req['K'][1])
-                    return round(0.35 * s_n + 0.30 * s_p + 0.35 * s_k, 1)
-
-                # Score all crops independently
-                suitability = {}
-                for crop_name in CROP_REQUIREMENTS:
-                    suitability[crop_name] = crop_suitability(nitrogen, phosphorus, potassium, crop_name)
-
-                sorted_scores = sorted(suitability.items(), key=lambda x: x[1], reverse=True)
+                sorted_scores = rank_crop_suitability(nitrogen, phosphorus, potassium, top=SUITABILITY_CHART_TOP)
 
                 # Top 5 with individual scores out of 100
                 st.markdown("##### 🏆 Crop Suitability Scores (each out of 100)")
@@ -887,20 +696,13 @@ def page_crop_prediction(model_data):
                     st.markdown(f"{medals[i]} {crop_emoji} **{crop}** — **{score}/100**")
                     st.progress(score / 100)
 
-                # Full chart — all crops with independent scores
-                score_df = pd.DataFrame(sorted_scores, columns=['Crop', 'Suitability'])
-                score_df = score_df.sort_values('Suitability', ascending=True)
-                fig = px.bar(score_df, x='Suitability', y='Crop', orientation='h',
-                             color='Suitability', color_continuous_scale='Emrld',
-                             title="All Crop Suitability Scores (out of 100)",
-                             range_x=[0, 100])
-                fig.update_layout(
-                    height=350, showlegend=False,
-                    xaxis_title="Suitability Score (0–100)", yaxis_title="",
-                    plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='#94a3b8')
-                )
-                st.plotly_chart(fig, use_container_width=True, key="prediction_confidence_chart", config={'responsive': True, 'displayModeBar': False})
+                # Chart — every crop, or the best SUITABILITY_CHART_TOP of a large catalogue
+                if len(KB) > SUITABILITY_CHART_TOP:
+                    fig = build_suitability_chart(
+                        tuple(sorted_scores), f"Top {SUITABILITY_CHART_TOP} Crop Suitability Scores (out of 100)")
+                else:
+                    fig = build_suitability_chart(tuple(sorted_scores))
+                st.plotly_chart(fig, use_container_width=True, key="prediction_confidence_chart", config=CHART_CONFIG)
 
                 # Comparison with optimal for best crop
                 best_crop = sorted_scores[0][0]
@@ -938,17 +740,9 @@ def page_npk_additions(model_data):
 
         # Quick lookup
         with st.expander("🔎 View crop NPK requirements"):
-            lk = st.selectbox("Crop:", list(CROP_REQUIREMENTS.keys()), key="lk_crop")
-            req = CROP_REQUIREMENTS[lk]
-            mid_n = (req['N'][0] + req['N'][1]) / 2
-            mid_p = (req['P'][0] + req['P'][1]) / 2
-            mid_k = (req['K'][0] + req['K'][1]) / 2
-            st.dataframe(pd.DataFrame({
-                'Nutrient': ['N', 'P', 'K'],
-                'Min': [req['N'][0], req['P'][0], req['K'][0]],
-                'Max': [req['N'][1], req['P'][1], req['K'][1]],
-                'Midpoint': [mid_n, mid_p, mid_k]
-            }), use_container_width=True, hide_index=True)
+            crop_lookup = build_static_content()['crop_lookup']
+            lk = st.selectbox("Crop:", list(crop_lookup), key="lk_crop")
+            st.dataframe(crop_lookup[lk], use_container_width=True, hide_index=True)
 
         with st.form("add_form"):
             target_crop = st.selectbox("Target crop:", model_data.get('target_names', []))
@@ -1105,10 +899,10 @@ def page_npk_additions(model_data):
             st.caption("If reducing nutrients isn't practical, consider growing a crop that thrives with your current NPK levels:")
 
             if model_data:
-                best_crop, probs = predict_crop(cur_n, cur_p, cur_k, model_data)
-                sorted_probs = sorted(probs.items(), key=lambda x: x[1], reverse=True)[:3]
+                top_probs = top_crops(cur_n, cur_p, cur_k, model_data, top=3)
+                best_crop = top_probs[0][0]
                 sc1, sc2, sc3 = st.columns(3)
-                for i, (col_alt, (crop, prob)) in enumerate(zip([sc1, sc2, sc3], sorted_probs)):
+                for i, (col_alt, (crop, prob)) in enumerate(zip([sc1, sc2, sc3], top_probs)):
                     medal = ["🥇", "🥈", "🥉"][i]
                     crop_emoji = CROP_NUTRIENT_IMPACT.get(crop, {}).get('emoji', '🌱')
                     conf = prob * 100
@@ -1138,16 +932,7 @@ def page_crop_rotation():
         prev = CROP_NUTRIENT_IMPACT[previous_crop]
 
         st.markdown(f"**{prev['emoji']} {previous_crop}** — Nutrient Impact:")
-        impact_df = pd.DataFrame({
-            'Nutrient': ['N', 'P', 'K'],
-            'Impact (mg/kg)': [prev['N'], prev['P'], prev['K']],
-            'Effect': [
-                '🌱 Adds nitrogen' if prev['N'] > 0 else '⬇️ Depletes nitrogen',
-                '🌱 Adds phosphorus' if prev['P'] > 0 else '⬇️ Depletes phosphorus',
-                '🌱 Adds potassium' if prev['K'] > 0 else '⬇️ Depletes potassium',
-            ]
-        })
-        st.dataframe(impact_df, use_container_width=True, hide_index=True)
+        st.dataframe(build_static_content()['rotation_impact'][previous_crop], use_container_width=True, hide_index=True)
 
         st.markdown("---")
         st.markdown("##### 📐 How Rotation Works")
@@ -1160,7 +945,7 @@ def page_crop_rotation():
 
     with col_result:
         st.markdown("##### 🏆 Recommended Next Crops")
-        suggestions = suggest_rotation(previous_crop)
+        suggestions = suggest_rotation(previous_crop, top=ROTATION_RANKING_TOP)
 
         if not suggestions:
             st.warning("No rotation data available for this crop.")
@@ -1190,7 +975,7 @@ def page_crop_rotation():
         chain = [previous_crop]
         current = previous_crop
         for _ in range(3):
-            next_suggestions = suggest_rotation(current)
+            next_suggestions = suggest_rotation(current, top=1)
             if next_suggestions:
                 next_crop = next_suggestions[0]['crop']
                 chain.append(next_crop)
@@ -1207,7 +992,8 @@ def page_crop_rotation():
 
         # Full ranking
         st.markdown("")
-        st.markdown("##### 📋 Full Ranking")
+        st.markdown("##### 📋 Full Ranking" if len(KB) - 1 <= ROTATION_RANKING_TOP
+                    else f"##### 📋 Top {ROTATION_RANKING_TOP} Ranking")
         rank_df = pd.DataFrame([{
             'Rank': i + 1,
             'Crop': f"{s['emoji']} {s['crop']}",
@@ -1231,16 +1017,10 @@ def page_soil_health():
 
     with col_input:
         st.markdown("##### 🌾 Select Target Crop")
-        crop_list = list(CROP_REQUIREMENTS.keys())
-        crop_emojis = {c: CROP_NUTRIENT_IMPACT.get(c, {}).get('emoji', '🌱') for c in crop_list}
-        crop_options = ['General (ICAR Standard)'] + [f"{crop_emojis[c]} {c}" for c in crop_list]
-        selected_option = st.selectbox("Crop", crop_options, key="health_crop", label_visibility="collapsed")
-
-        # Parse selection
-        if selected_option == 'General (ICAR Standard)':
-            selected_crop = None
-        else:
-            selected_crop = selected_option.split(' ', 1)[1]  # Remove emoji prefix
+        static = build_static_content()
+        selected_option = st.selectbox("Crop", list(static['health_options']), key="health_crop",
+                                       label_visibility="collapsed")
+        selected_crop = static['health_options'][selected_option]
 
         st.markdown("##### 📊 Enter Soil Values")
         n_val = st.number_input("Nitrogen (N) — mg/kg", value=100.0, min_value=0.0, max_value=500.0, step=1.0, key="health_n")
@@ -1251,33 +1031,12 @@ def page_soil_health():
         # Reference table — dynamic based on crop selection
         st.markdown("---")
         if selected_crop and selected_crop in CROP_REQUIREMENTS:
-            req = CROP_REQUIREMENTS[selected_crop]
-            emoji = crop_emojis.get(selected_crop, '🌱')
-            st.markdown(f"##### 📋 {emoji} {selected_crop} — Optimal NPK Ranges")
-            ref_df = pd.DataFrame({
-                'Nutrient': ['Nitrogen (N)', 'Phosphorus (P)', 'Potassium (K)'],
-                'Optimal Range (mg/kg)': [
-                    f"{req['N'][0]} – {req['N'][1]}",
-                    f"{req['P'][0]} – {req['P'][1]}",
-                    f"{req['K'][0]} – {req['K'][1]}"
-                ],
-                'Midpoint (mg/kg)': [
-                    f"{(req['N'][0]+req['N'][1])//2}",
-                    f"{(req['P'][0]+req['P'][1])//2}",
-                    f"{(req['K'][0]+req['K'][1])//2}"
-                ]
-            })
-            st.dataframe(ref_df, use_container_width=True, hide_index=True)
+            st.markdown(f"##### 📋 {selected_option} — Optimal NPK Ranges")
+            st.dataframe(static['crop_reference'][selected_crop], use_container_width=True, hide_index=True)
             st.caption(f"Optimal ranges are specific to **{selected_crop}** cultivation requirements.")
         else:
             st.markdown("##### 📋 ICAR Standard Benchmarks (mg/kg)")
-            bench_df = pd.DataFrame({
-                'Rating': ['Very Low', 'Low', 'Medium ✅', 'High', 'Very High'],
-                'N (mg/kg)': ['< 50', '50 – 108', '108 – 215', '215 – 320', '> 320'],
-                'P (mg/kg)': ['< 5', '5 – 11', '11 – 25', '25 – 50', '> 50'],
-                'K (mg/kg)': ['< 36', '36 – 55', '55 – 125', '125 – 200', '> 200'],
-            })
-            st.dataframe(bench_df, use_container_width=True, hide_index=True)
+            st.dataframe(static['icar_benchmarks'], use_container_width=True, hide_index=True)
             st.caption("Source: ICAR Soil Testing Standards, Soil Health Card Scheme (Govt. of India)")
 
     with col_result:
@@ -1290,7 +1049,7 @@ def page_soil_health():
                     'P': req['P'],
                     'K': req['K'],
                 }
-                mode_label = f"{crop_emojis.get(selected_crop, '🌱')} {selected_crop}"
+                mode_label = selected_option
             else:
                 opt_ranges = {
                     'N': SOIL_NPK_BENCHMARKS['N']['optimal_range'],
@@ -1410,7 +1169,7 @@ def page_soil_health():
                 font=dict(color='#94a3b8'),
                 margin=dict(t=30, b=30)
             )
-            st.plotly_chart(fig, use_container_width=True, key="soil_health_radar_chart", config={'responsive': True, 'displayModeBar': False})
+            st.plotly_chart(fig, use_container_width=True, key="soil_health_radar_chart", config=CHART_CONFIG)
 
             # ── Interpretation ──
             st.markdown("##### 📝 Interpretation")
@@ -1505,51 +1264,22 @@ def page_seasonal_calendar():
     current_season = get_current_season()
     st.markdown(f"Current season: **{current_season}** (as of {datetime.now().strftime('%B %Y')})")
 
-    for season_name, info in CROP_SEASONS.items():
-        is_active = season_name == current_season
-        active_class = "season-active" if is_active else ""
-        active_marker = " — 📍 CURRENT" if is_active else ""
-
-        st.markdown(f"""
-        <div class="info-card" style="margin-bottom: 1rem; {'border-color: #22c55e; box-shadow: 0 0 20px rgba(34,197,94,0.1);' if is_active else ''}">
-            <h4>
-                <span class="season-badge {info['color']} {active_class}">{season_name}</span>
-                &nbsp; {info['months']}{active_marker}
-            </h4>
-            <p style="margin-top: 0.75rem;">
-                {"&nbsp;&nbsp;".join(f"{CROP_NUTRIENT_IMPACT.get(c, {}).get('emoji', '🌱')} <strong>{c}</strong>" for c in info['crops'])}
-            </p>
-        </div>""", unsafe_allow_html=True)
+    static = build_static_content()
+    for season_name in CROP_SEASONS:
+        st.markdown(static['season_cards'][season_name][season_name == current_season], unsafe_allow_html=True)
 
     # Interactive season timeline
     st.markdown("")
     st.markdown("##### 🗓️ Season × Crop Matrix")
-    matrix_data = []
-    for crop in CROP_NUTRIENT_IMPACT:
-        row = {'Crop': f"{CROP_NUTRIENT_IMPACT[crop]['emoji']} {crop}"}
-        for sn, si in CROP_SEASONS.items():
-            row[sn] = "✅" if crop in si['crops'] else "—"
-        matrix_data.append(row)
-    st.dataframe(pd.DataFrame(matrix_data), use_container_width=True, hide_index=True)
+    st.dataframe(static['season_matrix'], use_container_width=True, hide_index=True)
 
     # Seasonal recommendations
     st.markdown("")
     st.markdown(f"##### 🌟 Best Crops for This Season ({current_season})")
-    current_crops = CROP_SEASONS[current_season]['crops']
-    cols = st.columns(min(len(current_crops), 5))
-    for i, crop in enumerate(current_crops):
-        info = CROP_NUTRIENT_IMPACT.get(crop, {})
-        req = CROP_REQUIREMENTS.get(crop, {})
-        with cols[i]:
-            n_range = f"{req.get('N', (0,0))[0]}–{req.get('N', (0,0))[1]}"
-            p_range = f"{req.get('P', (0,0))[0]}–{req.get('P', (0,0))[1]}"
-            k_range = f"{req.get('K', (0,0))[0]}–{req.get('K', (0,0))[1]}"
-            st.markdown(f"""
-            <div class="info-card" style="text-align: center;">
-                <div style="font-size: 2.5rem;">{info.get('emoji', '🌱')}</div>
-                <h4 style="margin: 0.5rem 0 0.25rem;">{crop}</h4>
-                <p style="font-size: 0.8rem; margin: 0;">N: {n_range}<br>P: {p_range}<br>K: {k_range}</p>
-            </div>""", unsafe_allow_html=True)
+    crop_cards = static['season_crop_cards'][current_season]
+    for col, card in zip(st.columns(min(len(crop_cards), 5)), crop_cards):
+        with col:
+            st.markdown(card, unsafe_allow_html=True)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1557,76 +1287,80 @@ def page_seasonal_calendar():
 # ═══════════════════════════════════════════════════════════════════════════════
 def page_npk_history():
     st.markdown('<div class="section-header">📈 NPK Reading History</div>', unsafe_allow_html=True)
-    st.markdown("Track your soil readings across this session to observe trends.")
-
-    # Initialize history
-    if 'npk_history' not in st.session_state:
-        st.session_state.npk_history = []
+    st.markdown("Track your soil readings per field over time to observe trends. Readings are saved and persist across sessions.")
 
+    store = get_history_store()
     col_input, col_chart = st.columns([1, 2], gap="large")
 
     with col_input:
+        st.markdown("##### 🏷️ Field")
+        field = st.text_input("Field", value=get_active_field(), label_visibility="collapsed").strip() or DEFAULT_FIELD
+        st.session_state['active_field'] = field
+
         st.markdown("##### ➕ Add New Reading")
         with st.form("history_form"):
             h_n = st.number_input("N (mg/kg)", value=100.0, min_value=0.0, max_value=300.0, step=1.0, key="h_n")
             h_p = st.number_input("P (mg/kg)", value=50.0, min_value=0.0, max_value=200.0, step=1.0, key="h_p")
             h_k = st.number_input("K (mg/kg)", value=80.0, min_value=0.0, max_value=250.0, step=1.0, key="h_k")
-            h_note = st.text_input("Note (optional)", placeholder="e.g., Field A, post-harvest")
+            h_note = st.text_input("Note (optional)", placeholder="e.g., post-harvest")
             add_btn = st.form_submit_button("📌 Add Reading", use_container_width=True)
 
         if add_btn:
-            st.session_state.npk_history.append({
-                'time': datetime.now().strftime('%H:%M:%S'),
-                'N': h_n, 'P': h_p, 'K': h_k,
-                'note': h_note or f"Reading #{len(st.session_state.npk_history) + 1}"
-            })
+            store.add_reading(
+                HISTORY_USER, field, h_n, h_p, h_k,
+                note=h_note or f"Reading #{store.count(HISTORY_USER, field) + 1}"
+            )
             st.rerun()
 
-        if st.button("🗑️ Clear All History", use_container_width=True):
-            st.session_state.npk_history = []
+        if st.button("🗑️ Clear Field History", use_container_width=True):
+            store.clear(HISTORY_USER, field)
             st.rerun()
 
     with col_chart:
-        history = st.session_state.npk_history
-        if len(history) == 0:
+        total = store.count(HISTORY_USER, field)
+        if total == 0:
             st.info("No readings yet. Add soil readings from the form or from the **Crop Prediction** page.")
         else:
-            st.markdown(f"##### 📊 {len(history)} Reading(s)")
-
-            # Trend chart
-            hist_df = pd.DataFrame(history)
-            if 'note' not in hist_df.columns:
-                hist_df['note'] = [f"Reading #{i+1}" for i in range(len(hist_df))]
-            hist_df['Reading'] = range(1, len(hist_df) + 1)
+            st.markdown(f"##### 📊 {total} Reading(s) — {field}")
+
+            # Running aggregates over the full history (maintained on write)
+            agg = store.aggregates(HISTORY_USER, field)
+            ag1, ag2, ag3 = st.columns(3)
+            for col, nut in zip([ag1, ag2, ag3], ['N', 'P', 'K']):
+                col.metric(f"Avg {nut} (mg/kg)", f"{agg['mean'][nut]:.1f}",
+                           help=f"Min {agg['min'][nut]:.0f} · Max {agg['max'][nut]:.0f}")
+
+            # Trend chart — downsampled so the payload stays constant-size
+            series = get_field_series(HISTORY_USER, field)
+            series.sync(store, HISTORY_USER, field)
+            raw, rolling = series.chart_points(HISTORY_CHART_POINTS)
+            fig = build_history_chart(raw, rolling, HISTORY_ROLLING_WINDOW)
+            st.plotly_chart(fig, use_container_width=True, key="npk_trend_chart", config=CHART_CONFIG)
+            if total > HISTORY_CHART_POINTS:
+                st.caption(f"Showing {HISTORY_CHART_POINTS} representative points of {total} readings.")
+
+            # Rolling window stats as of the latest reading
+            latest = series.latest_rolling()
+            st.markdown(f"##### 📐 Last {HISTORY_ROLLING_WINDOW} Readings")
+            st.dataframe(pd.DataFrame({
+                'Nutrient': ['N', 'P', 'K'],
+                'Moving Avg': [round(latest[nut]['mean'], 1) for nut in ['N', 'P', 'K']],
+                'Min': [latest[nut]['min'] for nut in ['N', 'P', 'K']],
+                'Max': [latest[nut]['max'] for nut in ['N', 'P', 'K']],
+            }), use_container_width=True, hide_index=True)
 
-            fig = go.Figure()
-            colors = {'N': '#22c55e', 'P': '#f59e0b', 'K': '#60a5fa'}
-            for nut in ['N', 'P', 'K']:
-                fig.add_trace(go.Scatter(
-                    x=hist_df['Reading'], y=hist_df[nut],
-                    mode='lines+markers',
-                    name=nut,
-                    line=dict(color=colors[nut], width=3),
-                    marker=dict(size=8)
-                ))
-            fig.update_layout(
-                title="NPK Trends Across Readings",
-                xaxis_title="Reading #",
-                yaxis_title="mg/kg",
-                height=350,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#94a3b8'),
-                legend=dict(orientation='h', y=1.15)
-            )
-            st.plotly_chart(fig, use_container_width=True, key="npk_trend_chart", config={'responsive': True, 'displayModeBar': False})
-
-            # History table
-            display_df = hist_df[['Reading', 'time', 'N', 'P', 'K']].copy()
-            if 'crop' in hist_df.columns:
-                display_df['Predicted Crop'] = hist_df['crop']
-            if 'note' in hist_df.columns:
-                display_df['Note'] = hist_df['note']
+            # History table — one page at a time, latest readings first
+            n_pages = max(1, math.ceil(total / HISTORY_PAGE_SIZE))
+            page_no = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1, key="history_page")
+            offset = (page_no - 1) * HISTORY_PAGE_SIZE
+            rows = store.page(HISTORY_USER, field, limit=HISTORY_PAGE_SIZE, offset=offset)
+            display_df = pd.DataFrame({
+                'Reading': [total - offset - i for i in range(len(rows))],
+                'time': [datetime.fromtimestamp(r['ts']).strftime('%Y-%m-%d %H:%M:%S') for r in rows],
+                'N': [r['N'] for r in rows], 'P': [r['P'] for r in rows], 'K': [r['K'] for r in rows],
+                'Predicted Crop': [r['crop'] for r in rows],
+                'Note': [r['note'] for r in rows],
+            })
             st.dataframe(display_df, use_container_width=True, hide_index=True)
 
 
@@ -1636,43 +1370,9 @@ def page_npk_history():
 def page_about():
     st.markdown('<div class="section-header">📚 About NPK & Soil Science</div>', unsafe_allow_html=True)
 
-    col1, col2, col3 = st.columns(3, gap="medium")
-    with col1:
-        st.markdown("""
-        <div class="info-card">
-            <h4>🔵 Nitrogen (N)</h4>
-            <ul>
-                <li>Essential for leaf & stem growth</li>
-                <li>Promotes lush green foliage</li>
-                <li>Key for protein synthesis</li>
-                <li>Typical range: 40–200 mg/kg</li>
-                <li>Deficiency → yellowing leaves</li>
-            </ul>
-        </div>""", unsafe_allow_html=True)
-    with col2:
-        st.markdown("""
-        <div class="info-card">
-            <h4>🟠 Phosphorus (P)</h4>
-            <ul>
-                <li>Critical for root development</li>
-                <li>Aids flower & fruit formation</li>
-                <li>Energy transfer in plants</li>
-                <li>Typical range: 20–120 mg/kg</li>
-                <li>Deficiency → stunted growth</li>
-            </ul>
-        </div>""", unsafe_allow_html=True)
-    with col3:
-        st.markdown("""
-        <div class="info-card">
-            <h4>🟡 Potassium (K)</h4>
-            <ul>
-                <li>Regulates water uptake</li>
-                <li>Boosts disease resistance</li>
-                <li>Improves fruit quality</li>
-                <li>Typical range: 40–200 mg/kg</li>
-                <li>Deficiency → weak stems</li>
-            </ul>
-        </div>""", unsafe_allow_html=True)
+    for col, card in zip(st.columns(3, gap="medium"), ABOUT_NPK_CARDS):
+        with col:
+            st.markdown(card, unsafe_allow_html=True)
 
     st.markdown('<div class="custom-divider"></div>', unsafe_allow_html=True)
 
@@ -1698,59 +1398,160 @@ def page_about():
             </div>""", unsafe_allow_html=True)
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# PAGE: Admin · Metrics
+# ═══════════════════════════════════════════════════════════════════════════════
+def page_admin_metrics():
+    st.markdown('<div class="section-header">🛠️ Live Latency Metrics</div>', unsafe_allow_html=True)
+
+    if not telemetry.ENABLED:
+        st.info("Telemetry is disabled (NPK_TELEMETRY=0).")
+        return
+
+    port = os.environ.get("NPK_METRICS_PORT")
+    st.markdown(
+        f"Percentiles cover the last {telemetry.WINDOW} samples per series in this process. "
+        + (f"Prometheus endpoint: `:{port}/metrics`." if port else "Set `NPK_METRICS_PORT` to expose `/metrics`.")
+    )
+
+    rows = telemetry.snapshot()
+    if not rows:
+        st.info("No samples recorded yet.")
+        return
+
+    df = pd.DataFrame(rows)
+    st.dataframe(
+        df.style.format({c: "{:.2f}" for c in ['mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']}),
+        use_container_width=True, hide_index=True,
+    )
+
+    fig = px.bar(
+        df.assign(series=df['metric'].str.replace('npk_', '').str.replace('_seconds', '') + ' ' + df['labels']),
+        x='p95_ms', y='series', orientation='h', log_x=True,
+    )
+    fig.update_layout(
+        template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        height=max(300, 28 * len(df)), margin=dict(l=10, r=10, t=10, b=10),
+        xaxis_title="p95 latency (ms, log scale)", yaxis_title="",
+        font=dict(family="Inter"),
+    )
+    st.plotly_chart(fig, use_container_width=True, config=CHART_CONFIG)
+
+    if st.button("♻️ Reset metrics"):
+        telemetry.REGISTRY.reset()
+        st.rerun()
+    with st.expander("Prometheus exposition"):
+        st.code(telemetry.render_prometheus(), language="text")
+
+    st.markdown("##### 🗂️ Model Registry")
+    live = get_live_model()
+    registry = live.registry
+    versions = registry.versions()
+    if not versions:
+        st.info(f"No registered versions in `{registry.root}`; serving `{live.fallback_path}`. "
+                "Register one with `python -m src.model_registry register --activate`.")
+    else:
+        active, shadow = registry.active(), registry.shadow()
+        metas = [registry.meta(v) for v in versions]
+        st.dataframe(pd.DataFrame([{
+            "version": m["version"],
+            "status": "active" if m["version"] == active else "shadow" if m["version"] == shadow else "",
+            "created": m["created"],
+            "sha256": m["sha256"][:12],
+            "size_mb": m["size_bytes"] / 2 ** 20,
+            "accuracy": m.get("accuracy"),
+            "p50_ms": m["latency"]["single_p50_ms"],
+            "rows_per_s": m["latency"]["batch_rows_per_s"],
+            "note": m.get("note") or "",
+        } for m in reversed(metas)]), use_container_width=True, hide_index=True)
+        st.caption(f"Serving **{live.version or 'fallback bundle'}** in this process.")
+    if live.shadow is not None:
+        st.json(live.shadow.stats())
+
+    st.markdown("##### 🏘️ Tenant Models")
+    cache = get_model_cache()
+    if not len(cache):
+        st.info(f"No tenant models loaded. Bundles in `{cache.root}` (`<tenant>.pkl` or a registry "
+                "directory) are served with `?tenant=<id>`.")
+    else:
+        st.dataframe(pd.DataFrame(reversed(cache.stats())), use_container_width=True, hide_index=True)
+        st.caption(f"{len(cache)} resident, {cache.resident_bytes / 2 ** 20:.1f} of "
+                   f"{cache.max_bytes / 2 ** 20:.0f} MiB, {cache.evictions} evicted.")
+
+    st.markdown("##### 🔥 Recent Profiles")
+    st.markdown("Add `&profile=1` to the URL to profile the next page render. "
+                "Files are collapsed stacks for flamegraph.pl, inferno or speedscope.")
+    profiles = profiling.list_profiles(PROFILE_DIR, limit=20)
+    if not profiles:
+        st.info("No profiles recorded yet.")
+    for path, size, mtime in profiles:
+        name = os.path.basename(path)
+        with open(path, "rb") as f:
+            st.download_button(f"⬇️ {name} ({size / 1024:.1f} KB)", f.read(), file_name=name, key=f"prof_{name}")
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # MAIN APP
 # ═══════════════════════════════════════════════════════════════════════════════
 def main():
     render_hero()
 
-    # Load model
-    model_data = load_model()
+    # Per-process startup work (cached): metrics endpoint and static reference content
+    start_metrics_endpoint()
+    build_static_content()
+    pages = [
+        "🌾 Crop Prediction",
+        "🧪 NPK Additions",
+        "🔄 Crop Rotation Advisor",
+        "💚 Soil Health Score",
+        "📅 Seasonal Calendar",
+        "📈 NPK History",
+        "📚 About NPK",
+    ]
+    if is_admin():
+        pages.append(ADMIN_PAGE)
 
     # Sidebar navigation
     with st.sidebar:
         st.markdown("### 🧭 Navigation")
-        page = st.radio(
-            "Choose a tool:",
-            [
-                "🌾 Crop Prediction",
-                "🧪 NPK Additions",
-                "🔄 Crop Rotation Advisor",
-                "💚 Soil Health Score",
-                "📅 Seasonal Calendar",
-                "📈 NPK History",
-                "📚 About NPK",
-            ],
-            label_visibility="collapsed"
-        )
+        page = st.radio("Choose a tool:", pages, key="nav_page", label_visibility="collapsed")
 
         st.markdown("---")
         st.markdown("##### 📊 Quick Stats")
-        history = st.session_state.get('npk_history', [])
-        st.metric("Readings This Session", len(history))
+        st.metric("Stored Readings", get_history_store().count(HISTORY_USER, get_active_field()))
         current_season = get_current_season()
         st.metric("Current Season", current_season)
         st.metric("Crops Supported", len(CROP_NUTRIENT_IMPACT))
 
-    # Page routing
-    if model_data is None and page in ["🌾 Crop Prediction", "🧪 NPK Additions"]:
-        st.error("Model not loaded. Please ensure the trained model file exists in the `models/` directory.")
-        return
+    # Page routing; only the model-backed pages load the model
+    model_data = None
+    if page in MODEL_PAGES:
+        model_data = load_model()
+        if model_data is None:
+            st.error("Model not loaded. Please ensure the trained model file exists in the `models/` directory.")
+            return
 
-    if page == "🌾 Crop Prediction":
-        page_crop_prediction(model_data)
-    elif page == "🧪 NPK Additions":
-        page_npk_additions(model_data)
-    elif page == "🔄 Crop Rotation Advisor":
-        page_crop_rotation()
-    elif page == "💚 Soil Health Score":
-        page_soil_health()
-    elif page == "📅 Seasonal Calendar":
-        page_seasonal_calendar()
-    elif page == "📈 NPK History":
-        page_npk_history()
-    elif page == "📚 About NPK":
-        page_about()
+    page_name = page.split(" ", 1)[1]
+    with telemetry.timer("npk_page_render_seconds", page=page_name), \
+            profiling.profile(f"page-{page_name}", enabled=profiling_requested(), directory=PROFILE_DIR) as prof:
+        if page == "🌾 Crop Prediction":
+            page_crop_prediction(model_data)
+        elif page == "🧪 NPK Additions":
+            page_npk_additions(model_data)
+        elif page == "🔄 Crop Rotation Advisor":
+            page_crop_rotation()
+        elif page == "💚 Soil Health Score":
+            page_soil_health()
+        elif page == "📅 Seasonal Calendar":
+            page_seasonal_calendar()
+        elif page == "📈 NPK History":
+            page_npk_history()
+        elif page == "📚 About NPK":
+            page_about()
+        elif page == ADMIN_PAGE:
+            page_admin_metrics()
+    if prof.path:
+        st.sidebar.caption(f"🔥 Profile saved: `{os.path.basename(prof.path)}`")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,41 @@
+"""
+Benchmarks for the agronomy scoring helpers used on every page render.
+"""
+
+import numpy as np
+
+from src.agronomy import (
+    compute_soil_health, get_nutrient_status, suggest_rotation,
+    recommend_additions, crop_suitability, rank_crop_suitability,
+)
+
+# A fixed spread of readings covering every ICAR band
+READINGS = np.random.default_rng(0).uniform([0, 0, 0], [400, 80, 300], size=(256, 3)).tolist()
+
+
+class BenchScoring:
+    """Per-reading scoring functions (256 readings per round)."""
+
+    def bench_compute_soil_health(self, benchmark):
+        benchmark(lambda: [compute_soil_health(n, p, k) for n, p, k in READINGS])
+
+    def bench_get_nutrient_status(self, benchmark):
+        benchmark(lambda: [get_nutrient_status(v, nut) for r in READINGS for v, nut in zip(r, "NPK")])
+
+    def bench_crop_suitability(self, benchmark):
+        benchmark(lambda: [crop_suitability(n, p, k, "Wheat") for n, p, k in READINGS])
+
+    def bench_rank_crop_suitability(self, benchmark):
+        benchmark(lambda: [rank_crop_suitability(n, p, k) for n, p, k in READINGS])
+
+    def bench_recommend_additions(self, benchmark):
+        benchmark(lambda: [recommend_additions(n, p, k, "Tomato") for n, p, k in READINGS])
+
+
+class BenchRotation:
+    """Rotation advice for every crop in the catalogue."""
+
+    def bench_suggest_rotation(self, benchmark):
+        from src.agronomy import CROP_NUTRIENT_IMPACT
+        crops = list(CROP_NUTRIENT_IMPACT)
+        benchmark(lambda: [suggest_rotation(c) for c in crops])
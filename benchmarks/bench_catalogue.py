@@ -0,0 +1,59 @@
+"""
+Crop-catalogue scaling benchmarks (10, 100 and 1000 crops).
+
+The `page_*` benchmarks replay the crop-wise calls one page render makes;
+with top-k selection their growth should stay well below the 100x growth
+of the catalogue. `full_*` benchmarks rank the whole catalogue for contrast.
+"""
+
+from src.agronomy import rank_crop_suitability, suggest_rotation
+from src.knowledge_base import NUTRIENTS
+
+READING = (95.0, 45.0, 55.0)
+
+
+class BenchSuitability:
+    """Suitability ranking as used by the Crop Prediction page."""
+
+    def bench_page_rank_top15(self, benchmark, catalogue, n_crops):
+        kb = catalogue(n_crops)
+        benchmark(rank_crop_suitability, *READING, top=15, kb=kb)
+
+    def bench_full_rank(self, benchmark, catalogue, n_crops):
+        kb = catalogue(n_crops)
+        benchmark(rank_crop_suitability, *READING, kb=kb)
+
+    def bench_season_rank_top5(self, benchmark, catalogue, n_crops):
+        kb = catalogue(n_crops)
+        benchmark(rank_crop_suitability, *READING, top=5, season=kb.seasons[1], kb=kb)
+
+
+class BenchRotationCatalogue:
+    """Rotation advice as used by the Crop Rotation page (ranking + 3-season chain)."""
+
+    def bench_page_rotation(self, benchmark, catalogue, n_crops):
+        kb = catalogue(n_crops)
+
+        def page():
+            suggest_rotation("Rice", top=25, kb=kb)
+            current = "Rice"
+            for _ in range(3):
+                current = suggest_rotation(current, top=1, kb=kb)[0]["crop"]
+
+        benchmark(page)
+
+    def bench_full_rotation(self, benchmark, catalogue, n_crops):
+        kb = catalogue(n_crops)
+        benchmark(suggest_rotation, "Rice", kb=kb)
+
+
+class BenchCompile:
+    """One-off cost of compiling the catalogue from its data document."""
+
+    def bench_compile(self, benchmark, n_crops):
+        from benchmarks.synthetic import make_catalogue
+        from src.knowledge_base import KnowledgeBase
+
+        doc = make_catalogue(n_crops)
+        kb = benchmark(KnowledgeBase, doc)
+        assert len(kb) == n_crops and len(NUTRIENTS) == kb.req_low.shape[1]
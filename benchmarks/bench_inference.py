@@ -0,0 +1,118 @@
+"""
+Benchmarks for model loading and crop prediction.
+"""
+
+import importlib.util
+import os
+
+import joblib
+import pytest
+
+from benchmarks.conftest import MODEL_PATH, ROOT
+from src.agronomy import predict_crop, predict_crops
+from src.compiled_model import compile_bundle
+from src.inference import predict_top_k, top_crops
+from src.parallel_inference import ParallelPredictor
+
+# 1 worker, then doublings up to every core
+WORKER_COUNTS = sorted({1, *[2 ** i for i in range(1, 6) if 2 ** i <= (os.cpu_count() or 1)], os.cpu_count() or 1})
+
+
+class BenchPrediction:
+    """Single-reading and batch prediction."""
+
+    def bench_predict_crop_single(self, benchmark, model_data):
+        benchmark(predict_crop, 100.0, 50.0, 80.0, model_data)
+
+    def bench_predict_crops_batch(self, benchmark, model_data, synthetic, n_rows):
+        X = synthetic(n_rows)[["N", "P", "K"]].to_numpy()
+        benchmark.pedantic(predict_crops, args=(X, model_data), rounds=3 if n_rows >= 10 ** 6 else 10)
+
+
+class BenchTopK:
+    """Top-k probabilities: integer-coded batch output vs. per-row dicts sorted afterwards."""
+
+    def bench_top_crops_single(self, benchmark, model_data):
+        benchmark(top_crops, 100.0, 50.0, 80.0, model_data, 3)
+
+    def bench_predict_top_k_batch(self, benchmark, model_data, synthetic, n_rows):
+        X = synthetic(n_rows)[["N", "P", "K"]].to_numpy()
+        benchmark.pedantic(predict_top_k, args=(X, model_data, 3), rounds=3 if n_rows >= 10 ** 6 else 10)
+
+    def bench_prob_dicts_batch(self, benchmark, model_data, synthetic, n_rows):
+        """The previous approach: one dict per row, sorted to pick three."""
+        X = synthetic(n_rows)[["N", "P", "K"]].to_numpy()
+        names = list(model_data["target_names"])
+
+        def dicts():
+            proba = model_data["model"].predict_proba(model_data["scaler"].transform(X))
+            return [sorted(zip(names, row), key=lambda x: x[1], reverse=True)[:3] for row in proba]
+
+        benchmark.pedantic(dicts, rounds=3 if n_rows >= 10 ** 6 else 10)
+
+
+class BenchCompiled:
+    """Compiled raw-input forest vs. the scaler + sklearn forest + label encoder chain."""
+
+    def bench_sklearn_chain_single(self, benchmark, model_data):
+        def chain():
+            X = model_data["scaler"].transform([[100.0, 50.0, 80.0]])
+            return model_data["label_encoder"].inverse_transform(model_data["model"].predict(X))
+
+        benchmark(chain)
+
+    def bench_compiled_single(self, benchmark, model_data):
+        forest = compile_bundle(model_data)
+        benchmark(lambda: forest.decode(forest.predict_codes([[100.0, 50.0, 80.0]])))
+
+    def bench_sklearn_chain_batch(self, benchmark, model_data, synthetic, n_rows):
+        X = synthetic(n_rows)[["N", "P", "K"]].to_numpy()
+        benchmark.pedantic(lambda: model_data["model"].predict_proba(model_data["scaler"].transform(X)),
+                           rounds=3 if n_rows >= 10 ** 6 else 10)
+
+    def bench_compiled_batch(self, benchmark, model_data, synthetic, n_rows):
+        X = synthetic(n_rows)[["N", "P", "K"]].to_numpy()
+        forest = compile_bundle(model_data)
+        benchmark.pedantic(forest.predict_proba, args=(X,), rounds=3 if n_rows >= 10 ** 6 else 10)
+
+    def bench_anytime_single(self, benchmark, model_data):
+        """Early-exit voting; compare with bench_compiled_single."""
+        forest = compile_bundle(model_data)
+        benchmark(forest.predict_anytime, [[100.0, 50.0, 80.0]])
+
+    def bench_anytime_batch(self, benchmark, model_data, synthetic, n_rows):
+        X = synthetic(n_rows)[["N", "P", "K"]].to_numpy()
+        forest = compile_bundle(model_data)
+        benchmark.pedantic(forest.predict_anytime, args=(X,), rounds=3 if n_rows >= 10 ** 6 else 10)
+        benchmark.extra_info["mean_trees"] = float(forest.predict_anytime(X)[1].mean())
+
+    def bench_compile_bundle(self, benchmark, model_data):
+        benchmark.pedantic(compile_bundle, args=(model_data,), rounds=5)
+
+
+class BenchParallel:
+    """Process-pool batch scoring; rows/s should grow near-linearly with workers."""
+
+    @pytest.mark.parametrize("workers", WORKER_COUNTS, ids=[f"{w}w" for w in WORKER_COUNTS])
+    def bench_parallel_predict(self, benchmark, model_data, synthetic, n_rows, workers):
+        X = synthetic(n_rows)[["N", "P", "K"]].to_numpy()
+        with ParallelPredictor(model_data, workers=workers).start() as predictor:
+            benchmark.pedantic(predictor.predict, args=(X,), rounds=3 if n_rows >= 10 ** 6 else 5)
+        if benchmark.stats is not None:  # None under --benchmark-disable
+            benchmark.extra_info["rows_per_s"] = n_rows / benchmark.stats["median"]
+
+
+class BenchModelLoad:
+    """Loading the model bundle from disk (cold) and through the app's cache (warm)."""
+
+    def bench_load_model_cold(self, benchmark):
+        benchmark.pedantic(joblib.load, args=(MODEL_PATH,), rounds=10)
+
+    def bench_load_model_warm(self, benchmark):
+        streamlit = pytest.importorskip("streamlit")  # noqa: F841
+        spec = importlib.util.spec_from_file_location(
+            "npk_app", os.path.join(ROOT, "app", "npk_crop_recommendation_app.py"))
+        app = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(app)  # bare mode: st.* page calls are no-ops
+        app.load_model()              # prime the cache
+        benchmark(app.load_model)
@@ -0,0 +1,46 @@
+"""
+Benchmarks for the src/ pipeline stages on synthetic data (10^3 .. 10^7 rows).
+"""
+
+import os
+
+import joblib
+import numpy as np
+
+from src.data_preprocessing import load_params, preprocess
+from src.evaluate import evaluate_model
+from src.train import train_model
+
+from benchmarks.conftest import ROOT
+
+PARAMS = load_params(os.path.join(ROOT, "params.yaml"))
+
+
+def _rounds(n_rows):
+    return 1 if n_rows >= 10 ** 5 else 3
+
+
+class BenchStages:
+    """preprocess → train → evaluate, each timed on its own."""
+
+    def bench_preprocess(self, benchmark, synthetic, n_rows):
+        df = synthetic(n_rows)
+        benchmark.pedantic(preprocess, args=(df,), kwargs={"test_size": PARAMS["data"]["test_size"]},
+                           rounds=_rounds(n_rows))
+
+    def bench_train_model(self, benchmark, synthetic, n_rows):
+        data = preprocess(synthetic(n_rows), test_size=PARAMS["data"]["test_size"])
+        benchmark.pedantic(train_model, args=(data["X_train"], data["y_train"], PARAMS["model"]),
+                           rounds=_rounds(n_rows))
+
+    def bench_evaluate_model(self, benchmark, synthetic, n_rows, tmp_path):
+        data = preprocess(synthetic(n_rows), test_size=PARAMS["data"]["test_size"])
+        model = train_model(data["X_train"], data["y_train"], PARAMS["model"])
+        data_dir, reports_dir = tmp_path / "processed", tmp_path / "reports"
+        data_dir.mkdir()
+        np.save(data_dir / "X_test.npy", data["X_test"])
+        np.save(data_dir / "y_test.npy", data["y_test"])
+        joblib.dump({"target_names": data["target_names"]}, data_dir / "metadata.pkl")
+        joblib.dump({"model": model}, tmp_path / "model.pkl")
+        benchmark.pedantic(evaluate_model, args=(str(tmp_path / "model.pkl"), str(data_dir), str(reports_dir)),
+                           rounds=_rounds(n_rows))
@@ -0,0 +1,51 @@
+"""
+Cold-start benchmarks: each round starts a fresh interpreter, as a new
+container or Hugging Face Space worker would.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.conftest import ROOT
+
+APP_PATH = os.path.join(ROOT, "app", "npk_crop_recommendation_app.py")
+
+# Module import only: __name__ != "__main__", so main() does not run
+IMPORT_APP = f"import runpy; runpy.run_path({APP_PATH!r}, run_name='npk_app')"
+
+# Full first render of one page through Streamlit's script runner
+FIRST_RENDER = f"""
+import sys
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({APP_PATH!r}, default_timeout=120)
+at.session_state["nav_page"] = sys.argv[1]
+at.run()
+assert not at.exception, at.exception
+"""
+
+
+def _python(code, *args):
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    subprocess.run([sys.executable, "-c", code, *args], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class BenchStartup:
+    """Interpreter start + imports, and time to first rendered page."""
+
+    def bench_import_streamlit(self, benchmark):
+        benchmark.pedantic(_python, args=("import streamlit",), rounds=5)
+
+    def bench_import_app_module(self, benchmark):
+        pytest.importorskip("streamlit")
+        benchmark.pedantic(_python, args=(IMPORT_APP,), rounds=5)
+
+    @pytest.mark.parametrize("page", ["📚 About NPK", "📅 Seasonal Calendar", "🌾 Crop Prediction"],
+                             ids=["about", "calendar", "prediction"])
+    def bench_first_render(self, benchmark, tmp_path, monkeypatch, page):
+        pytest.importorskip("streamlit")
+        monkeypatch.setenv("NPK_HISTORY_DB", str(tmp_path / "history.db"))
+        benchmark.pedantic(_python, args=(FIRST_RENDER, page), rounds=3)
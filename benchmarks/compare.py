@@ -0,0 +1,86 @@
+"""
+Benchmark Regression Check
+- Loads two pytest-benchmark JSON files (a saved baseline and a new run)
+- Computes p50 / p99 per benchmark from the raw round timings
+- Exits non-zero when any benchmark regresses beyond the thresholds
+
+Usage:
+    pytest benchmarks/ --benchmark-json=benchmarks/results/baseline.json   # once, on main
+    pytest benchmarks/ --benchmark-json=benchmarks/results/current.json    # on the change
+    python benchmarks/compare.py benchmarks/results/baseline.json benchmarks/results/current.json
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+
+def load_percentiles(path):
+    """Return {benchmark fullname: (p50, p99)} in seconds from a pytest-benchmark JSON file."""
+    with open(path, "r") as f:
+        report = json.load(f)
+    out = {}
+    for bench in report["benchmarks"]:
+        stats = bench["stats"]
+        data = stats.get("data")
+        if data:
+            p50, p99 = np.percentile(data, [50, 99])
+        else:
+            # Saved without --benchmark-save-data: fall back to median / max
+            p50, p99 = stats["median"], stats["max"]
+        out[bench["fullname"]] = (float(p50), float(p99))
+    return out
+
+
+def compare(baseline, current, p50_threshold=0.10, p99_threshold=0.25):
+    """Compare two percentile maps and return (rows, regressions).
+
+    A benchmark regresses when its p50 grows by more than p50_threshold or
+    its p99 by more than p99_threshold (fractions, e.g. 0.10 = +10%).
+    """
+    rows, regressions = [], []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            rows.append((name, None, None, "only in " + ("current" if name in current else "baseline")))
+            continue
+        (b50, b99), (c50, c99) = baseline[name], current[name]
+        d50 = c50 / b50 - 1 if b50 else 0.0
+        d99 = c99 / b99 - 1 if b99 else 0.0
+        failed = d50 > p50_threshold or d99 > p99_threshold
+        rows.append((name, d50, d99, "REGRESSED" if failed else "ok"))
+        if failed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when benchmarks regress against a baseline")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed p50 growth (default 0.10)")
+    parser.add_argument("--p99-threshold", type=float, default=0.25, help="Allowed p99 growth (default 0.25)")
+    args = parser.parse_args()
+
+    rows, regressions = compare(
+        load_percentiles(args.baseline), load_percentiles(args.current),
+        args.threshold, args.p99_threshold,
+    )
+
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"{'Benchmark':<{width}}  {'Δp50':>8}  {'Δp99':>8}  Status")
+    for name, d50, d99, status in rows:
+        if d50 is None:
+            print(f"{name:<{width}}  {'':>8}  {'':>8}  {status}")
+        else:
+            print(f"{name:<{width}}  {d50:>+8.1%}  {d99:>+8.1%}  {status}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed beyond p50 +{args.threshold:.0%} / p99 +{args.p99_threshold:.0%}")
+        sys.exit(1)
+    print("\n✅ No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Shared fixtures for the benchmark suite.
+
+Row-scaled benchmarks take an `n_rows` parameter covering 10^3 .. 10^7 rows.
+Sizes above --bench-max-rows (default 10^5, or $NPK_BENCH_MAX_ROWS) are
+skipped so a default run finishes in minutes; raise the limit for full
+capacity runs.
+
+Catalogue-scaled benchmarks take an `n_crops` parameter (10, 100, 1000).
+"""
+
+import os
+import sys
+import warnings
+
+import joblib
+import pytest
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+MODEL_PATH = os.path.join(ROOT, "models", "npk_crop_model.pkl")
+CSV_PATH = os.path.join(ROOT, "data", "Crop_recommendation.csv")
+ROW_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+CATALOGUE_SIZES = [10, 100, 1000]
+
+# Bundles pickled with another scikit-learn version warn on every load
+warnings.filterwarnings("ignore", message="Trying to unpickle estimator")
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-max-rows", type=int,
+        default=int(os.environ.get("NPK_BENCH_MAX_ROWS", 10 ** 5)),
+        help="Largest synthetic data size to benchmark (default: 100000)",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "n_rows" in metafunc.fixturenames:
+        max_rows = metafunc.config.getoption("--bench-max-rows")
+        sizes = [n for n in ROW_SIZES if n <= max_rows]
+        metafunc.parametrize("n_rows", sizes, ids=[f"{n:.0e}".replace("+0", "") for n in sizes])
+    if "n_crops" in metafunc.fixturenames:
+        metafunc.parametrize("n_crops", CATALOGUE_SIZES, ids=[f"{n}crops" for n in CATALOGUE_SIZES])
+
+
+@pytest.fixture(scope="session")
+def model_data():
+    """The trained model bundle, loaded once."""
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope="session")
+def synthetic():
+    """Memoized synthetic data generator: synthetic(n_rows) -> DataFrame."""
+    from benchmarks.synthetic import make_synthetic
+
+    cache = {}
+
+    def get(n_rows):
+        if n_rows not in cache:
+            cache[n_rows] = make_synthetic(n_rows, CSV_PATH)
+        return cache[n_rows]
+
+    return get
+
+
+@pytest.fixture(scope="session")
+def catalogue():
+    """Memoized compiled catalogues: catalogue(n_crops) -> KnowledgeBase."""
+    from benchmarks.synthetic import make_catalogue
+    from src.knowledge_base import KnowledgeBase
+
+    cache = {}
+
+    def get(n_crops):
+        if n_crops not in cache:
+            cache[n_crops] = KnowledgeBase(make_catalogue(n_crops))
+        return cache[n_crops]
+
+    return get
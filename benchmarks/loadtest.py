@@ -0,0 +1,471 @@
+"""
+Load Test & Capacity Report
+- Drives the Streamlit app headlessly with AppTest: one AppTest per virtual
+  user, all in this process, so sessions share the script caches exactly as
+  they do inside a single `streamlit run` container
+- Optionally drives HTTP endpoints (e.g. the ingestion service) alongside
+- Sweeps concurrency levels with a weighted scenario mix
+- Reports throughput, latency percentiles, memory per session and CPU
+  saturation, and marks the highest concurrency that stays within the SLO
+
+AppTest executes the script without the websocket/protobuf transport, so the
+numbers are script-time capacity: an upper bound on what one container serves.
+AppTest also swaps a few Streamlit globals per run, so a small error rate at
+high concurrency can come from the harness itself; check "Top errors".
+
+Usage:
+    python benchmarks/loadtest.py --concurrency 1,2,4,8 --duration 20
+    python benchmarks/loadtest.py --mix predict=1 --concurrency 4 --duration 10
+    python -m src.ingest &
+    python benchmarks/loadtest.py --sessions-off --http-post http://127.0.0.1:8765/readings --pid $!
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+APP_PATH = os.path.join(ROOT, "app", "npk_crop_recommendation_app.py")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+DEFAULT_MIX = "predict=4,additions=2,health=2,rotation=1,history=1,browse=2"
+
+
+# ─── Process Metrics ──────────────────────────────────────────────────────────
+
+def rss_bytes(pid="self"):
+    """Current resident set size of a process (peak RSS of this one where /proc is unavailable)."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def cpu_seconds(pid="self"):
+    """User + system CPU time consumed by a process."""
+    if pid == "self":
+        t = os.times()
+        return t.user + t.system
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class CpuSampler(threading.Thread):
+    """Samples process CPU utilisation (fraction of one core) at a fixed interval."""
+
+    def __init__(self, pid="self", interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._halt = threading.Event()
+
+    def run(self):
+        last_cpu, last_wall = cpu_seconds(self.pid), time.perf_counter()
+        while not self._halt.wait(self.interval):
+            cpu, wall = cpu_seconds(self.pid), time.perf_counter()
+            self.samples.append((cpu - last_cpu) / (wall - last_wall))
+            last_cpu, last_wall = cpu, wall
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+# ─── App Scenarios ────────────────────────────────────────────────────────────
+# Each scenario drives one AppTest session through `rerun()`, which records the
+# latency of every script run it triggers.
+
+def _goto(at, page):
+    at.sidebar.radio[0].set_value(page)
+
+
+def _npk(rng):
+    return float(rng.randint(10, 200)), float(rng.randint(5, 120)), float(rng.randint(10, 200))
+
+
+def scenario_predict(at, rng, rerun):
+    _goto(at, "🌾 Crop Prediction")
+    rerun()
+    for widget, value in zip(at.number_input[:3], _npk(rng)):
+        widget.set_value(value)
+    at.button[0].click()
+    rerun()
+
+
+def scenario_additions(at, rng, rerun):
+    _goto(at, "🧪 NPK Additions")
+    rerun()
+    for widget, value in zip(at.number_input[:3], _npk(rng)):
+        widget.set_value(value)
+    at.button[0].click()
+    rerun()
+
+
+def scenario_health(at, rng, rerun):
+    _goto(at, "💚 Soil Health Score")
+    rerun()
+    n, p, k = _npk(rng)
+    at.number_input(key="health_n").set_value(n)
+    at.number_input(key="health_p").set_value(p)
+    at.number_input(key="health_k").set_value(k)
+    at.button[0].click()
+    rerun()
+
+
+def scenario_rotation(at, rng, rerun):
+    _goto(at, "🔄 Crop Rotation Advisor")
+    rerun()
+    box = at.selectbox(key="rot_prev")
+    box.set_value(rng.choice(box.options))
+    rerun()
+
+
+def scenario_history(at, rng, rerun):
+    _goto(at, "📈 NPK History")
+    rerun()
+    n, p, k = _npk(rng)
+    at.number_input(key="h_n").set_value(n)
+    at.number_input(key="h_p").set_value(p)
+    at.number_input(key="h_k").set_value(k)
+    at.button[0].click()
+    rerun()
+
+
+def scenario_browse(at, rng, rerun):
+    _goto(at, rng.choice(["📅 Seasonal Calendar", "📚 About NPK", "🔄 Crop Rotation Advisor"]))
+    rerun()
+
+
+SCENARIOS = {
+    "predict": scenario_predict,
+    "additions": scenario_additions,
+    "health": scenario_health,
+    "rotation": scenario_rotation,
+    "history": scenario_history,
+    "browse": scenario_browse,
+}
+
+
+def parse_mix(spec):
+    """Parse 'name=weight,...' into (names, weights)."""
+    names, weights = [], []
+    for part in filter(None, spec.split(",")):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+# ─── Virtual Users ────────────────────────────────────────────────────────────
+
+class Recorder:
+    """Thread-safe collector of (label, latency, ok) samples."""
+
+    def __init__(self):
+        self.samples = []
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, label, latency, ok=True, error=None):
+        with self._lock:
+            self.samples.append((label, latency, ok))
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+
+def share_script_cache():
+    """Make every AppTest run reuse one compiled script, as a real server does.
+
+    AppTest builds a fresh ScriptCache per run, so each rerun would recompile
+    the app (inflating latency) and concurrent compiles crash CPython's AST
+    constructor.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    shared = ScriptCache()
+    local_script_runner.ScriptCache = lambda: shared
+
+
+def start_session(index, timeout):
+    """Create one AppTest session, run its first page load and return (at, seconds)."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state["active_field"] = f"load-{index}"
+    t0 = time.perf_counter()
+    at.run()
+    return at, time.perf_counter() - t0
+
+
+def app_user(at, seed, names, weights, deadline, think, timeout, recorder):
+    """Run weighted scenarios on one session until the deadline.
+
+    A scenario that raises (missing widget, rerun timeout) leaves the session
+    in an unknown state, so the user reconnects with a fresh session.
+    """
+    rng = random.Random(seed)
+
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+
+        def rerun():
+            t0 = time.perf_counter()
+            at.run()
+            latency = time.perf_counter() - t0
+            error = at.exception[0].message.splitlines()[0] if len(at.exception) else None
+            recorder.add(name, latency, error is None, error)
+
+        try:
+            SCENARIOS[name](at, rng, rerun)
+        except Exception as e:
+            recorder.add(name, 0.0, False, f"{type(e).__name__}: {e}")
+            at, _ = start_session(seed, timeout)
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+
+
+def http_user(url, method, seed, deadline, think, timeout, recorder):
+    """Hit one HTTP endpoint until the deadline; POSTs send a random probe reading."""
+    rng = random.Random(seed)
+    label = f"{method} {url}"
+    while time.perf_counter() < deadline:
+        data = None
+        if method == "POST":
+            n, p, k = _npk(rng)
+            data = json.dumps({"probe": f"load-{seed}", "N": n, "P": p, "K": k}).encode()
+        request = urllib.request.Request(url, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as resp:
+                resp.read()
+            recorder.add(label, time.perf_counter() - t0)
+        except urllib.error.HTTPError as e:
+            recorder.add(label, time.perf_counter() - t0, False, f"HTTP {e.code}")
+        except (urllib.error.URLError, OSError) as e:
+            recorder.add(label, time.perf_counter() - t0, False, type(e).__name__)
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+
+
+# ─── Runner ───────────────────────────────────────────────────────────────────
+
+def summarize(samples, wall):
+    """Throughput, error rate and latency percentiles (ms) for a list of samples."""
+    if not samples:
+        return {"requests": 0, "errors": 0, "throughput": 0.0}
+    lat = np.array([s[1] for s in samples if s[2]]) * 1000
+    errors = sum(1 for s in samples if not s[2])
+    out = {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples),
+        "throughput": lat.size / wall,
+    }
+    if lat.size:
+        p50, p90, p95, p99 = np.percentile(lat, [50, 90, 95, 99])
+        out.update(p50_ms=p50, p90_ms=p90, p95_ms=p95, p99_ms=p99, max_ms=float(lat.max()))
+    return out
+
+
+def run_level(concurrency, args, names, weights, http_targets):
+    """Run one concurrency level and return its result dict."""
+    recorder = Recorder()
+    result = {"concurrency": concurrency}
+
+    # Start sessions first so their memory can be measured before traffic
+    sessions = []
+    if not args.sessions_off:
+        rss_before = rss_bytes()
+        startup = []
+        for i in range(concurrency):
+            at, elapsed = start_session(i, args.timeout)
+            sessions.append(at)
+            startup.append(elapsed * 1000)
+        result["session_startup_ms"] = float(np.median(startup))
+        result["memory_per_session_mb"] = (rss_bytes() - rss_before) / concurrency / 2 ** 20
+
+    sampler = CpuSampler(args.pid)
+    cpu0, t0 = cpu_seconds(args.pid), time.perf_counter()
+    deadline = t0 + args.duration
+    sampler.start()
+
+    threads = [
+        threading.Thread(target=app_user, args=(at, args.seed + i, names, weights, deadline,
+                                                args.think, args.timeout, recorder))
+        for i, at in enumerate(sessions)
+    ]
+    for url, method in http_targets:
+        threads += [
+            threading.Thread(target=http_user, args=(url, method, args.seed + 1000 + i,
+                                                     deadline, args.think, args.timeout, recorder))
+            for i in range(args.http_concurrency or concurrency)
+        ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    wall = time.perf_counter() - t0
+    sampler.stop()
+    cpu = (cpu_seconds(args.pid) - cpu0) / wall
+
+    labels = sorted({s[0] for s in recorder.samples})
+    result.update(summarize(recorder.samples, wall))
+    result["by_scenario"] = {
+        label: summarize([s for s in recorder.samples if s[0] == label], wall) for label in labels
+    }
+    result["cpu_cores_used"] = cpu
+    result["cpu_peak_cores"] = max(sampler.samples, default=cpu)
+    result["cpu_saturation"] = cpu / (os.cpu_count() or 1)
+    result["rss_mb"] = rss_bytes(args.pid) / 2 ** 20
+    result["error_samples"] = dict(sorted(recorder.errors.items(), key=lambda kv: -kv[1])[:5])
+    return result
+
+
+def capacity(levels, slo_ms, max_error_rate):
+    """Highest concurrency whose p95 and error rate stay within the SLO."""
+    ok = [r["concurrency"] for r in levels
+          if r.get("p95_ms", float("inf")) <= slo_ms and r.get("error_rate", 0) <= max_error_rate]
+    return max(ok) if ok else 0
+
+
+def render_report(report):
+    """Render a capacity report as markdown."""
+    lines = [
+        f"# Capacity Report — {report['timestamp']}",
+        "",
+        f"- Host CPUs: {report['cpu_count']} · CPU/RSS measured on: {report['measured_pid']}",
+        f"- Scenario mix: `{report['mix']}`" + (f" · HTTP: {', '.join(report['http'])}" if report["http"] else ""),
+        f"- Duration per level: {report['duration']}s · think time: {report['think']}s",
+        f"- SLO: p95 ≤ {report['slo_ms']:.0f} ms, errors ≤ {report['max_error_rate']:.1%}",
+        f"- **Capacity: {report['capacity']} concurrent users per process**",
+        "",
+        "| Users | Req/s | p50 ms | p95 ms | p99 ms | Errors | MB/session | CPU cores | Saturation |",
+        "|------:|------:|-------:|-------:|-------:|-------:|-----------:|----------:|-----------:|",
+    ]
+    for r in report["levels"]:
+        lines.append(
+            f"| {r['concurrency']} | {r.get('throughput', 0):.1f} | {r.get('p50_ms', 0):.0f} | "
+            f"{r.get('p95_ms', 0):.0f} | {r.get('p99_ms', 0):.0f} | {r.get('error_rate', 0):.1%} | "
+            f"{r.get('memory_per_session_mb', 0):.1f} | {r['cpu_cores_used']:.2f} | {r['cpu_saturation']:.0%} |"
+        )
+    last = report["levels"][-1]
+    lines += ["", f"## Per-scenario latency at {last['concurrency']} users", "",
+              "| Scenario | Requests | p50 ms | p95 ms | p99 ms | Errors |",
+              "|----------|---------:|-------:|-------:|-------:|-------:|"]
+    for label, s in last["by_scenario"].items():
+        lines.append(f"| {label} | {s['requests']} | {s.get('p50_ms', 0):.0f} | {s.get('p95_ms', 0):.0f} | "
+                     f"{s.get('p99_ms', 0):.0f} | {s.get('error_rate', 0):.1%} |")
+    if last["error_samples"]:
+        lines += ["", "## Top errors", ""] + [f"- {n}× {e}" for e, n in last["error_samples"].items()]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the NPK app and HTTP endpoints on localhost")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean think time between actions (s)")
+    parser.add_argument("--http-get", action="append", default=[], metavar="URL")
+    parser.add_argument("--http-post", action="append", default=[], metavar="URL",
+                        help="POST a random probe reading per request (ingest /readings shape)")
+    parser.add_argument("--http-concurrency", type=int, default=0,
+                        help="HTTP workers per URL (default: same as the level)")
+    parser.add_argument("--sessions-off", action="store_true", help="Only drive the HTTP endpoints")
+    parser.add_argument("--pid", default="self",
+                        help="Measure CPU/RSS of this server process instead of the load generator (Linux)")
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="p95 latency objective")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-rerun / per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-history", action="store_true",
+                        help="Write History page readings to the real store instead of a temp DB")
+    parser.add_argument("--output", default=None, help="Report path prefix (default benchmarks/results/capacity-<ts>)")
+    args = parser.parse_args()
+
+    names, weights = parse_mix(args.mix)
+    http_targets = [(u, "GET") for u in args.http_get] + [(u, "POST") for u in args.http_post]
+    if args.sessions_off and not http_targets:
+        parser.error("--sessions-off needs at least one --http-get/--http-post")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    tmp = None
+    if not args.keep_history:
+        tmp = tempfile.TemporaryDirectory(prefix="npk-loadtest-")
+        os.environ["NPK_HISTORY_DB"] = os.path.join(tmp.name, "history.db")
+    warnings.filterwarnings("ignore")
+    if not args.sessions_off:
+        from streamlit import config
+        from streamlit.logger import set_log_level
+        config.set_option("logger.level", "error")
+        set_log_level("error")
+        share_script_cache()
+        # Warm-up session: imports, model load and static tables are per-process
+        # costs, not per-session ones
+        print("▶ warming up ...", flush=True)
+        _, elapsed = start_session(-1, args.timeout)
+        print(f"  first page load {elapsed * 1000:.0f} ms", flush=True)
+        logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    results = []
+    for c in levels:
+        print(f"▶ {c} concurrent users for {args.duration:.0f}s ...", flush=True)
+        r = run_level(c, args, names, weights, http_targets)
+        results.append(r)
+        print(f"  {r.get('throughput', 0):.1f} req/s · p50 {r.get('p50_ms', 0):.0f} ms · "
+              f"p95 {r.get('p95_ms', 0):.0f} ms · errors {r.get('error_rate', 0):.1%} · "
+              f"CPU {r['cpu_cores_used']:.2f} cores", flush=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "cpu_count": os.cpu_count(),
+        "measured_pid": "load generator" if args.pid == "self" else f"pid {args.pid}",
+        "mix": "(none)" if args.sessions_off else args.mix,
+        "http": [f"{m} {u}" for u, m in http_targets],
+        "duration": args.duration,
+        "think": args.think,
+        "slo_ms": args.slo_ms,
+        "max_error_rate": args.max_error_rate,
+        "capacity": capacity(results, args.slo_ms, args.max_error_rate),
+        "levels": results,
+    }
+
+    prefix = args.output or os.path.join(RESULTS_DIR, "capacity-" + datetime.now().strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+    with open(prefix + ".json", "w") as f:
+        json.dump(report, f, indent=2, default=float)
+    markdown = render_report(report)
+    with open(prefix + ".md", "w") as f:
+        f.write(markdown)
+
+    print("\n" + markdown)
+    print(f"📄 Report saved to {prefix}.md / .json")
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
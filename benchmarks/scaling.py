@@ -0,0 +1,241 @@
+"""
+Training Scaling Benchmark
+- Sweeps training data size (synthetic rows seeded from the CSV, see
+  benchmarks/synthetic.py), tree count, max depth and worker count (n_jobs)
+  around the params.yaml model, one axis at a time; `--grid` runs the full
+  cartesian product instead
+- Each configuration trains in a fresh spawned process, so its peak RSS is
+  its own and not a high-water mark left by a larger earlier run
+- Records fit time, peak RSS, compile time, bundle size (pickled, as
+  joblib writes it) and compiled-forest bytes, single-row and batch predict
+  latency through the served CompiledForest, and test accuracy
+- Writes a CSV with one row per configuration and one PNG per swept axis for
+  capacity planning
+
+Usage:
+    python benchmarks/scaling.py
+    python benchmarks/scaling.py --rows 2000,200000 --trees 50,100 --depth 10,none --workers 1,4 --grid
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import multiprocessing as mp
+import os
+import pickle
+import resource
+import sys
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+CSV_PATH = os.path.join(ROOT, "data", "Crop_recommendation.csv")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+AXES = ("rows", "trees", "depth", "workers")
+COLUMNS = AXES + ("fit_seconds", "peak_rss_mb", "fit_rss_growth_mb", "compile_seconds", "bundle_mb",
+                  "compiled_mb", "nodes", "single_row_ms", "batch_ms", "batch_us_per_row", "accuracy")
+# (column, axis label) for each panel of the per-axis plots
+PANELS = (("fit_seconds", "Fit time (s)"), ("peak_rss_mb", "Peak RSS (MB)"), ("bundle_mb", "Bundle (MB)"),
+          ("single_row_ms", "Single-row predict (ms)"), ("batch_us_per_row", "Batch predict (µs/row)"),
+          ("accuracy", "Test accuracy"))
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (peak if sys.platform == "darwin" else peak * 1024) / 2 ** 20
+
+
+def current_rss_mb():
+    """Current resident set size of this process (the peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def parse_list(spec, cast=int):
+    """"100,200" → [100, 200]; "none" stands for None (unlimited depth)."""
+    return [None if v.strip().lower() == "none" else cast(v) for v in spec.split(",")]
+
+
+def default_workers():
+    """1, 2, 4, ... up to the CPU count, and the CPU count itself."""
+    cpus = os.cpu_count() or 1
+    return sorted({2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus} | {cpus})
+
+
+def configurations(sweep, baseline, grid=False):
+    """Configurations to run: the cartesian product, or each axis varied around the baseline."""
+    if grid:
+        return [dict(zip(AXES, values)) for values in itertools.product(*(sweep[a] for a in AXES))]
+    configs = [dict(baseline)]
+    for axis in AXES:
+        for value in sweep[axis]:
+            config = dict(baseline, **{axis: value})
+            if config not in configs:
+                configs.append(config)
+    return configs
+
+
+# ─── Worker Side ──────────────────────────────────────────────────────────────
+
+def _median_seconds(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def run_config(task):
+    """Train, compile and time one configuration; runs in its own process."""
+    warnings.filterwarnings("ignore")
+    from sklearn.metrics import accuracy_score
+
+    from benchmarks.synthetic import FEATURES, make_synthetic
+    from src.data_preprocessing import preprocess
+    from src.train import build_model_bundle, train_model
+
+    config, model_params, test_size, batch_rows, seed = task
+    params = dict(model_params, n_estimators=config["trees"], max_depth=config["depth"], n_jobs=config["workers"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = make_synthetic(config["rows"], CSV_PATH, seed=seed)
+        data = preprocess(df, test_size=test_size)
+
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        model = train_model(data["X_train"], data["y_train"], params)
+        fit_seconds = time.perf_counter() - start
+        peak = peak_rss_mb()
+
+        accuracy = accuracy_score(data["y_test"], model.predict(data["X_test"]))
+        metadata = {"feature_names": data["feature_names"], "target_names": data["target_names"]}
+        start = time.perf_counter()
+        bundle = build_model_bundle(model, data["scaler"], data["label_encoder"], metadata, accuracy=accuracy)
+        compile_seconds = time.perf_counter() - start
+
+    forest = bundle["compiled"]
+    readings = df[FEATURES].to_numpy(dtype=np.float64)
+    batch = readings[np.random.default_rng(seed).integers(0, len(readings), batch_rows)]
+    one = batch[:1]
+    forest.predict_codes(batch)  # warm up
+    single = _median_seconds(lambda: forest.decode(forest.predict_codes(one)), 200)
+    batch_seconds = _median_seconds(lambda: forest.decode(forest.predict_codes(batch)), 5)
+    bundle_bytes = len(pickle.dumps(bundle, protocol=pickle.HIGHEST_PROTOCOL))
+
+    return dict(
+        config,
+        fit_seconds=fit_seconds,
+        peak_rss_mb=peak,
+        fit_rss_growth_mb=peak - rss_before,
+        compile_seconds=compile_seconds,
+        bundle_mb=bundle_bytes / 2 ** 20,
+        compiled_mb=forest.nbytes / 2 ** 20,
+        nodes=len(forest.feature),
+        single_row_ms=single * 1000,
+        batch_ms=batch_seconds * 1000,
+        batch_us_per_row=batch_seconds / batch_rows * 1e6,
+        accuracy=accuracy,
+    )
+
+
+# ─── Reports ──────────────────────────────────────────────────────────────────
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: "none" if row[k] is None else row[k] for k in COLUMNS})
+    return path
+
+
+def plot_axis(rows, axis, baseline, path):
+    """One PNG of every metric against `axis`, the other axes held at the baseline."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    series = [r for r in rows if all(r[a] == baseline[a] for a in AXES if a != axis)]
+    if len({r[axis] for r in series}) < 2:
+        return None
+    # Unlimited depth plots after the deepest limited one
+    largest = max((r[axis] for r in series if r[axis] is not None), default=0)
+    series.sort(key=lambda r: largest + 1 if r[axis] is None else r[axis])
+    x = [largest + 1 if r[axis] is None else r[axis] for r in series]
+
+    fig, axes = plt.subplots(2, 3, figsize=(13, 7))
+    for ax, (column, label) in zip(axes.ravel(), PANELS):
+        ax.plot(x, [r[column] for r in series], marker="o")
+        ax.set_xlabel(axis)
+        ax.set_ylabel(label)
+        ax.grid(alpha=0.3)
+        if axis == "rows":
+            ax.set_xscale("log")
+        if axis == "depth" and None in (r[axis] for r in series):
+            ax.set_xticks(x, ["none" if r[axis] is None else r[axis] for r in series])
+    others = ", ".join(f"{a}={baseline[a]}" for a in AXES if a != axis)
+    fig.suptitle(f"Training scaling by {axis} ({others})")
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    return path
+
+
+def main():
+    from src.train import load_params
+
+    params = load_params(os.path.join(ROOT, "params.yaml"))
+    model = params["model"]
+    parser = argparse.ArgumentParser(description="Training scaling benchmark (rows × trees × depth × workers)")
+    parser.add_argument("--rows", default="2000,20000,200000", help="Synthetic training set sizes")
+    parser.add_argument("--trees", default="25,50,100,200,400", help="n_estimators values")
+    parser.add_argument("--depth", default="5,10,15,20,none", help="max_depth values (none = unlimited)")
+    parser.add_argument("--workers", default=",".join(map(str, default_workers())), help="n_jobs values")
+    parser.add_argument("--baseline", default=None,
+                        help="rows,trees,depth,workers held fixed while another axis varies "
+                             f"(default 2000,{model['n_estimators']},{model['max_depth']},<CPU count>)")
+    parser.add_argument("--grid", action="store_true", help="Run every combination instead of one axis at a time")
+    parser.add_argument("--batch-rows", type=int, default=10000, help="Rows per batch-predict timing")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Path prefix (default benchmarks/results/scaling-<ts>)")
+    args = parser.parse_args()
+
+    sweep = {"rows": parse_list(args.rows), "trees": parse_list(args.trees),
+             "depth": parse_list(args.depth), "workers": parse_list(args.workers)}
+    baseline = dict(zip(AXES, parse_list(args.baseline) if args.baseline else
+                        (2000, model["n_estimators"], model["max_depth"], os.cpu_count() or 1)))
+    configs = configurations(sweep, baseline, grid=args.grid)
+
+    rows = []
+    ctx = mp.get_context("spawn")
+    for i, config in enumerate(configs, 1):
+        label = " ".join(f"{a}={config[a]}" for a in AXES)
+        print(f"▶ [{i}/{len(configs)}] {label} ...", flush=True)
+        with ctx.Pool(1) as pool:
+            row = pool.apply(run_config, ((config, model, params["data"]["test_size"], args.batch_rows, args.seed),))
+        rows.append(row)
+        print(f"  fit {row['fit_seconds']:.2f}s · peak RSS {row['peak_rss_mb']:.0f} MB · "
+              f"bundle {row['bundle_mb']:.1f} MB · 1 row {row['single_row_ms']:.2f} ms · "
+              f"batch {row['batch_us_per_row']:.2f} µs/row · accuracy {row['accuracy']:.4f}", flush=True)
+
+    prefix = args.output or os.path.join(RESULTS_DIR, "scaling-" + datetime.now().strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+    written = [write_csv(rows, prefix + ".csv")]
+    for axis in AXES:
+        written.append(plot_axis(rows, axis, baseline, f"{prefix}-{axis}.png"))
+    print("📄 Results saved to " + ", ".join(p for p in written if p))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Synthetic NPK Data Generator
+- Fits a per-crop Gaussian (mean + covariance) to the real dataset
+- Samples any number of rows with the same class balance
+- Used by the benchmark suite to scale the pipeline beyond the 2,000-row CSV
+- `make_catalogue` grows the knowledge base into hundreds of regional
+  varieties for the crop-catalogue benchmarks
+"""
+
+import copy
+import json
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ["N", "P", "K"]
+
+
+def make_synthetic(n_rows, csv_path="data/Crop_recommendation.csv", seed=42):
+    """Return a DataFrame of n_rows synthetic N, P, K, Crop rows seeded from the CSV."""
+    rng = np.random.default_rng(seed)
+    df = pd.read_csv(csv_path)
+    groups = df.groupby("Crop")
+    crops = list(groups.groups)
+    weights = groups.size().reindex(crops).to_numpy(dtype=float)
+    counts = rng.multinomial(n_rows, weights / weights.sum())
+
+    X = np.empty((n_rows, len(FEATURES)))
+    y = np.empty(n_rows, dtype=object)
+    start = 0
+    for crop, count in zip(crops, counts):
+        g = groups.get_group(crop)[FEATURES].to_numpy()
+        X[start:start + count] = rng.multivariate_normal(g.mean(axis=0), np.cov(g, rowvar=False), size=count)
+        y[start:start + count] = crop
+        start += count
+    np.clip(X, 0, None, out=X)
+
+    order = rng.permutation(n_rows)
+    out = pd.DataFrame(X[order], columns=FEATURES)
+    out["Crop"] = y[order]
+    return out
+
+
+def make_catalogue(n_crops, kb_path=None, seed=42):
+    """Return a knowledge-base document with n_crops crops.
+
+    The first crops are the real ones; the rest are varieties of them
+    ("Rice V001", ...) with requirements and impacts jittered by about 10%,
+    inheriting the parent's family, seasons and tips.
+    """
+    from src.knowledge_base import DEFAULT_KB_PATH
+
+    rng = np.random.default_rng(seed)
+    with open(kb_path or DEFAULT_KB_PATH, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    base = doc["crops"]
+    seasons_of = {c["name"]: [s for s in doc["seasons"] if c["name"] in s["crops"]] for c in base}
+
+    crops = []
+    for i in range(n_crops):
+        parent = base[i % len(base)]
+        if i < len(base):
+            crops.append(parent)
+            continue
+        crop = copy.deepcopy(parent)
+        crop["name"] = f"{parent['name']} V{i // len(base):03d}"
+        req = np.array(parent["requirements"], dtype=float) * rng.uniform(0.9, 1.1, size=(3, 1))
+        crop["requirements"] = np.round(req).astype(int).tolist()
+        crop["impact"] = (np.array(parent["impact"]) + rng.integers(-5, 6, size=3)).tolist()
+        crops.append(crop)
+        for season in seasons_of[parent["name"]]:
+            season["crops"].append(crop["name"])
+    doc["crops"] = crops
+    return doc
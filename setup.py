@@ -5,5 +5,6 @@ setup(
     version="1.0.0",
     description="NPK Crop Recommendation MLOps Pipeline",
     packages=find_packages(),
+    package_data={"src": ["knowledge_base.json"]},
     python_requires=">=3.9",
 )
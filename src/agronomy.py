@@ -0,0 +1,349 @@
+"""
+Agronomy Knowledge & Scoring
+- Crop knowledge base (nutrient impact, requirements, seasons, rotation rules),
+  compiled from the versioned data file by src.knowledge_base
+- Rapid NPK reduction methods and crop-specific tips
+- ICAR soil NPK benchmarks
+- Pure scoring helpers shared by the Streamlit app and the ingestion service;
+  they index the compiled arrays by integer crop id
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from src.compiled_model import compiled_forest
+from src.inference import decode, predict_codes
+from src.knowledge_base import NUTRIENT_INDEX, load_knowledge_base
+from src.telemetry import timed
+
+
+# ─── Crop Knowledge Base ─────────────────────────────────────────────────────
+# Crops, seasons, rotation rules, rapid NPK reduction methods (< 1 week),
+# crop-specific reduction tips and ICAR soil benchmarks live in the versioned
+# data file behind src.knowledge_base. Scoring below indexes its arrays by
+# integer crop id; the dicts are rebuilt from the same file for display code.
+KB = load_knowledge_base()
+
+(CROP_NUTRIENT_IMPACT, CROP_REQUIREMENTS, CROP_SEASONS, ROTATION_RULES,
+ NPK_REDUCTION_METHODS, CROP_REDUCTION_TIPS, SOIL_NPK_BENCHMARKS) = KB.legacy_tables()
+
+
+def get_reduction_plan(cur_n, cur_p, cur_k, target_crop, targets):
+    """Generate crop-specific reduction plan for any excess nutrients."""
+    plan = []
+    excess = {
+        'N': round(cur_n - targets['N'], 2),
+        'P': round(cur_p - targets['P'], 2),
+        'K': round(cur_k - targets['K'], 2),
+    }
+    crop_id = KB.crop_index.get(target_crop)
+    for i, nut in enumerate(['N', 'P', 'K']):
+        if excess[nut] > 5:  # Only if meaningfully excess
+            severity = 'high' if excess[nut] > 30 else ('moderate' if excess[nut] > 15 else 'mild')
+            methods = KB.reduction_methods[i]
+            crop_tip = KB.reduction_tips[crop_id][i] if crop_id is not None else ''
+            plan.append({
+                'nutrient': nut,
+                'name': methods['name'],
+                'icon': methods['icon'],
+                'excess': excess[nut],
+                'severity': severity,
+                'methods': methods['methods'],
+                'crop_tip': crop_tip
+            })
+    return plan
+
+
+# ─── Helper Functions ─────────────────────────────────────────────────────────
+
+def get_nutrient_status(value, nutrient):
+    """Return status label, color, and description for a nutrient value using ICAR benchmarks."""
+    i = NUTRIENT_INDEX[nutrient]
+    r = KB.band_ranges[i][KB.band(value, i)]
+    return r['label'], r['color']
+
+
+def get_nutrient_detail(value, nutrient):
+    """Return full detail (label, color, description, range info) for a nutrient."""
+    i = NUTRIENT_INDEX[nutrient]
+    return KB.band_ranges[i][KB.band(value, i)]
+
+
+@timed("npk_prediction_seconds", kind="single")
+def predict_crop(n, p, k, model_data):
+    """Run the ML model and return (predicted_crop, probability_dict).
+
+    Builds a dict over every class; when only the best few crops are shown,
+    use src.inference.top_crops instead.
+    """
+    forest = compiled_forest(model_data)
+    probabilities = forest.predict_proba([[n, p, k]])[0]
+    predicted_crop = forest.decode(forest.classes[probabilities.argmax()])
+    prob_dict = {crop: prob for crop, prob in zip(model_data['target_names'], probabilities)}
+    return predicted_crop, prob_dict
+
+
+@timed("npk_prediction_seconds", kind="batch")
+def predict_crops(X, model_data):
+    """Predict crop names for an (n, 3) array of N, P, K rows in one model call."""
+    return decode(predict_codes(X, model_data), model_data)
+
+
+@timed("npk_scoring_seconds", fn="recommend_additions")
+def recommend_additions(cur_n, cur_p, cur_k, target_crop, strategy='mid'):
+    """Compute required NPK additions (mg/kg) to reach target crop ranges."""
+    crop_id = KB.crop_index.get(target_crop)
+    if crop_id is None:
+        raise ValueError(f"Unknown crop: {target_crop}")
+    col = 2 if strategy == 'mid' else 0  # limits rows are (low, high, mid, tolerance)
+    target_n, target_p, target_k = (lim[col] for lim in KB.limits[crop_id])
+    diffs = {
+        'N': round(target_n - cur_n, 2),
+        'P': round(target_p - cur_p, 2),
+        'K': round(target_k - cur_k, 2),
+    }
+    targets = {'N': round(target_n, 2), 'P': round(target_p, 2), 'K': round(target_k, 2)}
+    return diffs, targets
+
+
+def nutrient_fit(value, opt_low, opt_high):
+    """Score 0-100 for how close a value is to the [opt_low, opt_high] range."""
+    if opt_low <= value <= opt_high:
+        return 100.0
+    opt_width = opt_high - opt_low
+    # Tolerance zone: 30% below/above optimal range still scores well
+    tolerance = max(opt_width * 0.3, 10)
+    if value < opt_low:
+        deficit = opt_low - value
+        if deficit <= tolerance:
+            return max(70, 100 - (deficit / tolerance) * 30)
+        else:
+            return max(0, 70 - ((deficit - tolerance) / max(opt_low, 1)) * 100)
+    else:
+        excess = value - opt_high
+        if excess <= tolerance:
+            return max(70, 100 - (excess / tolerance) * 30)
+        else:
+            return max(0, 70 - ((excess - tolerance) / max(opt_high, 1)) * 100)
+
+
+def nutrient_fit_array(values, low, high, tolerance):
+    """Vectorized `nutrient_fit` over broadcastable arrays, with precomputed tolerances."""
+    below = values < low
+    gap = np.where(below, low - values, values - high)
+    scale = np.maximum(np.where(below, low, high), 1)
+    near = np.maximum(70, 100 - (gap / tolerance) * 30)
+    far = np.maximum(0, 70 - ((gap - tolerance) / scale) * 100)
+    return np.where((low <= values) & (values <= high), 100.0, np.where(gap <= tolerance, near, far))
+
+
+def crop_suitability(n, p, k, crop_name):
+    """Compute a 0-100 suitability score for a specific crop."""
+    crop_id = KB.crop_index.get(crop_name)
+    if crop_id is None:
+        return 0
+    (n_lo, n_hi, _, _), (p_lo, p_hi, _, _), (k_lo, k_hi, _, _) = KB.limits[crop_id]
+    s_n = nutrient_fit(n, n_lo, n_hi)
+    s_p = nutrient_fit(p, p_lo, p_hi)
+    s_k = nutrient_fit(k, k_lo, k_hi)
+    return round(0.35 * s_n + 0.30 * s_p + 0.35 * s_k, 1)
+
+
+def suitability_scores(n, p, k, kb=KB):
+    """Unrounded 0-100 suitability of every crop, indexed by crop id."""
+    fit = nutrient_fit_array(np.array([n, p, k], dtype=float), kb.req_low, kb.req_high, kb.tolerance)
+    return 0.35 * fit[:, 0] + 0.30 * fit[:, 1] + 0.35 * fit[:, 2]
+
+
+def top_k(values, k):
+    """Indices of the k largest values, largest first: O(n) argpartition, then a sort of k.
+
+    Equal values keep index order; which of several values tied at the k-th
+    place is kept is unspecified, so pass unique keys when that matters.
+    """
+    if k is None or k >= len(values):
+        return np.argsort(-values, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    best = np.sort(np.argpartition(-values, k - 1)[:k])
+    return best[np.argsort(-values[best], kind="stable")]
+
+
+@timed("npk_scoring_seconds", fn="rank_crop_suitability")
+def rank_crop_suitability(n, p, k, top=None, season=None, family=None, kb=KB):
+    """Score every crop independently and return (crop, score) pairs, best first.
+
+    `top` keeps only the best entries; `season` / `family` restrict the
+    candidates through the knowledge-base indexes. Ties on the rounded score
+    keep the data-file order.
+    """
+    scores = suitability_scores(n, p, k, kb)
+    ids = kb.crops_in(season, family) if season is not None or family is not None else None
+    candidates = scores if ids is None else scores[ids]
+    if top is not None and top < len(candidates):
+        # Anything 0.1 below the k-th best cannot round into the top k
+        cut = candidates[top_k(candidates, top)[-1]] - 0.1
+        keep = np.flatnonzero(candidates >= cut)
+        ids = keep if ids is None else ids[keep]
+    if ids is None:
+        ids = kb.display_order
+    ids = ids.tolist()
+    pairs = [(kb.crops[i], round(s, 1), kb.display_rank[i]) for i, s in zip(ids, scores[ids].tolist())]
+    pairs.sort(key=lambda x: (-x[1], x[2]))
+    return [(crop, score) for crop, score, _ in pairs[:top]]
+
+
+@timed("npk_scoring_seconds", fn="compute_soil_health")
+def compute_soil_health(n, p, k):
+    """Compute a 0–100 soil health score based on ICAR standard NPK benchmarks.
+
+    Scoring methodology:
+    - Each nutrient scored 0-100 based on how close it is to the ICAR 'Medium' (optimal) range
+    - Within optimal range = 100 points
+    - Below/above optimal = score decreases proportionally
+    - Balanced ratio between nutrients gives a bonus
+    - Final weighted average: N=35%, P=30%, K=35%
+    """
+    def nutrient_score(value, nutrient_id):
+        # (optimal low, optimal high, Very Low upper boundary, High upper boundary)
+        opt_low, opt_high, very_low, very_high = KB.soil_bounds[nutrient_id]
+
+        # Within optimal range = full score
+        if opt_low <= value <= opt_high:
+            return 100.0
+
+        # Below optimal
+        if value < opt_low:
+            if value <= 0:
+                return 0.0
+            # Score proportionally: 0 at very_low_min, 60 at low boundary, 100 at optimal
+            if value < very_low:
+                return max(0, (value / very_low) * 40)  # 0-40 for very low range
+            else:
+                # Low range: 40-100
+                return 40 + ((value - very_low) / (opt_low - very_low)) * 60
+
+        # Above optimal
+        if value > opt_high:
+            if value <= very_high:
+                # High range: 100 down to 50
+                return max(50, 100 - ((value - opt_high) / (very_high - opt_high)) * 50)
+            else:
+                # Very High: 50 down to 10
+                overshoot = value - very_high
+                return max(10, 50 - min(40, overshoot * 0.2))
+
+        return 50.0  # fallback
+
+    score_n = nutrient_score(n, 0)
+    score_p = nutrient_score(p, 1)
+    score_k = nutrient_score(k, 2)
+
+    # Weighted average (N and K slightly more impactful)
+    base = 0.35 * score_n + 0.30 * score_p + 0.35 * score_k
+
+    # Balance bonus: reward when nutrients are proportionally balanced
+    values = [n, p, k]
+    if min(values) > 0:
+        ratio = max(values) / min(values)
+        if ratio < 3.0:
+            balance_bonus = max(0, 8 * (1 - (ratio - 1) / 2.0))
+        else:
+            balance_bonus = 0
+    else:
+        balance_bonus = 0
+
+    return min(100, round(base + balance_bonus, 1))
+
+
+def get_health_grade(score):
+    """Return grade label, color, and description for a soil health score.
+    Based on Soil Health Card grading standards."""
+    if score >= 85:
+        return "Excellent", "#22c55e"
+    elif score >= 70:
+        return "Good", "#84cc16"
+    elif score >= 50:
+        return "Moderate", "#f59e0b"
+    elif score >= 30:
+        return "Poor", "#ef4444"
+    else:
+        return "Very Poor", "#dc2626"
+
+
+@timed("npk_scoring_seconds", fn="suggest_rotation")
+def suggest_rotation(previous_crop, top=None, season=None, kb=KB):
+    """Suggest the best next crops based on rotation science.
+
+    Scores are computed for the whole catalogue in one array pass; reasons
+    and result dicts are only built for the `top` suggestions (all when None),
+    optionally restricted to crops grown in `season`.
+    """
+    prev_id = kb.crop_index.get(previous_crop)
+    if prev_id is None:
+        return []
+
+    prev_family_id = int(kb.family_id[prev_id])
+    prev_family = kb.families[prev_family_id]
+    prev_n, prev_p, prev_k = kb.impact[prev_id].tolist()
+    n_impact, p_impact, k_impact = kb.impact[:, 0], kb.impact[:, 1], kb.impact[:, 2]
+
+    # Family compatibility: 75, 50, 25 for the 1st-3rd preferred family
+    rank = kb.rotation_rank[prev_family_id][kb.family_id]
+    same_family = kb.family_id == prev_family_id
+    n_fixer = (n_impact > 0) & (prev_n < -30)
+    k_gentle = (k_impact > -20) & (prev_k < -30)
+    n_light = (n_impact > -20) & (prev_n < -30)
+    p_light = (p_impact > -15) & (prev_p < -20)
+    score = (np.where(rank >= 0, (3 - rank.astype(np.int32)) * 25, 0)
+             - 40 * same_family
+             - (30 * same_family if prev_family == 'solanaceae' else 0)
+             + 40 * n_fixer + 20 * k_gentle + 15 * n_light + 10 * p_light)
+
+    candidates = kb.crops_in(season) if season is not None else np.arange(len(kb.crops))
+    candidates = candidates[candidates != prev_id]
+    # Unique integer keys: score first, then data-file order for ties
+    key = score[candidates].astype(np.int64) * len(kb.crops) - kb.display_rank[candidates]
+
+    suggestions = []
+    for crop_id in candidates[top_k(key, top)].tolist():
+        reasons = []
+        if rank[crop_id] >= 0:
+            reasons.append(f"Good rotation after {prev_family}")
+        if same_family[crop_id]:
+            reasons.append("⚠️ Same crop family — risk of disease buildup")
+            if prev_family == 'solanaceae':
+                reasons.append("⚠️ Avoid Solanaceae back-to-back (blight risk)")
+        if n_fixer[crop_id]:
+            reasons.append("🌱 Legume fixes nitrogen depleted by previous crop")
+        if k_gentle[crop_id]:
+            reasons.append("Gentle on potassium — lets soil recover")
+        if n_light[crop_id]:
+            reasons.append("Low nitrogen demand")
+        if p_light[crop_id]:
+            reasons.append("Low phosphorus demand")
+
+        n_i, p_i, k_i = kb.impact[crop_id].tolist()
+        suggestions.append({
+            'crop': kb.crops[crop_id],
+            'emoji': kb.emoji[crop_id],
+            'score': int(score[crop_id]),
+            'reasons': reasons,
+            'family': kb.families[kb.family_id[crop_id]],
+            'n_impact': n_i,
+            'p_impact': p_i,
+            'k_impact': k_i,
+        })
+    return suggestions
+
+
+def get_current_season():
+    """Return current Indian farming season based on month."""
+    month = datetime.now().month
+    if 6 <= month <= 10:
+        return 'Kharif'
+    elif month >= 11 or month <= 2:
+        return 'Rabi'
+    else:
+        return 'Zaid'
@@ -0,0 +1,173 @@
+"""
+Bundle Memory Report
+- What a loaded model bundle costs in memory, for sizing how many replicas and
+  tenants one host holds
+- Each variant loads in a fresh process: the bundle as joblib stores it, the
+  serving view the tenant cache keeps (src.model_cache), and that view with
+  its forest compacted to float16 / uint8 leaves
+  (src.compiled_model.compact_forest)
+- Per variant: tracemalloc current and peak bytes over the load (numpy
+  reports its buffers to tracemalloc), RSS growth, array bytes by component
+  (scikit-learn trees, compiled node arrays, lookup tables), pickled size and
+  how many copies fit in 1 GiB
+- Compacted variants are checked against the full forest on the dataset
+  (src.compiled_model.check_compaction) and report any accuracy change
+
+Usage:
+    python -m src.bundle_memory
+    python -m src.bundle_memory --model models/tenants/north.pkl --output reports/bundle_memory.json
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing as mp
+import os
+import pickle
+import resource
+import sys
+import tracemalloc
+
+import numpy as np
+
+VARIANTS = ("bundle", "serving", "serving-float16", "serving-uint8")
+DEFAULT_DATA_PATH = "data/Crop_recommendation.csv"
+
+
+def rss_bytes():
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def component_bytes(model_data):
+    """Array bytes per bundle component; everything else counted by its pickled size."""
+    from src.compiled_model import CompiledForest
+
+    out = {}
+    for key, value in model_data.items():
+        if key == "model" and hasattr(value, "estimators_"):
+            state = [est.tree_.__getstate__() for est in value.estimators_]
+            out["sklearn_trees"] = sum(s["nodes"].nbytes + s["values"].nbytes for s in state)
+        elif isinstance(value, CompiledForest):
+            arrays = [getattr(value, name) for name in value._STATE]
+            stored = sum(a.nbytes for a in arrays if isinstance(a, np.ndarray))
+            out["compiled_nodes"] = stored
+            out["compiled_lookup"] = value.nbytes - stored
+        else:
+            out["other"] = out.get("other", 0) + len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    return out
+
+
+# ─── Worker Side ─────────────────────────────────────────────────────────────
+
+def _measure(task):
+    """Load one variant of the bundle and measure it; runs in its own process."""
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    import joblib
+    import sklearn.ensemble  # noqa: F401  imported before measuring, as a server would have
+
+    from src.compiled_model import check_compaction, compact_forest, compiled_forest
+    from src.model_cache import serving_view
+
+    model_path, variant, data_path = task
+    df = None
+    if variant.startswith("serving-") and data_path:
+        import pandas as pd
+
+        df = pd.read_csv(data_path)
+    gc.collect()
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    model_data = joblib.load(model_path)
+    compiled_forest(model_data)
+    reference = None
+    if variant != "bundle":
+        model_data = serving_view(model_data)
+    if variant.startswith("serving-"):
+        reference = model_data["compiled"]
+        model_data["compiled"] = compact_forest(reference, variant.split("-", 1)[1])
+    peak = tracemalloc.get_traced_memory()[1]
+
+    result = {"variant": variant}
+    if reference is not None:
+        result["reference_compiled_bytes"] = reference.nbytes
+        if df is not None:
+            codes = model_data["label_encoder"].transform(df["Crop"])
+            X = df[model_data["feature_names"]].to_numpy(np.float64)
+            result["check"] = check_compaction(reference, model_data["compiled"], X, codes,
+                                               max_disagreement=1.0, max_accuracy_drop=1.0)
+            del codes, X
+    # Steady state: what stays resident once the full forest is dropped
+    del reference
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    result.update(
+        traced_bytes=current,
+        traced_peak_bytes=peak,
+        rss_growth_bytes=rss_bytes() - rss_before,
+        components=component_bytes(model_data),
+        pickled_bytes=len(pickle.dumps(model_data, protocol=pickle.HIGHEST_PROTOCOL)),
+    )
+    return result
+
+
+# ─── Report ──────────────────────────────────────────────────────────────────
+
+def measure(model_path, variants=VARIANTS, data_path=DEFAULT_DATA_PATH):
+    """Memory rows for each variant, each measured in a fresh spawned process."""
+    ctx = mp.get_context("spawn")
+    rows = []
+    for variant in variants:
+        with ctx.Pool(1) as pool:
+            rows.append(pool.apply(_measure, ((model_path, variant, data_path),)))
+    return rows
+
+
+def render(rows, model_path):
+    mib = 2 ** 20
+    lines = [f"Memory for {model_path}",
+             f"  {'variant':<16} {'traced':>9} {'peak':>9} {'RSS +':>9} {'arrays':>9} {'pickle':>9} {'per GiB':>8}"]
+    for row in rows:
+        arrays = sum(row["components"].values())
+        lines.append(f"  {row['variant']:<16} {row['traced_bytes'] / mib:8.1f}M {row['traced_peak_bytes'] / mib:8.1f}M "
+                     f"{row['rss_growth_bytes'] / mib:8.1f}M {arrays / mib:8.1f}M {row['pickled_bytes'] / mib:8.1f}M "
+                     f"{2 ** 30 // max(row['traced_bytes'], 1):8d}")
+    for row in rows:
+        parts = ", ".join(f"{name} {size / mib:.2f}M" for name, size in row["components"].items())
+        lines.append(f"  {row['variant']:<16} {parts}")
+        check = row.get("check")
+        if check:
+            lines.append(f"  {'':<16} {check['disagreements']} of {check['rows']} dataset predictions change, "
+                         f"accuracy {check['accuracy']:.4f} → {check['compact_accuracy']:.4f}, "
+                         f"max probability error {check['max_proba_error']:.2g}")
+    return "\n".join(lines)
+
+
+def main():
+    """Measure the memory each serving variant of a bundle needs."""
+    parser = argparse.ArgumentParser(description="Memory footprint of a loaded model bundle")
+    parser.add_argument("--model", default="models/npk_crop_model.pkl")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Labelled readings for the compaction check")
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--output", help="Also write the rows as JSON here")
+    args = parser.parse_args()
+
+    rows = measure(args.model, args.variants.split(","), args.data)
+    print(render(rows, args.model))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"model": args.model, "variants": rows}, f, indent=2)
+        print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
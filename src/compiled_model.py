@@ -0,0 +1,529 @@
+"""
+Compiled Crop Model
+- Folds the StandardScaler into every split threshold, so trees compare raw
+  N, P, K readings (mg/kg) and serving needs no `scaler.transform`
+- Folding is exact, not approximate: sklearn tests float32((x - mean) / scale)
+  <= t, which is monotone in x, so each split has a largest raw value T that
+  still goes left. T is found by bisecting over the ordered float64 bit
+  patterns, and every finite reading takes the same branch as before
+- Flattens all trees into shared node arrays, then turns each tree into a
+  grid over threshold ranks: a reading's leaf in every tree is found with one
+  `searchsorted` per feature and a few table lookups, no per-level walk
+- Leaf class distributions are summed tree by tree in estimator order, as
+  sklearn's single-threaded forest does, so probabilities match bit for bit
+- Class codes map to names through a precomputed array; no
+  `label_encoder.inverse_transform` on the hot path
+- Anytime mode (`predict_anytime`): trees vote in estimator order and a
+  reading stops once its leader cannot be overtaken, or when a time budget
+  runs out; each answer reports the trees used and whether it is guaranteed
+  to equal the full vote
+- Compaction (`compact_forest`, `--compact`): uint8 features, int16 node ids,
+  float32 thresholds chosen so readings with up to two decimals route as
+  before, and float16 or uint8 leaf distributions. The rank grid always
+  uses the narrowest index dtype. `check_compaction` bounds the predictions
+  and accuracy it may change
+
+Usage:
+    python -m src.compiled_model --model models/npk_crop_model.pkl
+    python -m src.compiled_model --compact uint8 --output models/npk_crop_model.compact.pkl
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+_SIGN = np.int64(-0x8000000000000000)
+_MAGNITUDE = np.int64(0x7FFFFFFFFFFFFFFF)
+N_FEATURES = 3
+BLOCK_ROWS = 256  # rows scored together; bounds the (trees, rows, classes) gather
+MAX_GRID_CELLS = 1 << 16  # per-tree rank grid limit; larger trees are walked
+EXIT_BLOCK_TREES = 10  # early-exit voting checks the leader after every block of trees
+EXIT_TOLERANCE = 1e-9  # per tree; margin kept above float rounding of the vote sums
+
+
+def code_dtype(n_classes):
+    """Smallest unsigned integer dtype that holds every class code."""
+    return np.uint8 if n_classes <= 256 else np.uint16 if n_classes <= 65536 else np.uint32
+
+
+def index_dtype(n):
+    """Smallest signed integer dtype that indexes n entries."""
+    return np.int16 if n < 2 ** 15 else np.int32 if n < 2 ** 31 else np.int64
+
+
+def _float_keys(x):
+    """Map float64 values to int64 keys with the same order (-0.0 and 0.0 share a key)."""
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits >= 0, bits, -(bits & _MAGNITUDE))
+
+
+def _key_floats(keys):
+    """Inverse of `_float_keys`."""
+    return np.where(keys >= 0, keys, (-keys) | _SIGN).view(np.float64)
+
+
+def fold_thresholds(threshold, mean, scale):
+    """Raw-space thresholds T with x <= T  <=>  float32((x - mean) / scale) <= threshold.
+
+    All arguments are arrays of the same length (one entry per split node).
+    Splits no finite value reaches get -inf; splits every value passes, +inf.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+
+    def goes_left(keys):
+        with np.errstate(over="ignore"):
+            return ((_key_floats(keys) - mean) / scale).astype(np.float32) <= threshold
+
+    lo = np.full(threshold.shape, _float_keys(-np.finfo(np.float64).max))
+    hi = np.full(threshold.shape, _float_keys(np.finfo(np.float64).max))
+    none_left, all_left = ~goes_left(lo), goes_left(hi)
+    # Invariant: lo goes left, hi goes right
+    active = ~(none_left | all_left)
+    while active.any():
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        left = goes_left(mid)
+        lo = np.where(active & left, mid, lo)
+        hi = np.where(active & ~left, mid, hi)
+        active &= hi - lo > 1
+    folded = _key_floats(lo)
+    folded[none_left] = -np.inf
+    folded[all_left] = np.inf
+    return folded
+
+
+class CompiledForest:
+    """Random forest over raw N, P, K readings, flattened into node arrays.
+
+    Node i splits on `feature[i]` at `threshold[i]` and continues at
+    `children[2 * i]` (x <= threshold) or `children[2 * i + 1]`; leaves point
+    to themselves. `leaf_proba[i]` is leaf i's class distribution, scaled to
+    sum to `leaf_total` (1, or 255 for uint8 counts).
+
+    Scoring does not walk the trees: with three features, a tree's leaf is
+    fixed by how many of its own thresholds each reading exceeds, so every
+    tree becomes a dense grid over those ranks. Per-feature rank tables turn
+    one `searchsorted` over the forest's thresholds into a grid cell for every
+    tree at once. Trees whose grid would exceed `max_grid_cells` are walked
+    level by level instead. The lookup tables are rebuilt on load, not pickled.
+    """
+
+    __slots__ = ("feature", "threshold", "children", "roots", "depth", "leaf_proba",
+                 "classes", "class_names", "max_grid_cells", "leaf_total",
+                 "_edges", "_rank_tables", "_grid", "_grid_row", "_gain_max", "_gain_min",
+                 "_first_exit")
+    _STATE = ("feature", "threshold", "children", "roots", "depth", "leaf_proba",
+              "classes", "class_names", "max_grid_cells", "leaf_total")
+
+    def __init__(self, feature, threshold, children, roots, depth, leaf_proba, classes, class_names,
+                 max_grid_cells=MAX_GRID_CELLS, leaf_total=1):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.roots = roots
+        self.depth = depth
+        self.leaf_proba = leaf_proba
+        self.classes = classes
+        self.class_names = class_names
+        self.max_grid_cells = max_grid_cells
+        self.leaf_total = leaf_total
+        self._build_lookup()
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self._STATE}
+
+    def __setstate__(self, state):
+        self.leaf_total = 1  # bundles compiled before compaction existed
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._build_lookup()
+
+    def __repr__(self):
+        return (f"CompiledForest(trees={len(self.roots)}, nodes={len(self.feature)}, "
+                f"depth={self.depth}, classes={len(self.classes)})")
+
+    @property
+    def is_leaf(self):
+        return self.children[0::2] == np.arange(len(self.feature))
+
+    @property
+    def nbytes(self):
+        """Bytes held by the node arrays and the derived lookup tables."""
+        arrays = [self.feature, self.threshold, self.children, self.roots, self.leaf_proba,
+                  self.classes, self._grid, *self._edges, *self._rank_tables]
+        return sum(a.nbytes for a in arrays)
+
+    def _build_lookup(self):
+        n_nodes, n_trees = len(self.feature), len(self.roots)
+        split = ~self.is_leaf
+        self._edges = [np.unique(self.threshold[split & (self.feature == f)]) for f in range(N_FEATURES)]
+        tables = [np.zeros((n_trees, len(e) + 1), dtype=np.int64) for e in self._edges]
+        grids, grid_trees, walk_trees, n_cells = [], [], [], 0
+        node_dtype = index_dtype(n_nodes)
+        bounds = np.append(self.roots, n_nodes).astype(np.intp)
+        children = self.children.astype(np.intp)  # compact node ids would overflow in 2 * node
+        for t in range(n_trees):
+            a, b = bounds[t], bounds[t + 1]
+            feature, threshold, tree_split = self.feature[a:b], self.threshold[a:b], split[a:b]
+            own = [np.unique(threshold[tree_split & (feature == f)]) for f in range(N_FEATURES)]
+            dims = tuple(len(u) + 1 for u in own)
+            size = int(np.prod(dims))
+            if size > self.max_grid_cells:
+                walk_trees.append(t)
+                continue
+            # Rank of each split's threshold among the tree's own thresholds on that feature
+            rank = np.zeros(b - a, dtype=np.intp)
+            for f, u in enumerate(own):
+                sel = tree_split & (feature == f)
+                rank[sel] = np.searchsorted(u, threshold[sel])
+            # Each leaf owns a box of rank cells: x <= u[i]  <=>  rank(x) <= i
+            grid = np.empty(dims, dtype=node_dtype)
+            stack = [(a, [0, dims[0], 0, dims[1], 0, dims[2]])]
+            while stack:
+                node, box = stack.pop()
+                if not tree_split[node - a]:
+                    grid[box[0]:box[1], box[2]:box[3], box[4]:box[5]] = node
+                    continue
+                f, i = feature[node - a], rank[node - a]
+                left, right = box.copy(), box.copy()
+                left[2 * f + 1] = min(box[2 * f + 1], i + 1)
+                right[2 * f] = max(box[2 * f], i + 1)
+                for child, child_box in ((children[2 * node], left), (children[2 * node + 1], right)):
+                    if child_box[2 * f] < child_box[2 * f + 1]:
+                        stack.append((child, child_box))
+            strides = (dims[1] * dims[2], dims[2], 1)
+            for f, u in enumerate(own):
+                tables[f][t, 1:] = np.searchsorted(u, self._edges[f], side="right") * strides[f]
+            tables[0][t] += n_cells
+            grids.append(grid.ravel())
+            grid_trees.append(t)
+            n_cells += size
+        # Only the first rank table carries each tree's offset into the shared grid; the
+        # others stay below the tree's own grid size, and the grid holds node ids
+        tables = [tab[grid_trees] for tab in tables]
+        local_dtype = np.min_scalar_type(max([int(tab.max(initial=0)) for tab in tables[1:]], default=0))
+        self._rank_tables = [tables[0].astype(index_dtype(n_cells))] + [tab.astype(local_dtype) for tab in tables[1:]]
+        self._grid = np.concatenate(grids) if grids else np.empty(0, dtype=node_dtype)
+        self._grid_row = np.full(n_trees, -1, dtype=np.intp)  # tree -> rank-table row, -1 when walked
+        self._grid_row[grid_trees] = np.arange(len(grid_trees))
+
+        # Most / least each class can still gain from trees m.. (row m), for early exit
+        leaf_tree = np.repeat(np.arange(n_trees), np.diff(bounds))[~split]
+        starts = np.searchsorted(leaf_tree, np.arange(n_trees))
+        leaf_proba = self.leaf_proba[~split]
+        self._gain_max = np.zeros((n_trees + 1, len(self.classes)))
+        self._gain_min = np.zeros((n_trees + 1, len(self.classes)))
+        self._gain_max[:-1] = np.maximum.reduceat(leaf_proba, starts)[::-1].cumsum(axis=0)[::-1]
+        self._gain_min[:-1] = np.minimum.reduceat(leaf_proba, starts)[::-1].cumsum(axis=0)[::-1]
+        # A leader's margin is at most the trees seen so far: no exit is possible before this many
+        rival_gain = self._gain_max[:, None, :] - self._gain_min[:, :, None]  # [m, leader, rival]
+        rival_gain[:, np.arange(len(self.classes)), np.arange(len(self.classes))] = -np.inf
+        feasible = np.arange(n_trees + 1) * self.leaf_total > rival_gain.max(axis=2).min(axis=1)
+        self._first_exit = int(np.argmax(feasible)) if feasible.any() else n_trees
+
+    def _ranks(self, X):
+        """Per feature, how many of the forest's thresholds each reading exceeds."""
+        return [np.searchsorted(edges, X[:, f]) for f, edges in enumerate(self._edges)]
+
+    def apply(self, X, trees=slice(None), ranks=None):
+        """Leaf node id reached in each tree of `trees` (a slice of estimator positions), (n_trees, n_rows)."""
+        X = np.asarray(X, dtype=np.float64)
+        ranks = self._ranks(X) if ranks is None else ranks
+        grid_rows = self._grid_row[trees]
+        on_grid = grid_rows >= 0
+        leaves = np.empty((len(grid_rows), len(X)), dtype=self._grid.dtype)
+        if len(grid_rows) and on_grid.all():
+            cells = sum(tab[grid_rows[0]:grid_rows[-1] + 1, r] for tab, r in zip(self._rank_tables, ranks))
+            leaves[:] = self._grid[cells]
+        else:
+            if on_grid.any():
+                rows = grid_rows[on_grid][:, None]
+                leaves[on_grid] = self._grid[sum(tab[rows, r] for tab, r in zip(self._rank_tables, ranks))]
+            nodes = np.repeat(self.roots[trees][~on_grid][:, None], len(X), axis=1).astype(np.intp)
+            cols = np.arange(len(X))
+            for _ in range(self.depth):
+                right = X[cols, self.feature[nodes]] > self.threshold[nodes]
+                nodes = self.children[2 * nodes + right]
+            leaves[~on_grid] = nodes
+        return leaves
+
+    def predict_proba(self, X):
+        """Class probability matrix (n_rows, n_classes) for raw (n, 3) N, P, K rows."""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, N_FEATURES)
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+        out = np.empty((len(X), len(self.classes)), dtype=np.float64)
+        for s in range(0, len(X), BLOCK_ROWS):
+            # Reducing over the leading (tree) axis adds trees one after another, like sklearn
+            np.take(self.leaf_proba, self.apply(X[s:s + BLOCK_ROWS]), axis=0).sum(axis=0, out=out[s:s + BLOCK_ROWS])
+        out /= len(self.roots) * self.leaf_total
+        return out
+
+    def predict_codes(self, X):
+        """Most likely class code per row."""
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+    def predict_anytime(self, X, budget=None, block_trees=EXIT_BLOCK_TREES):
+        """Early-exit voting: (codes, trees_used, guaranteed) per row.
+
+        Trees vote in estimator order, `block_trees` at a time. After each
+        block a row stops once its leader cannot be overtaken even if every
+        remaining tree gave each class its best and the leader its worst
+        leaf. Such rows, and rows that saw every tree, are `guaranteed` to
+        match `predict_codes`. When `budget` seconds run out, undecided rows
+        take their current leader and report guaranteed=False.
+        """
+        deadline = None if budget is None else time.perf_counter() + budget
+        X = np.asarray(X, dtype=np.float64).reshape(-1, N_FEATURES)
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+        n_trees = len(self.roots)
+        codes = np.empty(len(X), dtype=self.classes.dtype)
+        trees_used = np.full(len(X), n_trees, dtype=np.min_scalar_type(n_trees))
+        guaranteed = np.ones(len(X), dtype=bool)
+        stops = [*range(max(self._first_exit, 1), n_trees, block_trees), n_trees]
+        for s in range(0, len(X), BLOCK_ROWS):
+            out = codes[s:s + BLOCK_ROWS], trees_used[s:s + BLOCK_ROWS], guaranteed[s:s + BLOCK_ROWS]
+            self._vote_early(X[s:s + BLOCK_ROWS], stops, deadline, *out)
+        return codes, trees_used, guaranteed
+
+    def _vote_early(self, X, stops, deadline, codes, trees_used, guaranteed):
+        n_trees = len(self.roots)
+        rows, ranks = np.arange(len(X)), self._ranks(X)
+        votes = np.zeros((len(X), len(self.classes)))
+        for start, stop in zip([0, *stops], stops):
+            leaves = self.apply(X[rows], slice(start, stop), ranks)
+            # Same left-to-right additions as predict_proba, so full votes match it bit for bit
+            votes = np.concatenate([votes[None], np.take(self.leaf_proba, leaves, axis=0)]).sum(axis=0)
+            if stop == n_trees:
+                codes[rows] = self.classes[(votes / n_trees).argmax(axis=1)]
+                return
+            leader = votes.argmax(axis=1)
+            lead = np.arange(len(rows)), leader
+            best_rival = votes + self._gain_max[stop]
+            best_rival[lead] = -np.inf
+            worst_lead = votes[lead] + self._gain_min[stop][leader]
+            done = worst_lead - best_rival.max(axis=1) > EXIT_TOLERANCE * n_trees * self.leaf_total
+            if deadline is not None and time.perf_counter() > deadline:
+                guaranteed[rows[~done]] = False
+                done[:] = True
+            codes[rows[done]] = self.classes[leader[done]]
+            trees_used[rows[done]] = stop
+            keep = ~done
+            rows, votes, ranks = rows[keep], votes[keep], [r[keep] for r in ranks]
+            if not len(rows):
+                return
+
+    def decode(self, codes):
+        """Map class codes (any shape) to crop names."""
+        return self.class_names[codes]
+
+
+def compile_bundle(model_data):
+    """Compile a training bundle (forest + scaler + label encoder) into a CompiledForest."""
+    forest, scaler = model_data["model"], model_data["scaler"]
+    n_features = forest.n_features_in_
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+    trees = [est.tree_ for est in forest.estimators_]
+    offsets = np.cumsum([0] + [t.node_count for t in trees])
+    feature = np.concatenate([t.feature for t in trees]).astype(np.intp)
+    raw = np.concatenate([t.threshold for t in trees]).astype(np.float64)
+    left = np.concatenate([t.children_left + o for t, o in zip(trees, offsets)])
+    right = np.concatenate([t.children_right + o for t, o in zip(trees, offsets)])
+    is_leaf = np.concatenate([t.children_left == -1 for t in trees])
+
+    nodes = np.arange(len(feature))
+    feature[is_leaf] = 0
+    left[is_leaf] = right[is_leaf] = nodes[is_leaf]
+    threshold = np.full(len(feature), np.inf)
+    split = ~is_leaf
+    threshold[split] = fold_thresholds(raw[split], mean[feature[split]], scale[feature[split]])
+    children = np.stack([left, right], axis=1).ravel().astype(np.intp)
+
+    n_classes = len(forest.classes_)
+    value = np.concatenate([t.value[:, 0, :n_classes] for t in trees]).astype(np.float64)
+    if (value > 1).any():
+        # Pre-1.4 sklearn stored sample counts; predict_proba normalized them per leaf
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        value = value / normalizer
+
+    classes = np.asarray(forest.classes_).astype(code_dtype(n_classes))
+    names = np.asarray(model_data["label_encoder"].classes_, dtype=object)
+    depth = max(t.max_depth for t in trees)
+    return CompiledForest(feature, threshold, children, offsets[:-1].astype(np.intp), depth,
+                          value, classes, names)
+
+
+def compiled_forest(model_data):
+    """The bundle's compiled forest, compiling (and caching it in the bundle) on first use."""
+    forest = model_data.get("compiled")
+    if forest is None:
+        forest = model_data["compiled"] = compile_bundle(model_data)
+    return forest
+
+
+def boundary_probes(forest, base):
+    """Readings that sit on every folded threshold and on the floats either side of it.
+
+    Rows copy `base` (a raw N, P, K reading) with the split's feature replaced;
+    this is where an inexact fold would send a reading down the wrong branch.
+    """
+    split = ~forest.is_leaf & np.isfinite(forest.threshold)
+    edges = forest.threshold[split]
+    probes = np.tile(np.asarray(base, dtype=np.float64), (3 * len(edges), 1))
+    probes[np.arange(len(probes)), np.tile(forest.feature[split], 3)] = np.concatenate(
+        [np.nextafter(edges, -np.inf), edges, np.nextafter(edges, np.inf)])
+    return probes
+
+
+def check_equivalence(model_data, X):
+    """Raise ValueError unless compiled and sklearn probabilities agree exactly on X."""
+    import copy
+
+    model = copy.copy(model_data["model"])
+    model.n_jobs = 1  # threaded accumulation order is not deterministic
+    expected = model.predict_proba(model_data["scaler"].transform(X))
+    actual = compiled_forest(model_data).predict_proba(X)
+    mismatched = int((actual != expected).any(axis=1).sum())
+    if mismatched:
+        raise ValueError(f"{mismatched} of {len(X)} rows differ from the sklearn pipeline")
+
+
+# ─── Compaction ──────────────────────────────────────────────────────────────
+
+def quantize_rows(proba, total=255):
+    """Integer rows summing to `total` (largest remainder); zero rows stay zero."""
+    proba = np.asarray(proba, dtype=np.float64)
+    sums = proba.sum(axis=1, keepdims=True)
+    scaled = proba / np.where(sums > 0, sums, 1.0) * total
+    q = np.floor(scaled)
+    short = np.where(sums[:, 0] > 0, total - q.sum(axis=1), 0).astype(np.intp)
+    # Hand the missing units to the largest remainders
+    order = np.argsort(q - scaled, axis=1, kind="stable")
+    q[np.arange(len(q))[:, None], order] += np.arange(proba.shape[1]) < short[:, None]
+    return q.astype(np.min_scalar_type(total))
+
+
+def float32_thresholds(threshold, decimals=2):
+    """Float32 thresholds that send readings with up to `decimals` decimal places the same way.
+
+    Each threshold T is rounded down to float32 (exact for readings that are
+    float32 values) unless that would cross the largest decimal reading
+    at or below T; then the smallest float32 at or above that reading is used.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    t32 = threshold.astype(np.float32)
+    above = t32.astype(np.float64) > threshold
+    t32[above] = np.nextafter(t32[above], np.float32(-np.inf))
+    idx = np.flatnonzero(np.isfinite(threshold) & (np.abs(threshold) < 2.0 ** 53 / 10 ** decimals))
+    t, scale = threshold[idx], 10 ** decimals
+    # k / scale is the float64 nearest the decimal, exactly as parsed from text
+    k = np.floor(t * scale)
+    k -= k / scale > t
+    k += (k + 1) / scale <= t
+    lo, hi = k / scale, (k + 1) / scale
+    up = lo.astype(np.float32)
+    below = up.astype(np.float64) < lo
+    up[below] = np.nextafter(up[below], np.float32(np.inf))
+    fix = (t32[idx].astype(np.float64) < lo) & (up.astype(np.float64) < hi)
+    t32[idx[fix]] = up[fix]
+    return t32
+
+
+def compact_forest(forest, leaf_dtype="uint8", decimals=2):
+    """A copy of `forest` with narrow node arrays, for memory-bound serving.
+
+    Features become uint8 and node ids int16 (int32 past 16,383 nodes, so
+    that `2 * node + 1` still fits), which is lossless. Thresholds become float32 (`float32_thresholds`):
+    readings with up to `decimals` decimal places, like the dataset's and the
+    app's, take the same branches as before. Leaf distributions become
+    float16, or uint8 counts out of 255 per leaf (`leaf_total`), so close
+    votes can flip: check the result with `check_compaction`.
+    """
+    if leaf_dtype not in ("float16", "uint8"):
+        raise ValueError(f"leaf_dtype must be 'float16' or 'uint8', got {leaf_dtype!r}")
+    nodes = index_dtype(len(forest.children))
+    if leaf_dtype == "uint8":
+        leaf_proba, leaf_total = quantize_rows(forest.leaf_proba / forest.leaf_total), 255
+    else:
+        leaf_proba, leaf_total = (forest.leaf_proba / forest.leaf_total).astype(np.float16), 1
+    return CompiledForest(forest.feature.astype(np.uint8), float32_thresholds(forest.threshold, decimals),
+                          forest.children.astype(nodes), forest.roots.astype(nodes), forest.depth, leaf_proba,
+                          forest.classes, forest.class_names, forest.max_grid_cells, leaf_total)
+
+
+def check_compaction(reference, compact, X, y=None, max_disagreement=0.0, max_accuracy_drop=0.0):
+    """Compare a compacted forest with its reference on raw readings X; returns the summary.
+
+    Raises ValueError when the share of rows whose predicted crop changes
+    exceeds `max_disagreement`, or when accuracy on labelled rows (y as
+    class codes) drops by more than `max_accuracy_drop`.
+    """
+    expected, actual = reference.predict_proba(X), compact.predict_proba(X)
+    codes, compact_codes = reference.classes[expected.argmax(axis=1)], compact.classes[actual.argmax(axis=1)]
+    summary = {
+        "rows": len(X),
+        "disagreements": int((codes != compact_codes).sum()),
+        "max_proba_error": float(np.abs(actual - expected).max()) if len(X) else 0.0,
+    }
+    summary["disagreement_rate"] = summary["disagreements"] / max(len(X), 1)
+    if summary["disagreement_rate"] > max_disagreement:
+        raise ValueError(f"{summary['disagreements']} of {len(X)} predictions change after compaction")
+    if y is not None:
+        summary["accuracy"] = float((codes == y).mean())
+        summary["compact_accuracy"] = float((compact_codes == y).mean())
+        if summary["accuracy"] - summary["compact_accuracy"] > max_accuracy_drop:
+            raise ValueError(f"Compaction drops accuracy from {summary['accuracy']:.4f} "
+                             f"to {summary['compact_accuracy']:.4f}")
+    return summary
+
+
+def main():
+    """Compile the saved bundle's forest into raw-space node arrays and store it in the bundle."""
+    parser = argparse.ArgumentParser(description="Compile the crop model for serving")
+    parser.add_argument("--model", default="models/npk_crop_model.pkl")
+    parser.add_argument("--output", help="Write the exported bundle here instead of in place")
+    parser.add_argument("--check-rows", type=int, default=100000,
+                        help="Random readings compared against the sklearn pipeline before saving")
+    parser.add_argument("--compact", choices=("float16", "uint8"),
+                        help="Store a compacted forest (float32 thresholds, int16 node ids, this leaf dtype)")
+    parser.add_argument("--decimals", type=int, default=2, help="Reading resolution compaction keeps exact")
+    parser.add_argument("--data", default="data/Crop_recommendation.csv",
+                        help="Labelled readings for the compaction accuracy check")
+    parser.add_argument("--max-disagreement", type=float, default=0.0,
+                        help="Share of predictions compaction may change")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.0)
+    args = parser.parse_args()
+
+    import joblib
+    bundle = joblib.load(args.model)
+    bundle["compiled"] = forest = compile_bundle(bundle)
+    X = np.random.default_rng(0).uniform(0, 400, size=(args.check_rows, 3))
+    X = np.vstack([X, boundary_probes(forest, np.median(X, axis=0))])
+    check_equivalence(bundle, X)
+    print(f"✅ {forest!r} ({forest.nbytes / 2**20:.1f} MiB) matches the sklearn pipeline on {len(X):,} readings")
+
+    if args.compact:
+        import pandas as pd
+
+        compact = compact_forest(forest, args.compact, args.decimals)
+        df = pd.read_csv(args.data)
+        labelled = check_compaction(forest, compact, df[bundle["feature_names"]].to_numpy(dtype=np.float64),
+                                    bundle["label_encoder"].transform(df["Crop"]),
+                                    args.max_disagreement, args.max_accuracy_drop)
+        readings = np.round(X[:args.check_rows], args.decimals)
+        summary = check_compaction(forest, compact, readings, max_disagreement=args.max_disagreement)
+        bundle["compiled"] = compact
+        print(f"✅ Compacted ({args.compact} leaves) to {compact.nbytes / 2**20:.1f} MiB: "
+              f"{summary['disagreements']} of {len(readings):,} {args.decimals}-decimal readings change crop, "
+              f"accuracy {labelled['accuracy']:.4f} → {labelled['compact_accuracy']:.4f} on {args.data}, "
+              f"max probability error {max(summary['max_proba_error'], labelled['max_proba_error']):.2g}")
+    joblib.dump(bundle, args.output or args.model)
+    print(f"   → {args.output or args.model}")
+
+
+if __name__ == "__main__":
+    main()
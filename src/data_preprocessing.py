@@ -15,6 +15,9 @@ import joblib
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 
+from src.profiling import profiled
+from src.telemetry import timed, export_job
+
 
 def load_params(params_path="params.yaml"):
     """Load parameters from params.yaml."""
@@ -22,6 +25,7 @@ def load_params(params_path="params.yaml"):
         return yaml.safe_load(f)
 
 
+@timed("npk_pipeline_stage_seconds", stage="load_data")
 def load_data(data_path):
     """Load the crop recommendation dataset."""
     df = pd.read_csv(data_path)
@@ -30,6 +34,7 @@ def load_data(data_path):
     return df
 
 
+@timed("npk_pipeline_stage_seconds", stage="preprocess")
 def preprocess(df, test_size=0.2, random_state=42):
     """
     Preprocess the dataset:
@@ -74,6 +79,7 @@ def preprocess(df, test_size=0.2, random_state=42):
     }
 
 
+@timed("npk_pipeline_stage_seconds", stage="save_preprocessed")
 def save_preprocessed(processed_data, output_dir="data/processed"):
     """Save preprocessed data artifacts."""
     os.makedirs(output_dir, exist_ok=True)
@@ -95,6 +101,7 @@ def save_preprocessed(processed_data, output_dir="data/processed"):
     print(f"Preprocessed data saved to {output_dir}/")
 
 
+@profiled("preprocess")
 def main():
     """Run the full preprocessing pipeline."""
     params = load_params()
@@ -108,6 +115,7 @@ def main():
     save_preprocessed(processed)
 
     print("\n✅ Preprocessing complete!")
+    export_job("preprocess")
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ Model Evaluation Module
 - Loads trained model and test data
 - Computes classification metrics
 - Saves metrics to reports/metrics.json
-- Logs metrics to MLflow
+- Logs metrics to MLflow (in the background, see src.tracking)
 """
 
 import os
@@ -11,7 +11,6 @@ import json
 import yaml
 import numpy as np
 import joblib
-import mlflow
 from sklearn.metrics import (
     accuracy_score,
     precision_score,
@@ -20,6 +19,10 @@ from sklearn.metrics import (
     classification_report,
 )
 
+from src import tracking
+from src.profiling import profiled
+from src.telemetry import timed, export_job
+
 
 def load_params(params_path="params.yaml"):
     """Load parameters from params.yaml."""
@@ -27,21 +30,8 @@ def load_params(params_path="params.yaml"):
         return yaml.safe_load(f)
 
 
-def evaluate_model(model_path, data_dir="data/processed", reports_dir="reports"):
-    """Evaluate the trained model and generate metrics."""
-    # Load test data
-    X_test = np.load(os.path.join(data_dir, "X_test.npy"))
-    y_test = np.load(os.path.join(data_dir, "y_test.npy"))
-    metadata = joblib.load(os.path.join(data_dir, "metadata.pkl"))
-
-    # Load model bundle
-    bundle = joblib.load(model_path)
-    model = bundle["model"]
-
-    # Predictions
-    y_pred = model.predict(X_test)
-
-    # Compute metrics
+def compute_metrics(y_test, y_pred, target_names):
+    """Accuracy, weighted precision / recall / F1 and the per-class report."""
     accuracy = accuracy_score(y_test, y_pred)
     precision = precision_score(y_test, y_pred, average="weighted", zero_division=0)
     recall = recall_score(y_test, y_pred, average="weighted", zero_division=0)
@@ -50,11 +40,11 @@ def evaluate_model(model_path, data_dir="data/processed", reports_dir="reports")
     # Classification report
     report = classification_report(
         y_test, y_pred,
-        target_names=metadata["target_names"],
+        target_names=target_names,
         output_dict=True,
     )
 
-    metrics = {
+    return {
         "accuracy": round(accuracy, 4),
         "precision": round(precision, 4),
         "recall": round(recall, 4),
@@ -62,19 +52,41 @@ def evaluate_model(model_path, data_dir="data/processed", reports_dir="reports")
         "classification_report": report,
     }
 
-    # Save metrics
+
+def save_metrics(metrics, reports_dir="reports"):
+    """Write metrics to <reports_dir>/metrics.json; returns the path."""
     os.makedirs(reports_dir, exist_ok=True)
     metrics_path = os.path.join(reports_dir, "metrics.json")
     with open(metrics_path, "w") as f:
         json.dump(metrics, f, indent=2)
+    return metrics_path
+
+
+@timed("npk_pipeline_stage_seconds", stage="evaluate_model")
+def evaluate_model(model_path, data_dir="data/processed", reports_dir="reports"):
+    """Evaluate the trained model and generate metrics."""
+    # Load test data
+    X_test = np.load(os.path.join(data_dir, "X_test.npy"))
+    y_test = np.load(os.path.join(data_dir, "y_test.npy"))
+    metadata = joblib.load(os.path.join(data_dir, "metadata.pkl"))
+
+    # Load model bundle
+    bundle = joblib.load(model_path)
+    model = bundle["model"]
+
+    # Predictions
+    y_pred = model.predict(X_test)
+
+    metrics = compute_metrics(y_test, y_pred, metadata["target_names"])
+    metrics_path = save_metrics(metrics, reports_dir)
 
     print(f"{'='*50}")
     print(f"  Model Evaluation Results")
     print(f"{'='*50}")
-    print(f"  Accuracy:  {accuracy:.4f}")
-    print(f"  Precision: {precision:.4f}")
-    print(f"  Recall:    {recall:.4f}")
-    print(f"  F1 Score:  {f1:.4f}")
+    print(f"  Accuracy:  {metrics['accuracy']:.4f}")
+    print(f"  Precision: {metrics['precision']:.4f}")
+    print(f"  Recall:    {metrics['recall']:.4f}")
+    print(f"  F1 Score:  {metrics['f1_score']:.4f}")
     print(f"{'='*50}")
     print(f"\nDetailed report saved to {metrics_path}")
 
@@ -84,26 +96,24 @@ def evaluate_model(model_path, data_dir="data/processed", reports_dir="reports")
     return metrics
 
 
+@profiled("evaluate")
 def main():
     """Run evaluation with MLflow logging."""
     params = load_params()
-    mlflow_config = params["mlflow"]
-
-    mlflow.set_tracking_uri(mlflow_config["tracking_uri"])
-    mlflow.set_experiment(mlflow_config["experiment_name"])
 
     metrics = evaluate_model("models/npk_crop_model.pkl")
 
     # Log to MLflow
-    with mlflow.start_run(run_name="rf-evaluation"):
-        mlflow.log_metrics({
+    with tracking.start_run("rf-evaluation", params["mlflow"]) as run:
+        run.log_metrics({
             "eval_accuracy": metrics["accuracy"],
             "eval_precision": metrics["precision"],
             "eval_recall": metrics["recall"],
             "eval_f1_score": metrics["f1_score"],
         })
-        mlflow.log_artifact("reports/metrics.json")
+        run.log_artifact("reports/metrics.json")
         print(f"\n✅ Evaluation logged to MLflow.")
+    export_job("evaluate")
 
 
 if __name__ == "__main__":
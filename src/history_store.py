@@ -0,0 +1,236 @@
+"""
+NPK Reading History Store
+- Persists soil readings in SQLite (WAL mode) so history survives reloads
+- Indexes readings by user, field and timestamp
+- Writes readings in batches inside a single transaction
+- Maintains per-field running aggregates on write (no full-table scans)
+- Serves paginated and time-range queries
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+NUTRIENTS = ("N", "P", "K")
+
+DEFAULT_DB_PATH = os.environ.get("NPK_HISTORY_DB", "data/history/npk_history.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id  TEXT    NOT NULL,
+    field_id TEXT    NOT NULL,
+    ts       REAL    NOT NULL,
+    n        REAL    NOT NULL,
+    p        REAL    NOT NULL,
+    k        REAL    NOT NULL,
+    crop     TEXT,
+    note     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_readings_user_field_ts
+    ON readings (user_id, field_id, ts, id);
+CREATE INDEX IF NOT EXISTS idx_readings_user_field_id
+    ON readings (user_id, field_id, id);
+
+CREATE TABLE IF NOT EXISTS field_stats (
+    user_id  TEXT    NOT NULL,
+    field_id TEXT    NOT NULL,
+    count    INTEGER NOT NULL,
+    first_ts REAL    NOT NULL,
+    last_ts  REAL    NOT NULL,
+    n_sum    REAL    NOT NULL,
+    p_sum    REAL    NOT NULL,
+    k_sum    REAL    NOT NULL,
+    n_min    REAL    NOT NULL,
+    p_min    REAL    NOT NULL,
+    k_min    REAL    NOT NULL,
+    n_max    REAL    NOT NULL,
+    p_max    REAL    NOT NULL,
+    k_max    REAL    NOT NULL,
+    PRIMARY KEY (user_id, field_id)
+);
+"""
+
+# Aggregates are merged into the existing row, so each batch costs
+# O(fields touched) regardless of how much history a field already has.
+_UPSERT_STATS = """
+INSERT INTO field_stats (
+    user_id, field_id, count, first_ts, last_ts,
+    n_sum, p_sum, k_sum, n_min, p_min, k_min, n_max, p_max, k_max
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, field_id) DO UPDATE SET
+    count    = count + excluded.count,
+    first_ts = min(first_ts, excluded.first_ts),
+    last_ts  = max(last_ts, excluded.last_ts),
+    n_sum    = n_sum + excluded.n_sum,
+    p_sum    = p_sum + excluded.p_sum,
+    k_sum    = k_sum + excluded.k_sum,
+    n_min    = min(n_min, excluded.n_min),
+    p_min    = min(p_min, excluded.p_min),
+    k_min    = min(k_min, excluded.k_min),
+    n_max    = max(n_max, excluded.n_max),
+    p_max    = max(p_max, excluded.p_max),
+    k_max    = max(k_max, excluded.k_max)
+"""
+
+_READING_COLUMNS = ("id", "user_id", "field_id", "ts", "N", "P", "K", "crop", "note")
+
+
+class HistoryStore:
+    """SQLite-backed store for NPK readings, safe to share across threads.
+
+    Each thread gets its own connection; WAL mode lets readers proceed while
+    a writer commits.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close the calling thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ── Writes ──
+
+    def add_reading(self, user_id, field_id, n, p, k, crop=None, note=None, ts=None):
+        """Append a single reading and return its row id."""
+        return self.add_readings([{
+            "user_id": user_id, "field_id": field_id, "ts": ts,
+            "N": n, "P": p, "K": k, "crop": crop, "note": note,
+        }])[0]
+
+    def add_readings(self, readings):
+        """Append a batch of reading dicts in one transaction and return their row ids.
+
+        Each reading needs user_id, field_id, N, P and K; ts (epoch seconds),
+        crop and note are optional.
+        """
+        now = time.time()
+        rows = []
+        stats = {}
+        for r in readings:
+            ts = r.get("ts")
+            ts = now if ts is None else float(ts)
+            n, p, k = float(r["N"]), float(r["P"]), float(r["K"])
+            rows.append((r["user_id"], r["field_id"], ts, n, p, k, r.get("crop"), r.get("note")))
+
+            key = (r["user_id"], r["field_id"])
+            s = stats.get(key)
+            if s is None:
+                stats[key] = [1, ts, ts, n, p, k, n, p, k, n, p, k]
+            else:
+                s[0] += 1
+                s[1] = min(s[1], ts)
+                s[2] = max(s[2], ts)
+                s[3] += n
+                s[4] += p
+                s[5] += k
+                s[6], s[7], s[8] = min(s[6], n), min(s[7], p), min(s[8], k)
+                s[9], s[10], s[11] = max(s[9], n), max(s[10], p), max(s[11], k)
+
+        if not rows:
+            return []
+
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO readings (user_id, field_id, ts, n, p, k, crop, note) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # Rows inserted in one transaction get consecutive AUTOINCREMENT ids
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            conn.executemany(_UPSERT_STATS, [key + tuple(s) for key, s in stats.items()])
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+
+    def clear(self, user_id, field_id):
+        """Delete all readings and aggregates for a field."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM readings WHERE user_id = ? AND field_id = ?", (user_id, field_id))
+            conn.execute("DELETE FROM field_stats WHERE user_id = ? AND field_id = ?", (user_id, field_id))
+
+    # ── Reads ──
+
+    def fields(self, user_id):
+        """Return the field ids that have readings for a user."""
+        cur = self._connect().execute(
+            "SELECT field_id FROM field_stats WHERE user_id = ? ORDER BY field_id", (user_id,)
+        )
+        return [row[0] for row in cur]
+
+    def count(self, user_id, field_id):
+        """Return the number of readings for a field (read from the aggregates)."""
+        cur = self._connect().execute(
+            "SELECT count FROM field_stats WHERE user_id = ? AND field_id = ?", (user_id, field_id)
+        )
+        row = cur.fetchone()
+        return row[0] if row else 0
+
+    def aggregates(self, user_id, field_id):
+        """Return running count, time span, mean, min and max per nutrient for a field."""
+        cur = self._connect().execute(
+            "SELECT count, first_ts, last_ts, n_sum, p_sum, k_sum, n_min, p_min, k_min, "
+            "n_max, p_max, k_max FROM field_stats WHERE user_id = ? AND field_id = ?",
+            (user_id, field_id),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        count = row[0]
+        return {
+            "count": count,
+            "first_ts": row[1],
+            "last_ts": row[2],
+            "mean": {nut: row[3 + i] / count for i, nut in enumerate(NUTRIENTS)},
+            "min": {nut: row[6 + i] for i, nut in enumerate(NUTRIENTS)},
+            "max": {nut: row[9 + i] for i, nut in enumerate(NUTRIENTS)},
+        }
+
+    def page(self, user_id, field_id, limit=50, offset=0, newest_first=True):
+        """Return one page of readings for a field as a list of dicts."""
+        order = "DESC" if newest_first else "ASC"
+        cur = self._connect().execute(
+            "SELECT id, user_id, field_id, ts, n, p, k, crop, note FROM readings "
+            f"WHERE user_id = ? AND field_id = ? ORDER BY ts {order}, id {order} LIMIT ? OFFSET ?",
+            (user_id, field_id, limit, offset),
+        )
+        return [dict(zip(_READING_COLUMNS, row)) for row in cur]
+
+    def since(self, user_id, field_id, after_id=0, limit=None):
+        """Return readings for a field with id > after_id, in insertion order."""
+        cur = self._connect().execute(
+            "SELECT id, user_id, field_id, ts, n, p, k, crop, note FROM readings "
+            "WHERE user_id = ? AND field_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (user_id, field_id, after_id, -1 if limit is None else limit),
+        )
+        return [dict(zip(_READING_COLUMNS, row)) for row in cur]
+
+    def time_range(self, user_id, field_id, start_ts=None, end_ts=None, limit=None):
+        """Return readings for a field with start_ts <= ts < end_ts, oldest first."""
+        start_ts = float("-inf") if start_ts is None else start_ts
+        end_ts = float("inf") if end_ts is None else end_ts
+        cur = self._connect().execute(
+            "SELECT id, user_id, field_id, ts, n, p, k, crop, note FROM readings "
+            "WHERE user_id = ? AND field_id = ? AND ts >= ? AND ts < ? ORDER BY ts, id LIMIT ?",
+            (user_id, field_id, start_ts, end_ts, -1 if limit is None else limit),
+        )
+        return [dict(zip(_READING_COLUMNS, row)) for row in cur]
@@ -0,0 +1,237 @@
+"""
+Incremental Retraining
+- Grows the trained forest with each new batch of soil cards instead of
+  refitting it on the whole history: `warm_start` fits only the new trees, so
+  the cost scales with the batch (plus a fixed-size sample), not the history
+- Training rows for the new trees are the batch plus a reservoir sample of
+  every row seen so far ("reservoir", the default), or the batch alone
+  ("chunk"), topped up with a few reservoir rows of each crop the batch
+  lacks: every tree must see every class or its votes do not line up with
+  the rest
+- The scaler and label encoder stay frozen, so old and new trees split on
+  the same feature space; batches with crops the model does not know are
+  refused (retrain from scratch with src.train)
+- Beyond `tree_budget` trees the oldest are retired
+- A fraction of every batch joins a rolling holdout (the most recent
+  `holdout_size` rows). The update is rejected when its holdout accuracy
+  falls more than `max_accuracy_drop` below the current model's; accepted
+  bundles record the holdout accuracy as their accuracy
+- Reservoir, holdout, per-tree batch provenance and the update history live
+  in the bundle under "incremental"
+
+Usage:
+    python -m src.incremental_train --batch data/batches/2026-w42.csv
+    python -m src.incremental_train --batch week.csv --mode chunk --trees 10 --output models/candidate.pkl
+"""
+
+import argparse
+import copy
+import os
+import time
+
+import numpy as np
+import yaml
+
+from src.compiled_model import compile_bundle, compiled_forest
+from src.profiling import profiled
+from src.telemetry import export_job, timed
+
+DEFAULT_MODEL_PATH = "models/npk_crop_model.pkl"
+FEATURES = ["N", "P", "K"]
+TARGET = "Crop"
+MODES = ("reservoir", "chunk")
+
+
+def load_params(params_path="params.yaml"):
+    """Load parameters from params.yaml."""
+    with open(params_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def load_batch(path):
+    """Readings (n, 3) and crop names from a CSV with N, P, K and Crop columns."""
+    import pandas as pd
+
+    df = pd.read_csv(path, usecols=FEATURES + [TARGET])
+    return df[FEATURES].to_numpy(dtype=float), df[TARGET].to_numpy()
+
+
+def reservoir_update(X_res, y_res, seen, X, y, size, rng):
+    """Algorithm R: keep a uniform sample of `size` rows out of all `seen` + len(X) rows.
+
+    Returns new arrays (the inputs are not modified) and the updated count.
+    """
+    fill = max(min(size - len(X_res), len(X)), 0)
+    X_res = np.vstack([X_res, X[:fill]])
+    y_res = np.concatenate([y_res, y[:fill]])
+    for i in range(fill, len(X)):
+        j = rng.integers(0, seen + i + 1)
+        if j < size:
+            X_res[j], y_res[j] = X[i], y[i]
+    return X_res, y_res, seen + len(X)
+
+
+def initial_state(model_data, X_seed, y_seed, reservoir_size, rng):
+    """Incremental state for a bundle trained from scratch on (X_seed, y_seed)."""
+    empty_X, empty_y = np.empty((0, len(FEATURES))), np.empty(0, dtype=np.int64)
+    X_res, y_res, seen = reservoir_update(empty_X, empty_y, 0, X_seed, y_seed, reservoir_size, rng)
+    return {
+        "reservoir_X": X_res, "reservoir_y": y_res, "seen": seen,
+        "holdout_X": empty_X, "holdout_y": empty_y,
+        "tree_batches": [0] * len(model_data["model"].estimators_),
+        "batches": 0, "history": [],
+    }
+
+
+def holdout_accuracy(model_data, X, y):
+    if not len(y):
+        return None
+    return float((compiled_forest(model_data).predict_codes(X) == y).mean())
+
+
+@timed("npk_pipeline_stage_seconds", stage="incremental_update")
+def update_bundle(model_data, X, crops, n_trees=20, mode="reservoir", tree_budget=200, reservoir_size=2000,
+                  holdout_fraction=0.2, holdout_size=1000, max_accuracy_drop=0.02, seed=None):
+    """Grow a bundle with one batch of readings; returns (new_bundle, summary).
+
+    `model_data` is left untouched. `seed` is the (readings, crop names) the
+    bundle was trained on; it fills the reservoir on the first incremental
+    update and is ignored afterwards. summary["accepted"] is False when the
+    update failed the holdout check; the new bundle is returned regardless.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+    label_encoder = model_data["label_encoder"]
+    n_classes = len(label_encoder.classes_)
+    unknown = sorted(set(crops) - set(label_encoder.classes_))
+    if unknown:
+        raise ValueError(f"Batch has crops the model does not know: {unknown}; retrain from scratch")
+    X = np.asarray(X, dtype=float).reshape(-1, len(FEATURES))
+    if len(X) == 0:
+        raise ValueError("Batch has no readings")
+    y = label_encoder.transform(crops)
+
+    model = model_data["model"]
+    state = model_data.get("incremental")
+    if state is None:
+        if seed is None:
+            raise ValueError("The first incremental update needs the training data to seed the reservoir")
+        seed_X, seed_crops = seed
+        state = initial_state(model_data, np.asarray(seed_X, dtype=float), label_encoder.transform(seed_crops),
+                              reservoir_size, np.random.default_rng([model.random_state or 0, 0]))
+    batch = state["batches"] + 1
+    rng = np.random.default_rng([model.random_state or 0, batch])
+
+    # Rolling holdout: a slice of every batch, most recent rows kept
+    order = rng.permutation(len(X))
+    n_hold = int(round(len(X) * holdout_fraction))
+    hold, fit = order[:n_hold], order[n_hold:]
+    holdout_X = np.vstack([state["holdout_X"], X[hold]])[-holdout_size:]
+    holdout_y = np.concatenate([state["holdout_y"], y[hold]])[-holdout_size:]
+
+    X_new, y_new = X[fit], y[fit]
+    X_res, y_res = state["reservoir_X"], state["reservoir_y"]
+    if mode == "reservoir":
+        X_fit, y_fit = np.vstack([X_res, X_new]), np.concatenate([y_res, y_new])
+    else:
+        # Missing crops get as many reservoir rows as the batch has per crop, on average
+        present = np.unique(y_new)
+        per_class = max(-(-len(y_new) // max(len(present), 1)), 1)
+        top_up = np.concatenate([np.flatnonzero(y_res == c)[:per_class]
+                                 for c in np.setdiff1d(np.arange(n_classes), present)] + [np.empty(0, int)])
+        X_fit, y_fit = np.vstack([X_new, X_res[top_up]]), np.concatenate([y_new, y_res[top_up]])
+    if len(np.unique(y_fit)) < n_classes:
+        raise ValueError("Training rows for the new trees do not cover every crop")
+    X_res, y_res, seen = reservoir_update(X_res, y_res, state["seen"], X_new, y_new, reservoir_size, rng)
+
+    grown = copy.copy(model)
+    grown.estimators_ = list(model.estimators_)  # warm_start extends the list in place
+    # A fixed random_state would hand the new trees the same seeds every batch
+    # once retirement holds the forest at its budget
+    grown.set_params(warm_start=True, n_estimators=len(grown.estimators_) + n_trees,
+                     random_state=int(rng.integers(2 ** 31)))
+    start = time.perf_counter()
+    grown.fit(model_data["scaler"].transform(X_fit), y_fit)
+    fit_seconds = time.perf_counter() - start
+    grown.set_params(warm_start=False, random_state=model.random_state)
+
+    tree_batches = state["tree_batches"] + [batch] * n_trees
+    retired = max(len(grown.estimators_) - tree_budget, 0)
+    grown.estimators_ = grown.estimators_[retired:]
+    grown.n_estimators = len(grown.estimators_)
+    tree_batches = tree_batches[retired:]
+
+    bundle = {key: value for key, value in model_data.items() if key not in ("compiled", "incremental")}
+    bundle["model"] = grown
+    bundle["compiled"] = compile_bundle(bundle)
+
+    previous = holdout_accuracy(model_data, holdout_X, holdout_y)
+    accuracy = holdout_accuracy(bundle, holdout_X, holdout_y)
+    accepted = previous is None or accuracy >= previous - max_accuracy_drop
+    if accuracy is not None:
+        bundle["accuracy"] = accuracy
+    summary = {
+        "batch": batch, "mode": mode, "rows": len(X), "fit_rows": len(X_fit), "fit_seconds": fit_seconds,
+        "trees_added": n_trees, "trees_retired": retired, "trees": len(grown.estimators_),
+        "holdout_rows": len(holdout_y), "holdout_accuracy": accuracy, "previous_accuracy": previous,
+        "accepted": accepted,
+    }
+    bundle["incremental"] = {
+        "reservoir_X": X_res, "reservoir_y": y_res, "seen": seen,
+        "holdout_X": holdout_X, "holdout_y": holdout_y,
+        "tree_batches": tree_batches, "batches": batch,
+        "history": state["history"] + [summary],
+    }
+    return bundle, summary
+
+
+@profiled("incremental_train")
+def main():
+    """Add trees for one batch of soil cards to the model bundle."""
+    params = load_params()
+    inc = params.get("incremental", {})
+
+    parser = argparse.ArgumentParser(description="Incremental forest retraining")
+    parser.add_argument("--batch", required=True, help="CSV with N, P, K and Crop columns")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--output", help="Where to write the grown bundle (default: --model)")
+    parser.add_argument("--mode", choices=MODES, default=inc.get("mode", "reservoir"))
+    parser.add_argument("--trees", type=int, default=inc.get("new_trees", 20))
+    parser.add_argument("--budget", type=int, default=inc.get("tree_budget", 200))
+    parser.add_argument("--seed-data", default=params["data"]["path"],
+                        help="Training CSV, used to seed the reservoir on the first update")
+    args = parser.parse_args()
+
+    import joblib
+
+    model_data = joblib.load(args.model)
+    seed = None if "incremental" in model_data else load_batch(args.seed_data)
+    X, crops = load_batch(args.batch)
+    bundle, summary = update_bundle(
+        model_data, X, crops, n_trees=args.trees, mode=args.mode, tree_budget=args.budget,
+        reservoir_size=inc.get("reservoir_size", 2000), holdout_fraction=inc.get("holdout_fraction", 0.2),
+        holdout_size=inc.get("holdout_size", 1000), max_accuracy_drop=inc.get("max_accuracy_drop", 0.02),
+        seed=seed,
+    )
+
+    acc = summary["holdout_accuracy"]
+    print(f"Batch {summary['batch']}: {summary['rows']} rows, {summary['trees_added']} trees fit on "
+          f"{summary['fit_rows']} rows in {summary['fit_seconds']:.2f}s, {summary['trees_retired']} retired, "
+          f"{summary['trees']} in the forest")
+    if acc is not None:
+        print(f"Rolling holdout ({summary['holdout_rows']} rows): {acc:.4f} "
+              f"(current model {summary['previous_accuracy']:.4f})")
+    if not summary["accepted"]:
+        print("❌ Holdout accuracy dropped too far; bundle not written")
+        raise SystemExit(1)
+
+    output = args.output or args.model
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    joblib.dump(bundle, output + ".tmp")
+    os.replace(output + ".tmp", output)
+    print(f"\n✅ Incremental update saved to {output}")
+    export_job("incremental_train")
+
+
+if __name__ == "__main__":
+    main()
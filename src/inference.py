@@ -0,0 +1,91 @@
+"""
+Crop Model Inference
+- Scores with the bundle's compiled forest (src.compiled_model): raw N, P, K
+  in, class probabilities out, with no scaler or label encoder on the path
+- One `predict_proba` pass per call; a separate `predict` would evaluate
+  every tree a second time
+- Top-k classes and probabilities straight from the probability matrix via
+  `argpartition`, without per-class dicts or a full sort
+- Batch outputs are compact integer class codes (label-encoder ids, in the
+  smallest unsigned dtype) plus a probability matrix; names and dicts are
+  materialized only at the UI edge (`decode`, `top_crops`)
+"""
+
+import numpy as np
+
+from src.compiled_model import code_dtype, compiled_forest  # noqa: F401  (code_dtype re-exported)
+from src.telemetry import timed
+
+
+def class_names(model_data):
+    """Class names indexed by class code."""
+    return compiled_forest(model_data).class_names
+
+
+def predict_proba(X, model_data):
+    """Class probability matrix (n_rows, n_classes) for an (n, 3) array of raw N, P, K rows."""
+    return compiled_forest(model_data).predict_proba(X)
+
+
+def top_k_rows(proba, top):
+    """Column indices and values of the `top` largest entries per row, largest first.
+
+    Matches a stable descending sort: equal probabilities keep class order,
+    including ties across the k-th place, so column 0 is exactly `argmax`.
+    """
+    n_rows, n_cols = proba.shape
+    top = min(top, n_cols)
+    if top == n_cols:
+        idx = np.argsort(-proba, axis=1, kind="stable")
+    else:
+        part = np.argpartition(-proba, top - 1, axis=1)[:, :top]
+        kth = np.take_along_axis(proba, part, axis=1).min(axis=1, keepdims=True)
+        above = proba > kth
+        at_kth = proba == kth
+        # Fill the remaining places with the lowest-index classes tied at the k-th value
+        keep = above | (at_kth & (np.cumsum(at_kth, axis=1) <= top - above.sum(axis=1, keepdims=True)))
+        idx = np.nonzero(keep)[1].reshape(n_rows, top)
+        order = np.argsort(-np.take_along_axis(proba, idx, axis=1), axis=1, kind="stable")
+        idx = np.take_along_axis(idx, order, axis=1)
+    return idx, np.take_along_axis(proba, idx, axis=1)
+
+
+@timed("npk_prediction_seconds", kind="top_k")
+def predict_top_k(X, model_data, top=3):
+    """Top-k class codes and probabilities for every row: ((n, top) codes, (n, top) probabilities)."""
+    forest = compiled_forest(model_data)
+    idx, probs = top_k_rows(forest.predict_proba(X), top)
+    return forest.classes[idx], probs
+
+
+def predict_codes(X, model_data):
+    """Most likely class code per row, as a compact integer array."""
+    return compiled_forest(model_data).predict_codes(X)
+
+
+@timed("npk_prediction_seconds", kind="anytime")
+def predict_anytime(X, model_data, budget=None):
+    """Early-exit class codes: ((n,) codes, (n,) trees used, (n,) guaranteed).
+
+    Stops voting per reading once the answer is settled or `budget` seconds
+    have passed; see CompiledForest.predict_anytime. Without a budget every
+    code equals `predict_codes`.
+    """
+    return compiled_forest(model_data).predict_anytime(X, budget)
+
+
+def decode(codes, model_data):
+    """Map class codes (any shape) to crop names."""
+    return compiled_forest(model_data).decode(codes)
+
+
+def anytime_crop(n, p, k, model_data, budget=None):
+    """UI edge: (crop, trees used, guaranteed) for one reading under a latency budget in seconds."""
+    codes, used, guaranteed = predict_anytime([[n, p, k]], model_data, budget)
+    return decode(codes[0], model_data), int(used[0]), bool(guaranteed[0])
+
+
+def top_crops(n, p, k, model_data, top=3):
+    """UI edge: [(crop, probability), ...] for one reading, best first."""
+    codes, probs = predict_top_k([[n, p, k]], model_data, top)
+    return list(zip(decode(codes[0], model_data).tolist(), probs[0].tolist()))
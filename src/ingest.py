@@ -0,0 +1,366 @@
+"""
+Streaming Sensor Ingestion
+- Accepts NPK probe readings over HTTP (JSON array or newline-delimited JSON)
+- Buffers readings in a bounded ring buffer; producers get backpressure when full
+- Scores each batch (soil health + predicted crop) in a background worker
+- Writes scored readings to the history store in batches
+- Optionally feeds a StreamAnalyzer that emits threshold-crossing events
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import yaml
+
+from src.agronomy import KB, compute_soil_health, predict_crops
+from src.history_store import HistoryStore, DEFAULT_DB_PATH
+from src.stream_analytics import StreamAnalyzer
+from src.profiling import profiled
+from src.telemetry import count, render_prometheus, timed
+
+DEFAULT_USER = "default"
+# Upper bound on the encoded size of one reading; a POST body may hold a buffer's worth
+MAX_READING_BYTES = 512
+
+
+def load_params(params_path="params.yaml"):
+    """Load parameters from params.yaml."""
+    with open(params_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def parse_reading(obj, now=None):
+    """Validate a raw probe payload and normalize it into a reading dict.
+
+    Required keys: probe, N, P, K. Optional: field (defaults to the probe id),
+    user and ts (epoch seconds, defaults to arrival time).
+    """
+    try:
+        probe = str(obj["probe"])
+        n, p, k = float(obj["N"]), float(obj["P"]), float(obj["K"])
+        ts = float(obj["ts"]) if obj.get("ts") is not None else (now or time.time())
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid reading {obj!r}: {e}")
+    if not all(map(math.isfinite, (n, p, k))):
+        raise ValueError(f"Invalid reading {obj!r}: nutrient values must be finite")
+    if min(n, p, k) < 0:
+        raise ValueError(f"Invalid reading {obj!r}: nutrient values must be non-negative")
+    if not math.isfinite(ts):
+        raise ValueError(f"Invalid reading {obj!r}: ts must be finite")
+    return {
+        "probe": probe,
+        "user_id": str(obj.get("user", DEFAULT_USER)),
+        "field_id": str(obj.get("field", probe)),
+        "ts": ts,
+        "N": n, "P": p, "K": k,
+    }
+
+
+class RingBuffer:
+    """Bounded FIFO of readings shared by producer threads and one consumer.
+
+    `put_many` is all-or-nothing: it waits until the whole batch fits and
+    gives up after `timeout`, which is how backpressure reaches producers.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._head = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return self._size
+
+    def put_many(self, items, timeout=None):
+        """Append items; return False if they did not fit within `timeout`."""
+        n = len(items)
+        if n > self.capacity:
+            raise ValueError(f"Batch of {n} exceeds buffer capacity {self.capacity}")
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.capacity - self._size >= n or self._closed, timeout):
+                return False
+            if self._closed:
+                return False
+            tail = (self._head + self._size) % self.capacity
+            for item in items:
+                self._slots[tail] = item
+                tail = (tail + 1) % self.capacity
+            self._size += n
+            self._cond.notify_all()
+            return True
+
+    def get_batch(self, max_items, timeout=None):
+        """Remove and return up to `max_items`, waiting up to `timeout` for a full batch."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._size >= max_items or self._closed, timeout)
+            n = min(self._size, max_items)
+            batch = []
+            for _ in range(n):
+                batch.append(self._slots[self._head])
+                self._slots[self._head] = None
+                self._head = (self._head + 1) % self.capacity
+            self._size -= n
+            if n:
+                self._cond.notify_all()
+            return batch
+
+    def close(self):
+        """Wake all waiters; further puts are rejected."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class IngestPipeline:
+    """Buffer → score → batch-write pipeline driven by a single worker thread.
+
+    model_data is the bundle produced by src/train.py; without it readings are
+    stored with a health score but no predicted crop. When an analyzer is
+    given, every written batch is folded into its per-field running state.
+    A failed store write is retried `write_retries` times, backing off from
+    `retry_delay` seconds, before the batch is counted as failed.
+    """
+
+    def __init__(self, store, model_data=None, capacity=65536, batch_size=1024, flush_interval=0.25,
+                 analyzer=None, write_retries=3, retry_delay=0.1):
+        self.store = store
+        self.model_data = model_data
+        self.analyzer = analyzer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_retries = write_retries
+        self.retry_delay = retry_delay
+        self.buffer = RingBuffer(capacity)
+        self.stats = {"received": 0, "rejected": 0, "written": 0, "retried": 0, "failed": 0, "batches": 0}
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+
+    def start(self):
+        self._worker = threading.Thread(target=self._run, name="npk-ingest", daemon=True)
+        self._worker.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Stop accepting readings, flush what is buffered and join the worker."""
+        self._stop.set()
+        self.buffer.close()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def submit(self, readings, timeout=1.0):
+        """Queue parsed readings; return False (and count them rejected) if the buffer stays full."""
+        ok = self.buffer.put_many(readings, timeout)
+        with self._lock:
+            self.stats["received" if ok else "rejected"] += len(readings)
+        count("npk_ingest_readings", len(readings), status="received" if ok else "rejected")
+        return ok
+
+    def snapshot_stats(self):
+        """Return a copy of the pipeline counters plus the current buffer depth."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["buffered"] = len(self.buffer)
+        return stats
+
+    def latest(self, probe=None):
+        """Return the latest scored reading for a probe, or for all probes."""
+        with self._lock:
+            if probe is not None:
+                return dict(self._latest[probe]) if probe in self._latest else None
+            return {k: dict(v) for k, v in self._latest.items()}
+
+    def _run(self):
+        while not (self._stop.is_set() and len(self.buffer) == 0):
+            batch = self.buffer.get_batch(self.batch_size, timeout=self.flush_interval)
+            if not batch:
+                continue
+            try:
+                self.process_batch(batch)
+            except Exception as e:
+                print(f"⚠️ Failed to ingest batch of {len(batch)} readings: {e}")
+                with self._lock:
+                    self.stats["failed"] += len(batch)
+                count("npk_ingest_readings", len(batch), status="failed")
+
+    def _write(self, batch):
+        # add_readings is one transaction, so a failed attempt leaves nothing behind to duplicate
+        for attempt in range(self.write_retries + 1):
+            try:
+                return self.store.add_readings(batch)
+            except Exception as e:
+                if attempt == self.write_retries:
+                    raise
+                print(f"⚠️ History store write of {len(batch)} readings failed, retrying: {e}")
+                with self._lock:
+                    self.stats["retried"] += len(batch)
+                count("npk_ingest_readings", len(batch), status="retried")
+                time.sleep(self.retry_delay * 2 ** attempt)
+
+    @timed("npk_ingest_batch_seconds")
+    def process_batch(self, batch):
+        """Score a batch of readings and write it to the store in one transaction."""
+        for r in batch:
+            r["health"] = compute_soil_health(r["N"], r["P"], r["K"])
+        if self.model_data is not None:
+            X = np.array([[r["N"], r["P"], r["K"]] for r in batch])
+            for r, crop in zip(batch, predict_crops(X, self.model_data)):
+                r["crop"] = str(crop)
+        for r in batch:
+            r["note"] = f"probe:{r['probe']}"
+
+        self._write(batch)
+        if self.analyzer is not None:
+            self.analyzer.update_batch(batch)
+
+        with self._lock:
+            for r in batch:
+                self._latest[r["probe"]] = {
+                    "field": r["field_id"], "ts": r["ts"],
+                    "N": r["N"], "P": r["P"], "K": r["K"],
+                    "health": r["health"], "crop": r.get("crop"),
+                }
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        count("npk_ingest_readings", len(batch), status="written")
+
+
+# ─── HTTP Transport ───────────────────────────────────────────────────────────
+
+def make_handler(pipeline, submit_timeout=1.0):
+    """Build a request handler class bound to a pipeline.
+
+    POST /readings   JSON object, JSON array or NDJSON body → 202, 400, 413 or 503;
+                     bodies over MAX_READING_BYTES per buffer slot get a 413 unread
+    GET  /probes     latest scored reading per probe
+    GET  /stats      pipeline counters and buffer depth
+    GET  /events     recent analytics events (when an analyzer is attached)
+    GET  /metrics    Prometheus text exposition of src.telemetry
+    """
+
+    class IngestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        MAX_BODY_BYTES = pipeline.buffer.capacity * MAX_READING_BYTES
+
+        def _reply(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path != "/readings":
+                return self._reply(404, {"error": "not found"})
+            try:
+                length = int(self.headers["Content-Length"])
+                if length < 0:
+                    raise ValueError(length)
+            except (TypeError, ValueError):
+                self.close_connection = True
+                return self._reply(400, {"error": "Content-Length must be a non-negative integer"})
+            if length > self.MAX_BODY_BYTES:
+                # The body stays unread, so this connection cannot carry another request
+                self.close_connection = True
+                return self._reply(413, {"error": f"body larger than {self.MAX_BODY_BYTES} bytes"})
+            raw = self.rfile.read(length)
+            try:
+                text = raw.decode()
+                try:
+                    objs = json.loads(text)
+                    objs = objs if isinstance(objs, list) else [objs]
+                except ValueError:
+                    objs = [json.loads(line) for line in text.splitlines() if line.strip()]
+                now = time.time()
+                readings = [parse_reading(o, now) for o in objs]
+            except ValueError as e:
+                return self._reply(400, {"error": str(e)})
+
+            if len(readings) > pipeline.buffer.capacity:
+                return self._reply(413, {"error": f"batch larger than buffer capacity {pipeline.buffer.capacity}"})
+            if not pipeline.submit(readings, timeout=submit_timeout):
+                return self._reply(503, {"error": "ingest buffer full, retry later"}, {"Retry-After": "1"})
+            return self._reply(202, {"accepted": len(readings)})
+
+        def do_GET(self):
+            if self.path == "/probes":
+                return self._reply(200, pipeline.latest())
+            if self.path == "/stats":
+                return self._reply(200, pipeline.snapshot_stats())
+            if self.path == "/events" and pipeline.analyzer is not None:
+                return self._reply(200, pipeline.analyzer.recent_events())
+            if self.path == "/metrics":
+                body = render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return None
+            return self._reply(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return IngestHandler
+
+
+def serve(pipeline, host="127.0.0.1", port=8765, submit_timeout=1.0):
+    """Create (but do not start) an HTTP server feeding the pipeline. Port 0 picks a free port."""
+    return ThreadingHTTPServer((host, port), make_handler(pipeline, submit_timeout))
+
+
+@profiled("ingest", all_threads=True)
+def main():
+    """Run the ingestion service until interrupted."""
+    params = load_params()
+    cfg = params.get("ingest", {})
+
+    parser = argparse.ArgumentParser(description="NPK probe ingestion service")
+    parser.add_argument("--host", default=cfg.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=cfg.get("port", 8765))
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--model", default="models/npk_crop_model.pkl")
+    args = parser.parse_args()
+
+    model_data = joblib.load(args.model)
+    KB.check_classes(model_data["label_encoder"].classes_)
+    pipeline = IngestPipeline(
+        HistoryStore(args.db),
+        model_data=model_data,
+        capacity=cfg.get("buffer_capacity", 65536),
+        batch_size=cfg.get("batch_size", 1024),
+        flush_interval=cfg.get("flush_interval", 0.25),
+        analyzer=StreamAnalyzer(
+            alpha=cfg.get("ewma_alpha", 0.2),
+            crop_stability=cfg.get("crop_stability", 3),
+            on_event=lambda e: print(f"📣 {e['type']}: {e['field_id']} {e['previous']} → {e['current']}"),
+        ),
+    ).start()
+    server = serve(pipeline, args.host, args.port)
+    print(f"Ingesting NPK probe readings on http://{args.host}:{server.server_port}/readings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pipeline.stop()
+        print(f"\n✅ Ingestion stopped. Stats: {pipeline.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Compiled Agronomy Knowledge Base
+- Loads crops, seasons, rotation rules, reduction advice and ICAR benchmarks
+  from one versioned JSON data file (src/knowledge_base.json by default)
+- Compiles them once into a read-only `KnowledgeBase` with `__slots__` and
+  numpy tables: integer crop ids, per-crop requirement ranges, midpoints and
+  tolerances, family ids, a family x family rotation-rank matrix and a
+  season x crop membership mask
+- Family and season indexes map each group to its crop ids, so filtered
+  queries never scan the whole catalogue
+- Crop ids follow sorted crop names, the same order as the model's
+  LabelEncoder, so `model.predict` output indexes the tables directly
+- `legacy_tables()` rebuilds the original module dicts for display code
+
+Set NPK_KNOWLEDGE_BASE to load a different data file.
+"""
+
+import json
+import os
+from bisect import bisect_right
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+NUTRIENTS = ("N", "P", "K")
+NUTRIENT_INDEX = {nut: i for i, nut in enumerate(NUTRIENTS)}
+
+DEFAULT_KB_PATH = os.environ.get(
+    "NPK_KNOWLEDGE_BASE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base.json"),
+)
+
+
+def _frozen(array):
+    array.flags.writeable = False
+    return array
+
+
+class KnowledgeBase:
+    """Read-only, array-backed agronomy knowledge compiled from a parsed data document.
+
+    Numeric tables are numpy arrays indexed by crop id (rows) and nutrient
+    (columns, N/P/K). Scalar hot paths read the equivalent plain tuples
+    (`limits`, `soil_bounds`, `band_edges`) to avoid numpy scalar overhead.
+    """
+
+    __slots__ = (
+        "version", "crops", "crop_index", "display_order", "display_rank", "emoji",
+        "families", "family_id", "family_crops", "rotation_rank", "impact",
+        "req_low", "req_high", "req_mid", "tolerance", "limits",
+        "seasons", "season_months", "season_colors", "season_crops", "season_mask",
+        "reduction_tips", "reduction_methods",
+        "band_edges", "band_ranges", "soil_bounds", "optimal_mid", "_document",
+    )
+
+    def __init__(self, document):
+        version = document.get("version")
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported knowledge base version {version!r} (expected {SCHEMA_VERSION})")
+        if tuple(document.get("nutrients", ())) != NUTRIENTS:
+            raise ValueError(f"Knowledge base nutrients must be {list(NUTRIENTS)}")
+        self.version = version
+
+        # ── Crops ──
+        entries = document["crops"]
+        names = [c["name"] for c in entries]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate crop names in knowledge base")
+        self.crops = tuple(sorted(names))
+        self.crop_index = {name: i for i, name in enumerate(self.crops)}
+        by_id = sorted(entries, key=lambda c: self.crop_index[c["name"]])
+        self.display_order = _frozen(np.array([self.crop_index[n] for n in names], dtype=np.intp))
+        self.display_rank = _frozen(np.argsort(self.display_order))  # crop id -> position in the file
+        self.emoji = tuple(c["emoji"] for c in by_id)
+
+        req = np.array([c["requirements"] for c in by_id], dtype=float).reshape(len(by_id), 3, 2)
+        if np.any(req[:, :, 0] > req[:, :, 1]):
+            raise ValueError("Crop requirement ranges must satisfy low <= high")
+        self.req_low = _frozen(req[:, :, 0].copy())
+        self.req_high = _frozen(req[:, :, 1].copy())
+        self.req_mid = _frozen((self.req_low + self.req_high) / 2)
+        # Tolerance zone: 30% of the optimal width (at least 10 mg/kg) still scores well
+        self.tolerance = _frozen(np.maximum((self.req_high - self.req_low) * 0.3, 10))
+        self.limits = tuple(
+            tuple(zip(lo, hi, mid, tol))
+            for lo, hi, mid, tol in zip(self.req_low.tolist(), self.req_high.tolist(),
+                                        self.req_mid.tolist(), self.tolerance.tolist())
+        )
+        self.impact = _frozen(np.array([c["impact"] for c in by_id], dtype=np.int16).reshape(len(by_id), 3))
+        self.reduction_tips = tuple(tuple(c["reduction_tips"]) for c in by_id)
+
+        # ── Families & rotation ──
+        rules = document["rotation_rules"]
+        families = list(rules)
+        for c in by_id:
+            if c["family"] not in families:
+                families.append(c["family"])
+        for preferred in rules.values():
+            families.extend(f for f in preferred if f not in families)
+        self.families = tuple(families)
+        family_index = {f: i for i, f in enumerate(self.families)}
+        self.family_id = _frozen(np.array([family_index[c["family"]] for c in by_id], dtype=np.int16))
+        display_family = self.family_id[self.display_order]
+        self.family_crops = tuple(
+            _frozen(self.display_order[display_family == f]) for f in range(len(self.families))
+        )
+        rank = np.full((len(families), len(families)), -1, dtype=np.int8)
+        for fam, preferred in rules.items():
+            for r, other in enumerate(preferred):
+                rank[family_index[fam], family_index[other]] = r
+        self.rotation_rank = _frozen(rank)
+
+        # ── Seasons ──
+        seasons = document["seasons"]
+        self.seasons = tuple(s["name"] for s in seasons)
+        self.season_months = tuple(s["months"] for s in seasons)
+        self.season_colors = tuple(s["color"] for s in seasons)
+        unknown = {c for s in seasons for c in s["crops"]} - set(self.crops)
+        if unknown:
+            raise ValueError(f"Seasons reference unknown crops: {sorted(unknown)}")
+        self.season_crops = tuple(
+            _frozen(np.array([self.crop_index[c] for c in s["crops"]], dtype=np.intp)) for s in seasons
+        )
+        mask = np.zeros((len(seasons), len(self.crops)), dtype=bool)
+        for i, ids in enumerate(self.season_crops):
+            mask[i, ids] = True
+        self.season_mask = _frozen(mask)
+
+        # ── Reduction methods & soil benchmarks ──
+        self.reduction_methods = tuple(document["reduction_methods"][nut] for nut in NUTRIENTS)
+        bench = [document["soil_benchmarks"][nut] for nut in NUTRIENTS]
+        for nut, b in zip(NUTRIENTS, bench):
+            ranges = b["ranges"]
+            if len(ranges) != 5 or any(a["max"] != z["min"] for a, z in zip(ranges, ranges[1:])):
+                raise ValueError(f"{nut} benchmark must have five contiguous ranges")
+        self.band_ranges = tuple(tuple(b["ranges"]) for b in bench)
+        self.band_edges = tuple(tuple([r["min"] for r in b["ranges"]] + [b["ranges"][-1]["max"]]) for b in bench)
+        # (optimal low, optimal high, Very Low upper bound, High upper bound) per nutrient
+        self.soil_bounds = tuple(
+            (float(b["optimal_range"][0]), float(b["optimal_range"][1]),
+             float(b["ranges"][0]["max"]), float(b["ranges"][3]["max"]))
+            for b in bench
+        )
+        self.optimal_mid = tuple(b["optimal_mid"] for b in bench)
+        # Set last: once present, __setattr__ rejects further writes
+        self._document = document
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "_document"):
+            raise AttributeError("KnowledgeBase is read-only")
+        object.__setattr__(self, name, value)
+
+    def __len__(self):
+        return len(self.crops)
+
+    def __repr__(self):
+        return f"KnowledgeBase(version={self.version}, crops={len(self.crops)}, seasons={len(self.seasons)})"
+
+    @classmethod
+    def load(cls, path=DEFAULT_KB_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    # ─── Lookups ─────────────────────────────────────────────────────────────
+
+    def crop_id(self, name):
+        """Integer id for a crop name, or None when unknown."""
+        return self.crop_index.get(name)
+
+    def crops_in(self, season=None, family=None):
+        """Crop ids (file order) in a season and/or family, from the precomputed indexes."""
+        ids = self.display_order
+        if season is not None:
+            ids = self.season_crops[self.seasons.index(season)]
+        if family is not None:
+            members = self.family_crops[self.families.index(family)]
+            ids = members if season is None else ids[np.isin(ids, members)]
+        return ids
+
+    def check_classes(self, classes):
+        """Raise ValueError unless `classes` (e.g. label_encoder.classes_) match the crop ids."""
+        classes = tuple(str(c) for c in classes)
+        if classes != self.crops:
+            raise ValueError(
+                f"Model classes {list(classes)} do not match knowledge base crops {list(self.crops)}"
+            )
+
+    def band(self, value, nutrient_id):
+        """Index of the ICAR range containing `value`; out-of-range values map to the last band."""
+        i = bisect_right(self.band_edges[nutrient_id], value) - 1
+        return i if 0 <= i < 5 else 4
+
+    # ─── Legacy views ────────────────────────────────────────────────────────
+
+    def legacy_tables(self):
+        """Rebuild the original dict tables in data-file order, for display code.
+
+        Returns (CROP_NUTRIENT_IMPACT, CROP_REQUIREMENTS, CROP_SEASONS, ROTATION_RULES,
+        NPK_REDUCTION_METHODS, CROP_REDUCTION_TIPS, SOIL_NPK_BENCHMARKS).
+        """
+        doc = self._document
+        impact, requirements, tips = {}, {}, {}
+        for c in doc["crops"]:
+            impact[c["name"]] = {**dict(zip(NUTRIENTS, c["impact"])), "family": c["family"], "emoji": c["emoji"]}
+            requirements[c["name"]] = {nut: tuple(r) for nut, r in zip(NUTRIENTS, c["requirements"])}
+            tips[c["name"]] = dict(zip(NUTRIENTS, c["reduction_tips"]))
+        seasons = {
+            s["name"]: {"months": s["months"], "crops": list(s["crops"]), "color": s["color"]}
+            for s in doc["seasons"]
+        }
+        rotation = {fam: list(preferred) for fam, preferred in doc["rotation_rules"].items()}
+        benchmarks = {
+            nut: {**b, "optimal_range": tuple(b["optimal_range"])}
+            for nut, b in doc["soil_benchmarks"].items()
+        }
+        return impact, requirements, seasons, rotation, doc["reduction_methods"], tips, benchmarks
+
+
+def load_knowledge_base(path=DEFAULT_KB_PATH):
+    """Load and compile the knowledge base data file."""
+    return KnowledgeBase.load(path)
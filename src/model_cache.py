@@ -0,0 +1,273 @@
+"""
+Multi-Tenant Model Cache
+- One process serves many regional / cooperative bundles, keyed by tenant id
+- A tenant is `<root>/<tenant>.pkl` (a bundle from src/train.py) or a model
+  registry directory `<root>/<tenant>/` (src/model_registry.py) whose ACTIVE
+  version is served; registry tenants re-read ACTIVE every `check_interval`
+  seconds and reload when it moves
+- Bundles load lazily; concurrent first requests for a tenant wait on one
+  load (single-flight) instead of each unpickling and compiling it
+- Cached bundles are serving views: compiled forest, label encoder and
+  metadata. The scikit-learn estimator and scaler are dropped once compiled,
+  since serving never reads them
+- Resident bytes are tracked per tenant (compiled arrays and lookup tables,
+  plus the pickled size of the small remainder); least-recently-used tenants
+  are evicted once the total exceeds `max_bytes`. The newest bundle is always
+  kept, and an evicted bundle stays alive until requests holding it finish
+- `compact="uint8"` (or "float16") stores each tenant's forest compacted
+  (src.compiled_model.compact_forest), after checking it against the full
+  forest on random two-decimal readings
+
+Usage:
+    python -m src.model_cache --root models/tenants --max-mb 256    # load every tenant, print residency
+"""
+
+import argparse
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src import telemetry
+from src.compiled_model import CompiledForest, check_compaction, compact_forest, compiled_forest
+from src.model_registry import ModelRegistry
+
+DEFAULT_TENANT_ROOT = "models/tenants"
+DEFAULT_MAX_BYTES = 512 << 20
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+SERVING_KEYS = ("compiled", "label_encoder", "feature_names", "target_names", "accuracy")
+COMPACT_CHECK_ROWS = 20000
+COMPACT_MAX_DISAGREEMENT = 0.001
+
+
+def serving_view(model_data):
+    """The bundle reduced to what serving reads: compiled forest, label encoder and metadata."""
+    compiled_forest(model_data)
+    return {key: model_data[key] for key in SERVING_KEYS if key in model_data}
+
+
+def bundle_nbytes(model_data):
+    """Estimated resident bytes of a bundle: array sizes, plus the pickled size of everything else."""
+    total = 0
+    for value in model_data.values():
+        if isinstance(value, (CompiledForest, np.ndarray)):
+            total += value.nbytes
+        else:
+            total += len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    return total
+
+
+def list_tenants(root=DEFAULT_TENANT_ROOT):
+    """Tenant ids with a bundle file or registry directory under `root`."""
+    if not os.path.isdir(root):
+        return []
+    names = set()
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry)
+        if entry.endswith(".pkl") and os.path.isfile(path):
+            names.add(entry[:-4])
+        elif os.path.isdir(path):
+            names.add(entry)
+    return sorted(name for name in names if TENANT_PATTERN.match(name))
+
+
+class _Entry:
+    __slots__ = ("model_data", "nbytes", "version", "load_seconds", "hits", "checked")
+
+    def __init__(self, model_data, nbytes, version, load_seconds):
+        self.model_data = model_data
+        self.nbytes = nbytes
+        self.version = version
+        self.load_seconds = load_seconds
+        self.hits = 0
+        self.checked = time.monotonic()
+
+
+class _Load:
+    """An in-flight load that later requests for the same tenant wait on."""
+    __slots__ = ("done", "model_data", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.model_data = None
+        self.error = None
+
+
+# ─── Cache ───────────────────────────────────────────────────────────────────
+
+class ModelCache:
+    """Tenant → bundle cache with LRU eviction under a memory cap; thread-safe.
+
+    `get(tenant)` raises ValueError for malformed ids and FileNotFoundError
+    for tenants with nothing to serve. `validate(model_data)` may raise to
+    refuse a bundle; failed loads are not cached, so the next request
+    retries. A tenant whose compacted forest changes more than
+    COMPACT_MAX_DISAGREEMENT of the check readings' crops is refused the
+    same way.
+    """
+
+    def __init__(self, root=DEFAULT_TENANT_ROOT, max_bytes=DEFAULT_MAX_BYTES, check_interval=1.0,
+                 validate=None, compact=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self.validate = validate
+        self.compact = compact
+        self.evictions = 0
+        self._entries = OrderedDict()  # least recently used first
+        self._loads = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, tenant):
+        return tenant in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def resident_bytes(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def get(self, tenant):
+        """The tenant's bundle, loaded on first use."""
+        if not isinstance(tenant, str) or not TENANT_PATTERN.match(tenant):
+            raise ValueError(f"Invalid tenant id {tenant!r}")
+        entry = self._entries.get(tenant)
+        if entry is not None and entry.version is not None:
+            self._recheck(tenant, entry)
+
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry is not None:
+                self._entries.move_to_end(tenant)
+                entry.hits += 1
+            else:
+                pending = self._loads.get(tenant)
+                owner = pending is None
+                if owner:
+                    pending = self._loads[tenant] = _Load()
+        if entry is not None:
+            telemetry.count("npk_model_cache_requests", outcome="hit")
+            return entry.model_data
+        telemetry.count("npk_model_cache_requests", outcome="miss" if owner else "wait")
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.model_data
+
+        entry = None
+        try:
+            entry = self._load(tenant)
+            pending.model_data = entry.model_data
+        except BaseException as exc:
+            pending.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._loads[tenant]
+                if entry is not None:
+                    self._entries[tenant] = entry
+                    self._evict(keep=tenant)
+            pending.done.set()
+        return entry.model_data
+
+    def _recheck(self, tenant, entry):
+        """Drop a registry tenant's bundle when its ACTIVE pointer has moved."""
+        now = time.monotonic()
+        if now - entry.checked < self.check_interval:
+            return
+        entry.checked = now
+        if ModelRegistry(os.path.join(self.root, tenant)).active() != entry.version:
+            self.invalidate(tenant, entry)
+
+    def _load(self, tenant):
+        start = time.perf_counter()
+        with telemetry.timer("npk_model_load_seconds", source="tenant"):
+            registry_dir = os.path.join(self.root, tenant)
+            if os.path.isdir(registry_dir):
+                registry = ModelRegistry(registry_dir)
+                version = registry.active()
+                if version is None:
+                    raise FileNotFoundError(f"Tenant {tenant!r} has no active model version in {registry_dir}")
+                model_data = registry.load(version)
+            else:
+                path = registry_dir + ".pkl"
+                if not os.path.isfile(path):
+                    raise FileNotFoundError(f"No model bundle for tenant {tenant!r} in {self.root}")
+                import joblib
+
+                version, model_data = None, joblib.load(path)
+            model_data = serving_view(model_data)
+            if self.compact:
+                forest = model_data["compiled"]
+                compact = compact_forest(forest, self.compact)
+                readings = np.round(np.random.default_rng(0).uniform(0, 400, (COMPACT_CHECK_ROWS, 3)), 2)
+                check_compaction(forest, compact, readings, max_disagreement=COMPACT_MAX_DISAGREEMENT)
+                model_data["compiled"] = compact
+        if self.validate is not None:
+            self.validate(model_data)
+        return _Entry(model_data, bundle_nbytes(model_data), version, time.perf_counter() - start)
+
+    def _evict(self, keep):
+        """Drop least-recently-used tenants until under the cap (caller holds the lock)."""
+        total = sum(entry.nbytes for entry in self._entries.values())
+        for tenant in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if tenant == keep:
+                continue
+            total -= self._entries.pop(tenant).nbytes
+            self.evictions += 1
+            telemetry.count("npk_model_cache_evictions")
+
+    def invalidate(self, tenant, entry=None):
+        """Forget a tenant's bundle (only `entry`, if given) so the next request reloads it."""
+        with self._lock:
+            if tenant in self._entries and entry in (None, self._entries[tenant]):
+                del self._entries[tenant]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Per-tenant residency, least recently used first."""
+        with self._lock:
+            return [{"tenant": tenant, "version": entry.version, "resident_mb": entry.nbytes / 2 ** 20,
+                     "hits": entry.hits, "load_ms": entry.load_seconds * 1000}
+                    for tenant, entry in self._entries.items()]
+
+
+def main():
+    """Load every tenant under --root through a capped cache and print what stays resident."""
+    parser = argparse.ArgumentParser(description="Warm the multi-tenant model cache")
+    parser.add_argument("--root", default=DEFAULT_TENANT_ROOT)
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 2 ** 20)
+    parser.add_argument("--compact", choices=("float16", "uint8"), help="Serve compacted forests")
+    args = parser.parse_args()
+
+    cache = ModelCache(args.root, max_bytes=int(args.max_mb * 2 ** 20), compact=args.compact)
+    tenants = list_tenants(args.root)
+    if not tenants:
+        print(f"No tenant bundles in {args.root} (<tenant>.pkl or <tenant>/ registries)")
+        return
+    for tenant in tenants:
+        try:
+            cache.get(tenant)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"⚠️  {tenant}: {e}")
+    for row in cache.stats():
+        print(f"  {row['tenant']:<24} {row['version'] or '-':<8} {row['resident_mb']:7.1f} MiB  "
+              f"loaded in {row['load_ms']:.0f} ms")
+    print(f"✅ {len(cache)}/{len(tenants)} tenants resident, {cache.resident_bytes / 2 ** 20:.1f} MiB "
+          f"of {args.max_mb:.0f} MiB, {cache.evictions} evicted")
+
+
+if __name__ == "__main__":
+    main()
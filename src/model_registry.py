@@ -0,0 +1,461 @@
+"""
+Model Registry
+- Versioned bundles under models/registry/<version>/ (bundle.pkl + meta.json)
+  with content hash, size, metrics from reports/metrics.json and a latency
+  benchmark taken at registration; identical bundles are registered once
+- ACTIVE names the served version and SHADOW an optional candidate; both are
+  rewritten atomically (temp file + os.replace), so readers never see a
+  half-written pointer
+- `LiveModel` serves the active bundle and hot-swaps it in process when ACTIVE
+  changes: the new version loads beside the old one and a single reference
+  assignment switches requests over, so nothing restarts or blocks
+- `ShadowScorer` replays a sample of live requests against the candidate in a
+  background thread and records agreement and latency deltas
+
+Usage:
+    python -m src.model_registry register models/npk_crop_model.pkl --activate
+    python -m src.model_registry list
+    python -m src.model_registry activate v0002
+    python -m src.model_registry shadow v0003        # or: shadow --clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src import telemetry
+from src.compiled_model import compiled_forest
+from src.inference import decode, predict_codes
+
+DEFAULT_REGISTRY = "models/registry"
+DEFAULT_METRICS_PATH = "reports/metrics.json"
+BUNDLE_FILE = "bundle.pkl"
+META_FILE = "meta.json"
+VERSION_PATTERN = re.compile(r"^v(\d{4,})$")
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def benchmark_latency(model_data, rounds=200, batch_rows=10000, seed=0):
+    """Single-reading p50/p95 latency (ms) and batch throughput (rows/s) of the compiled forest."""
+    forest = compiled_forest(model_data)
+    X = np.random.default_rng(seed).uniform(0, 300, size=(batch_rows, 3))
+    single = []
+    for row in X[:rounds]:
+        start = time.perf_counter()
+        forest.predict_codes(row)
+        single.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    forest.predict_codes(X)
+    batch = time.perf_counter() - start
+    p50, p95 = np.percentile(np.array(single) * 1000, [50, 95])
+    return {"single_p50_ms": round(float(p50), 4), "single_p95_ms": round(float(p95), 4),
+            "batch_rows_per_s": round(batch_rows / batch)}
+
+
+# ─── Registry ────────────────────────────────────────────────────────────────
+
+class ModelRegistry:
+    """A directory of immutable, versioned model bundles plus ACTIVE / SHADOW pointers."""
+
+    def __init__(self, root=DEFAULT_REGISTRY):
+        self.root = root
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def versions(self):
+        """Registered version ids, oldest first."""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        found = [n for n in names if VERSION_PATTERN.match(n) and os.path.isfile(self._path(n, META_FILE))]
+        return sorted(found, key=lambda n: int(VERSION_PATTERN.match(n).group(1)))
+
+    def meta(self, version):
+        """Metadata dict for a version; ValueError when it is not registered."""
+        try:
+            with open(self._path(version, META_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"Unknown model version {version!r} in {self.root}") from None
+
+    def bundle_path(self, version):
+        return self._path(version, BUNDLE_FILE)
+
+    def register(self, bundle_path, metrics_path=DEFAULT_METRICS_PATH, activate=False, note=None):
+        """Copy a bundle into the registry and return its version (the existing one if already present)."""
+        import joblib
+
+        sha = file_sha256(bundle_path)
+        for version in self.versions():
+            if self.meta(version)["sha256"] == sha:
+                if activate:
+                    self.activate(version)
+                return version
+
+        model_data = joblib.load(bundle_path)
+        metrics = None
+        if metrics_path and os.path.exists(metrics_path):
+            with open(metrics_path) as f:
+                metrics = json.load(f)
+        existing = self.versions()
+        number = int(VERSION_PATTERN.match(existing[-1]).group(1)) + 1 if existing else 1
+        version = f"v{number:04d}"
+        meta = {
+            "version": version,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "source": os.path.abspath(bundle_path),
+            "sha256": sha,
+            "size_bytes": os.path.getsize(bundle_path),
+            "classes": [str(c) for c in model_data["label_encoder"].classes_],
+            "accuracy": model_data.get("accuracy"),
+            "metrics": metrics,
+            "latency": benchmark_latency(model_data),
+            "note": note,
+        }
+
+        # Build the version in a scratch directory and publish it with one rename
+        os.makedirs(self.root, exist_ok=True)
+        staging = self._path(f".staging-{version}-{os.getpid()}")
+        os.makedirs(staging)
+        try:
+            shutil.copyfile(bundle_path, os.path.join(staging, BUNDLE_FILE))
+            with open(os.path.join(staging, META_FILE), "w") as f:
+                json.dump(meta, f, indent=2)
+            os.rename(staging, self._path(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        if activate:
+            self.activate(version)
+        return version
+
+    def _read_pointer(self, name):
+        try:
+            with open(self._path(name)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _set_pointer(self, name, version):
+        if version is None:
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+            return
+        self.meta(version)  # validates
+        os.makedirs(self.root, exist_ok=True)
+        _write_atomic(self._path(name), version + "\n")
+
+    def active(self):
+        """The served version, or None."""
+        return self._read_pointer("ACTIVE")
+
+    def activate(self, version):
+        """Atomically point ACTIVE at `version`; running LiveModels switch on their next check."""
+        self._set_pointer("ACTIVE", version)
+
+    def shadow(self):
+        """The shadow candidate version, or None."""
+        return self._read_pointer("SHADOW")
+
+    def set_shadow(self, version):
+        """Score a sample of live traffic with `version` as well (None stops shadowing)."""
+        self._set_pointer("SHADOW", version)
+
+    def load(self, version):
+        """Load a version's bundle after checking it against the recorded hash."""
+        import joblib
+
+        meta = self.meta(version)
+        path = self.bundle_path(version)
+        if file_sha256(path) != meta["sha256"]:
+            raise ValueError(f"Model version {version} does not match its recorded sha256")
+        model_data = joblib.load(path)
+        compiled_forest(model_data)
+        return model_data
+
+
+# ─── Shadow Scoring ──────────────────────────────────────────────────────────
+
+class ShadowScorer:
+    """Scores sampled requests with a candidate bundle on a background thread.
+
+    `offer` is cheap for the caller: one random draw and, for sampled
+    requests, a non-blocking put; when the queue is full the request is
+    dropped and counted. Agreement and latency deltas (candidate minus
+    primary) accumulate in `stats()` and in the telemetry registry.
+    """
+
+    def __init__(self, model_data, version, sample_rate=0.1, max_queue=1024, window=2048):
+        self.model_data = model_data
+        self.version = version
+        self.sample_rate = sample_rate
+        self.scored = 0
+        self.agreed = 0
+        self.dropped = 0
+        self.deltas = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name=f"npk-shadow-{version}", daemon=True)
+        self._thread.start()
+
+    def offer(self, X, crops, seconds):
+        """Maybe queue one served request: its (n, 3) readings, served crop names and latency."""
+        if random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait((X, crops, seconds))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._score(*item)
+            finally:
+                self._queue.task_done()
+
+    def _score(self, X, crops, seconds):
+        try:
+            start = time.perf_counter()
+            shadow = decode(predict_codes(X, self.model_data), self.model_data)
+            elapsed = time.perf_counter() - start
+        except Exception:
+            telemetry.count("npk_shadow_requests", outcome="error", version=self.version)
+            return
+        agree = int((np.asarray(shadow) == np.asarray(crops)).sum())
+        total = len(shadow)
+        with self._lock:
+            self.scored += total
+            self.agreed += agree
+            self.deltas.append(elapsed - seconds)
+        telemetry.observe("npk_shadow_seconds", elapsed, version=self.version)
+        telemetry.count("npk_shadow_requests", agree, outcome="agree", version=self.version)
+        telemetry.count("npk_shadow_requests", total - agree, outcome="disagree", version=self.version)
+
+    def join(self):
+        """Wait until every queued request has been scored."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            deltas = np.array(self.deltas) * 1000
+            scored, agreed, dropped = self.scored, self.agreed, self.dropped
+        stats = {"version": self.version, "scored": scored, "dropped": dropped,
+                 "agreement": agreed / scored if scored else None}
+        if len(deltas):
+            p50, p95 = np.percentile(deltas, [50, 95])
+            stats.update(latency_delta_mean_ms=float(deltas.mean()),
+                         latency_delta_p50_ms=float(p50), latency_delta_p95_ms=float(p95))
+        return stats
+
+
+# ─── Live Serving ────────────────────────────────────────────────────────────
+
+class LiveModel:
+    """The active registry version, hot-swapped in process when ACTIVE changes.
+
+    `get()` re-reads the pointers at most every `check_interval` seconds.
+    A new version is loaded (hash-checked and compiled) by one caller while
+    the others keep serving the current bundle, then swapped in with a single
+    assignment. When the registry has no active version, `fallback_path` is
+    served instead. `validate(model_data)` may raise to refuse a bundle; a
+    refused or broken new version leaves the current one in service and is
+    not retried until ACTIVE changes, and a refused or broken shadow
+    candidate is dropped until SHADOW changes.
+    """
+
+    def __init__(self, registry, fallback_path=None, check_interval=1.0, shadow_sample_rate=0.1,
+                 validate=None):
+        self.registry = registry if isinstance(registry, ModelRegistry) else ModelRegistry(registry)
+        self.fallback_path = fallback_path
+        self.validate = validate
+        self.check_interval = check_interval
+        self.shadow_sample_rate = shadow_sample_rate
+        self.shadow = None
+        self._active_failed = None  # ACTIVE version that failed to load, not retried until ACTIVE changes
+        self._shadow_failed = None  # candidate that failed to load, not retried until SHADOW changes
+        self._current = (None, None)  # (version, model_data), replaced as one object
+        self._checked = float("-inf")
+        self._loading = threading.Lock()
+
+    @property
+    def version(self):
+        return self._current[0]
+
+    @property
+    def loaded(self):
+        return self._current[1] is not None
+
+    def get(self):
+        """The bundle to serve for this request."""
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval or self._current[1] is None:
+            self._checked = now
+            self._refresh()
+        if self._current[1] is None:
+            raise FileNotFoundError(f"No active model in {self.registry.root} and no fallback bundle")
+        return self._current[1]
+
+    def _refresh(self):
+        wanted, candidate = self.registry.active(), self.registry.shadow()
+        if candidate == wanted:
+            candidate = None
+        if wanted == self._current[0]:
+            self._active_failed = None  # ACTIVE came back; a later switch to the broken version retries it
+        settled = wanted in (self._current[0], self._active_failed)
+        shadowing = self.shadow.version if self.shadow else self._shadow_failed
+        if settled and self._current[1] is not None and candidate == shadowing:
+            return
+        # Single loader; while it works, everyone else keeps the bundle they have
+        if not self._loading.acquire(blocking=self._current[1] is None):
+            return
+        try:
+            if not settled or self._current[1] is None:
+                try:
+                    self._current = (wanted, self._load(wanted))
+                    self._active_failed = None
+                    telemetry.count("npk_model_swaps", outcome="ok")
+                except Exception as exc:
+                    telemetry.count("npk_model_swaps", outcome="failed")
+                    if self._current[1] is None:
+                        raise
+                    print(f"⚠️  Model {wanted} refused, still serving {self._current[0]}: "
+                          f"{type(exc).__name__}: {exc}", file=sys.stderr)
+                    self._active_failed = wanted
+            if candidate != (self.shadow.version if self.shadow else self._shadow_failed):
+                old, self.shadow, self._shadow_failed = self.shadow, None, None
+                if old is not None:
+                    old.close()
+                if candidate is not None:
+                    self._start_shadow(candidate)
+        finally:
+            self._loading.release()
+
+    def _start_shadow(self, version):
+        # A broken candidate must never take the served model down with it
+        try:
+            model_data = self.registry.load(version)
+            if self.validate is not None:
+                self.validate(model_data)
+        except Exception as exc:
+            telemetry.count("npk_model_swaps", outcome="shadow_failed")
+            print(f"⚠️  Shadow model {version} refused: {type(exc).__name__}: {exc}", file=sys.stderr)
+            self._shadow_failed = version
+            return
+        self.shadow = ShadowScorer(model_data, version, self.shadow_sample_rate)
+        telemetry.count("npk_model_swaps", outcome="shadow_ok")
+
+    def _load(self, version):
+        with telemetry.timer("npk_model_load_seconds"):
+            if version is not None:
+                model_data = self.registry.load(version)
+            elif self.fallback_path and os.path.exists(self.fallback_path):
+                import joblib
+
+                model_data = joblib.load(self.fallback_path)
+                compiled_forest(model_data)
+            else:
+                return None
+        if self.validate is not None:
+            self.validate(model_data)
+        return model_data
+
+    def observe(self, X, crops, seconds):
+        """Report a served request; sampled ones are replayed against the shadow candidate."""
+        shadow = self.shadow
+        if shadow is not None:
+            shadow.offer(np.asarray(X, dtype=float).reshape(-1, 3), crops, seconds)
+
+    def close(self):
+        if self.shadow is not None:
+            self.shadow.close()
+            self.shadow = None
+
+
+def main():
+    """Register, list, activate and shadow model versions."""
+    parser = argparse.ArgumentParser(description="Local model registry")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY)
+    sub = parser.add_subparsers(dest="command", required=True)
+    reg = sub.add_parser("register", help="Add a bundle as a new version")
+    reg.add_argument("bundle", nargs="?", default="models/npk_crop_model.pkl")
+    reg.add_argument("--metrics", default=DEFAULT_METRICS_PATH)
+    reg.add_argument("--note")
+    reg.add_argument("--activate", action="store_true")
+    sub.add_parser("list", help="Show registered versions")
+    act = sub.add_parser("activate", help="Serve a version (running apps switch within seconds)")
+    act.add_argument("version")
+    sha = sub.add_parser("shadow", help="Shadow-score live traffic with a candidate version")
+    sha.add_argument("version", nargs="?")
+    sha.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == "register":
+        version = registry.register(args.bundle, args.metrics, activate=args.activate, note=args.note)
+        print(f"✅ Registered {args.bundle} as {version}" + (" (active)" if registry.active() == version else ""))
+    elif args.command == "list":
+        active, shadow = registry.active(), registry.shadow()
+        for version in registry.versions():
+            meta = registry.meta(version)
+            flag = "*" if version == active else "s" if version == shadow else " "
+            accuracy = meta.get("accuracy")
+            print(f"{flag} {version}  {meta['created']}  {meta['sha256'][:12]}  "
+                  f"{meta['size_bytes'] / 2**20:6.1f} MiB  "
+                  f"acc={'-' if accuracy is None else f'{accuracy:.4f}'}  "
+                  f"p50={meta['latency']['single_p50_ms']:.3f} ms  {meta.get('note') or ''}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"✅ Active model: {args.version}")
+    elif args.command == "shadow":
+        if args.clear == bool(args.version):
+            parser.error("shadow needs a version or --clear")
+        registry.set_shadow(None if args.clear else args.version)
+        print("✅ Shadow scoring " + ("stopped" if args.clear else f"with {args.version}"))
+
+
+if __name__ == "__main__":
+    main()
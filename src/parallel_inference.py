@@ -0,0 +1,246 @@
+"""
+Parallel Batch Prediction
+- Scores very large N, P, K arrays on a process pool, one compiled forest
+  (src.compiled_model) per core
+- The model is shared, not pickled per task: with the "fork" start method
+  workers inherit the parent's compiled forest copy-on-write; with "spawn" /
+  "forkserver" each worker loads and compiles it once
+- Inputs and outputs are memory-mapped .npy files: pass paths for zero-copy
+  runs over 10^8 rows, or arrays, which are staged in a tmpfs scratch file.
+  Workers write their row range in place, so results are never pickled
+- Each task covers many rows; inside a task the forest is called on
+  cache-sized chunks (sized from the L2 cache, at least 4096 rows to
+  amortize per-call overhead)
+
+Usage:
+    python -m src.parallel_inference --input readings.npy --output crops.npy --workers 32
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import yaml
+
+from src.compiled_model import compiled_forest
+from src.inference import code_dtype, top_k_rows
+from src.telemetry import timed
+
+DEFAULT_MODEL_PATH = "models/npk_crop_model.pkl"
+MIN_CHUNK_ROWS = 4096
+MAX_CHUNK_ROWS = 65536
+
+# Per-process model bundle: set in the parent before forking, or by _init_worker
+_STATE = {}
+
+
+def load_params(params_path="params.yaml"):
+    """Load parameters from params.yaml."""
+    with open(params_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def l2_cache_bytes(default=1 << 20):
+    """Per-core L2 cache size from sysfs, or `default` when unavailable."""
+    try:
+        with open("/sys/devices/system/cpu/cpu0/cache/index2/size") as f:
+            size = f.read().strip()
+    except OSError:
+        return default
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    return int(size[:-1]) * units[size[-1]] if size[-1] in units else int(size)
+
+
+def cache_chunk_rows(n_classes, cache_bytes=None):
+    """Rows per forest call so inputs plus probability buffers stay in L2."""
+    bytes_per_row = 8 * (3 + 2 * n_classes)  # input row, running sum and per-tree probabilities
+    rows = (cache_bytes or l2_cache_bytes()) // bytes_per_row
+    rows = 1 << max(int(rows).bit_length() - 1, 0)  # round down to a power of two
+    return int(min(max(rows, MIN_CHUNK_ROWS), MAX_CHUNK_ROWS))
+
+
+def scratch_dir():
+    """Temporary directory on tmpfs when available, so staging never touches disk."""
+    return tempfile.mkdtemp(prefix="npk-batch-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+
+# ─── Worker Side ─────────────────────────────────────────────────────────────
+
+def _init_worker(model_path):
+    if model_path is not None:
+        _STATE["model_data"] = joblib.load(model_path)
+    compiled_forest(_STATE["model_data"])
+
+
+def _score_range(task, model_data=None):
+    """Score rows [start, stop) of the input file into the output file(s); returns the row count."""
+    in_path, codes_path, probs_path, start, stop, chunk_rows, top = task
+    forest = compiled_forest(model_data or _STATE["model_data"])
+    X = np.load(in_path, mmap_mode="r")
+    codes = np.load(codes_path, mmap_mode="r+")
+    probs = np.load(probs_path, mmap_mode="r+") if probs_path else None
+    for s in range(start, stop, chunk_rows):
+        e = min(s + chunk_rows, stop)
+        proba = forest.predict_proba(X[s:e])
+        if top == 1:
+            codes[s:e] = forest.classes[proba.argmax(axis=1)]
+        else:
+            idx, p = top_k_rows(proba, top)
+            codes[s:e] = forest.classes[idx]
+            probs[s:e] = p
+    codes.flush()
+    if probs is not None:
+        probs.flush()
+    return stop - start
+
+
+# ─── Executor ────────────────────────────────────────────────────────────────
+
+class ParallelPredictor:
+    """Process-pool crop predictor; use as a context manager or call close().
+
+    `model` is a bundle dict or a path. Results are class codes (label-encoder
+    ids, compact dtype); decode them with src.inference.decode at the edge.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL_PATH, workers=None, task_rows=1 << 18,
+                 chunk_rows=None, start_method=None):
+        self.model_path = model if isinstance(model, (str, os.PathLike)) else None
+        self.model_data = joblib.load(model) if self.model_path else model
+        # Compile up front so forked workers inherit the forest instead of rebuilding it
+        self.n_classes = len(compiled_forest(self.model_data).classes)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_rows = chunk_rows or cache_chunk_rows(self.n_classes)
+        self.task_rows = max(task_rows, self.chunk_rows)
+        if start_method is None:
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        if start_method != "fork" and self.model_path is None:
+            raise ValueError(f"start_method={start_method!r} needs a model path so workers can load it")
+        self.start_method = start_method
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def start(self):
+        """Start the worker pool now rather than on the first multi-task batch."""
+        if self.workers > 1:
+            self._get_pool()
+        return self
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.start_method == "fork":
+                _STATE["model_data"] = self.model_data
+            ctx = mp.get_context(self.start_method)
+            init_path = None if self.start_method == "fork" else self.model_path
+            self._pool = ctx.Pool(self.workers, initializer=_init_worker, initargs=(init_path,))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    @timed("npk_prediction_seconds", kind="parallel_batch")
+    def predict(self, X, top=1, out=None):
+        """Score every row of X (an (n, 3) array or a .npy path).
+
+        Returns class codes (n,) for top=1, else (codes, probabilities), each
+        (n, top). With `out` (a .npy path, or a pair of paths for top > 1)
+        results are written there and returned as read-only memmaps;
+        otherwise they come back as in-memory arrays.
+        """
+        scratch = None
+        try:
+            if isinstance(X, (str, os.PathLike)):
+                in_path = os.fspath(X)
+                n_rows = np.load(in_path, mmap_mode="r").shape[0]
+            else:
+                scratch = scratch_dir()
+                in_path = os.path.join(scratch, "input.npy")
+                staged = np.lib.format.open_memmap(in_path, mode="w+", dtype=np.float64,
+                                                   shape=np.shape(X))
+                staged[:] = X
+                staged.flush()
+                n_rows = staged.shape[0]
+                del staged
+
+            if out is None:
+                scratch = scratch or scratch_dir()
+                codes_path = os.path.join(scratch, "codes.npy")
+                probs_path = os.path.join(scratch, "probs.npy") if top > 1 else None
+            elif top > 1:
+                codes_path, probs_path = (os.fspath(p) for p in out)
+            else:
+                codes_path, probs_path = os.fspath(out), None
+
+            shape = (n_rows,) if top == 1 else (n_rows, top)
+            np.lib.format.open_memmap(codes_path, mode="w+", dtype=code_dtype(self.n_classes), shape=shape).flush()
+            if probs_path:
+                np.lib.format.open_memmap(probs_path, mode="w+", dtype=np.float32, shape=shape).flush()
+
+            tasks = [(in_path, codes_path, probs_path, s, min(s + self.task_rows, n_rows), self.chunk_rows, top)
+                     for s in range(0, n_rows, self.task_rows)]
+            if self.workers == 1 or len(tasks) == 1:
+                for t in tasks:
+                    _score_range(t, self.model_data)
+            else:
+                for _ in self._get_pool().imap_unordered(_score_range, tasks):
+                    pass
+
+            if out is None:
+                codes = np.array(np.load(codes_path, mmap_mode="r"))
+                probs = np.array(np.load(probs_path, mmap_mode="r")) if probs_path else None
+            else:
+                codes = np.load(codes_path, mmap_mode="r")
+                probs = np.load(probs_path, mmap_mode="r") if probs_path else None
+            return codes if top == 1 else (codes, probs)
+        finally:
+            if scratch:
+                shutil.rmtree(scratch, ignore_errors=True)
+
+
+def main():
+    """Score a .npy (n, 3) or CSV (N, P, K columns) file and write class codes to .npy."""
+    params = load_params().get("batch_inference", {})
+
+    parser = argparse.ArgumentParser(description="Parallel batch crop prediction")
+    parser.add_argument("--input", required=True, help=".npy (n, 3) float array or CSV with N, P, K columns")
+    parser.add_argument("--output", required=True, help="Output .npy of class codes")
+    parser.add_argument("--probs", help="Output .npy of top-k probabilities (requires --top > 1)")
+    parser.add_argument("--top", type=int, default=1)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--workers", type=int, default=params.get("workers") or None)
+    parser.add_argument("--task-rows", type=int, default=params.get("task_rows", 1 << 18))
+    args = parser.parse_args()
+    if args.top > 1 and not args.probs:
+        parser.error("--top > 1 needs --probs")
+
+    source = args.input
+    if not source.endswith(".npy"):
+        import pandas as pd
+        source = pd.read_csv(args.input, usecols=["N", "P", "K"])[["N", "P", "K"]].to_numpy(dtype=float)
+
+    with ParallelPredictor(args.model, workers=args.workers, task_rows=args.task_rows) as predictor:
+        start = time.perf_counter()
+        out = (args.output, args.probs) if args.top > 1 else args.output
+        result = predictor.predict(source, top=args.top, out=out)
+        elapsed = time.perf_counter() - start
+    n_rows = len(result if args.top == 1 else result[0])
+    print(f"✅ Scored {n_rows:,} rows on {predictor.workers} workers in {elapsed:.2f}s "
+          f"({n_rows / elapsed:,.0f} rows/s, chunk {predictor.chunk_rows} rows) → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
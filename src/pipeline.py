@@ -0,0 +1,333 @@
+"""
+Fused Pipeline Runner
+- Runs the dvc.yaml stages (preprocess → train → evaluate, cv) in one process:
+  libraries import once and arrays pass between stages in memory instead of
+  through data/processed
+- Each stage's result is cached in .pipeline_cache/, keyed by a SHA-256 of
+  the stage's dvc.yaml deps (file contents, or the upstream stage's key for
+  deps another stage produces), its dvc.yaml params and the scikit-learn
+  version. Only stages whose key changed are recomputed; the others are
+  loaded from the cache only if a downstream stage needs them
+- Writes the same outs, at the same paths, as the `python -m` stage commands
+  (data/processed, models/npk_crop_model.pkl, reports/metrics.json,
+  reports/cv_metrics.json), so DVC can take over (`dvc commit`, `dvc repro`).
+  Outs already matching the cached result are left untouched
+- Logs one MLflow run per fused run that recomputed something (params,
+  train/test accuracy, evaluation and cross-validation metrics, bundle and
+  metrics.json)
+
+Usage:
+    python -m src.pipeline                 # run what changed
+    python -m src.pipeline --status        # show which stages would run
+    python -m src.pipeline --force --no-mlflow
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from importlib.metadata import version as package_version
+
+import yaml
+
+from src import tracking
+from src.model_registry import file_sha256
+from src.profiling import profiled
+from src.telemetry import export_job
+
+DEFAULT_CACHE_DIR = ".pipeline_cache"
+STATE_FILE = "state.json"
+KEEP_ENTRIES = 5
+PROCESSED_DIR = "data/processed"
+MODEL_PATH = "models/npk_crop_model.pkl"
+METRICS_PATH = "reports/metrics.json"
+CV_REPORT_PATH = "reports/cv_metrics.json"
+
+
+def load_params(params_path="params.yaml"):
+    """Load parameters from params.yaml."""
+    with open(params_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def path_sha256(path):
+    """SHA-256 of a file, or of a directory's relative paths and file hashes."""
+    if os.path.isfile(path):
+        return file_sha256(path)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Pipeline dependency {path} does not exist")
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            full = os.path.join(dirpath, name)
+            digest.update(f"{os.path.relpath(full, path)}\0{file_sha256(full)}\0".encode())
+    return digest.hexdigest()
+
+
+def _param(params, spec):
+    value = params
+    for part in spec.split("."):
+        value = value[part]
+    return value
+
+
+# ─── Stages ──────────────────────────────────────────────────────────────────
+# The same stage functions the `python -m` commands call, minus the file
+# round trips. Results are what downstream stages need; `write` produces the
+# DVC outs.
+
+def _run_preprocess(params, inputs):
+    from src.data_preprocessing import load_data, preprocess
+
+    data = params["data"]
+    return preprocess(load_data(data["path"]), test_size=data["test_size"], random_state=data["random_state"])
+
+
+def _write_preprocess(processed):
+    from src.data_preprocessing import save_preprocessed
+
+    save_preprocessed(processed, PROCESSED_DIR)
+
+
+def _run_train(params, inputs):
+    from sklearn.metrics import accuracy_score
+    from src.train import build_model_bundle, train_model
+
+    data = inputs["preprocess"]
+    model = train_model(data["X_train"], data["y_train"], params["model"])
+    train_acc = accuracy_score(data["y_train"], model.predict(data["X_train"]))
+    test_acc = accuracy_score(data["y_test"], model.predict(data["X_test"]))
+    metadata = {"feature_names": data["feature_names"], "target_names": data["target_names"]}
+    bundle = build_model_bundle(model, data["scaler"], data["label_encoder"], metadata, accuracy=test_acc)
+    return {"bundle": bundle, "train_accuracy": train_acc, "test_accuracy": test_acc}
+
+
+def _write_train(result):
+    import joblib
+
+    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+    joblib.dump(result["bundle"], MODEL_PATH)
+
+
+def _run_evaluate(params, inputs):
+    from src.evaluate import compute_metrics
+
+    data, bundle = inputs["preprocess"], inputs["train"]["bundle"]
+    return compute_metrics(data["y_test"], bundle["model"].predict(data["X_test"]), data["target_names"])
+
+
+def _write_evaluate(metrics):
+    from src.evaluate import save_metrics
+
+    save_metrics(metrics, os.path.dirname(METRICS_PATH))
+
+
+def _run_cv(params, inputs):
+    from src.cross_validation import run_cv
+
+    return run_cv(params)
+
+
+def _write_cv(report):
+    from src.cross_validation import save_report
+
+    save_report(report, CV_REPORT_PATH)
+
+
+# name → (run(params, inputs), write(result), outs)
+STAGES = {
+    "preprocess": (_run_preprocess, _write_preprocess, (PROCESSED_DIR,)),
+    "train": (_run_train, _write_train, (MODEL_PATH,)),
+    "evaluate": (_run_evaluate, _write_evaluate, (METRICS_PATH,)),
+    "cv": (_run_cv, _write_cv, (CV_REPORT_PATH,)),
+}
+
+
+# ─── Runner ──────────────────────────────────────────────────────────────────
+
+class PipelineRunner:
+    """Runs dvc.yaml's stages in process with content-hash result caching."""
+
+    def __init__(self, dvc_path="dvc.yaml", params_path="params.yaml", cache_dir=DEFAULT_CACHE_DIR,
+                 keep=KEEP_ENTRIES):
+        with open(dvc_path) as f:
+            self.stages = yaml.safe_load(f)["stages"]
+        unknown = set(self.stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"No in-process implementation for stage(s) {sorted(unknown)}; use `dvc repro`")
+        self.params_path = params_path
+        self.cache_dir = cache_dir
+        self.keep = keep
+        # dep path → the stage whose outs include it
+        self.producers = {}
+        for name, spec in self.stages.items():
+            for out in spec.get("outs", []):
+                self.producers[out if isinstance(out, str) else next(iter(out))] = name
+
+    def stage_keys(self, params):
+        """Cache key per stage, in dvc.yaml order."""
+        keys = {}
+        for name, spec in self.stages.items():
+            deps = {dep: keys[self.producers[dep]] if dep in self.producers else path_sha256(dep)
+                    for dep in spec.get("deps", [])}
+            parts = {
+                "stage": name,
+                "deps": deps,
+                "params": {p: _param(params, p) for p in spec.get("params", [])},
+                "scikit-learn": package_version("scikit-learn"),
+            }
+            keys[name] = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+        return keys
+
+    def _entry(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key}.pkl")
+
+    def _read_state(self):
+        try:
+            with open(os.path.join(self.cache_dir, STATE_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_state(self, state):
+        path = os.path.join(self.cache_dir, STATE_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _outs_current(self, record, key):
+        if not record or record.get("key") != key:
+            return False
+        try:
+            return all(path_sha256(path) == sha for path, sha in record["outs"].items())
+        except FileNotFoundError:
+            return False
+
+    def _store(self, name, key, result):
+        import joblib
+
+        entry = self._entry(name, key)
+        joblib.dump(result, entry + ".tmp")
+        os.replace(entry + ".tmp", entry)
+        entries = sorted((os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir)
+                          if f.startswith(f"{name}-") and f.endswith(".pkl")), key=os.path.getmtime)
+        for old in entries[:-self.keep]:
+            os.remove(old)
+
+    def status(self, force=False):
+        """Stage name → "cached" or "stale" for the current workspace and params."""
+        keys = self.stage_keys(load_params(self.params_path))
+        return {name: "cached" if not force and os.path.exists(self._entry(name, key)) else "stale"
+                for name, key in keys.items()}
+
+    def run(self, force=False):
+        """Run the pipeline; returns (report, results, keys).
+
+        report maps each stage to {"status", "seconds"}, status being "ran",
+        "restored" (cached result rewritten to its outs) or "cached". results
+        holds the stages that were computed or loaded.
+        """
+        import joblib
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        params = load_params(self.params_path)
+        keys = self.stage_keys(params)
+        state = self._read_state()
+        results, report = {}, {}
+
+        def result(name):
+            if name not in results:
+                results[name] = joblib.load(self._entry(name, keys[name]))
+            return results[name]
+
+        for name, spec in self.stages.items():
+            run, write, outs = STAGES[name]
+            key, entry = keys[name], self._entry(name, keys[name])
+            start = time.perf_counter()
+            if not force and os.path.exists(entry):
+                os.utime(entry)
+                if self._outs_current(state.get(name), key):
+                    report[name] = {"status": "cached", "seconds": time.perf_counter() - start}
+                    continue
+                write(result(name))
+                status = "restored"
+            else:
+                upstream = {self.producers[d] for d in spec.get("deps", []) if d in self.producers}
+                results[name] = run(params, {u: result(u) for u in upstream})
+                self._store(name, key, results[name])
+                write(results[name])
+                status = "ran"
+            state[name] = {"key": key, "outs": {path: path_sha256(path) for path in outs}}
+            self._write_state(state)
+            report[name] = {"status": status, "seconds": time.perf_counter() - start}
+        return report, results, keys
+
+    def load(self, name, keys):
+        """A stage's cached result."""
+        import joblib
+
+        return joblib.load(self._entry(name, keys[name]))
+
+
+def log_to_mlflow(params, train, metrics, keys, cv=None):
+    """One MLflow run for a fused pipeline run."""
+    model_params = params["model"]
+    with tracking.start_run("rf-pipeline", params["mlflow"]) as run:
+        run.log_params({
+            "n_estimators": model_params["n_estimators"],
+            "max_depth": model_params["max_depth"],
+            "min_samples_split": model_params["min_samples_split"],
+            "min_samples_leaf": model_params["min_samples_leaf"],
+            "test_size": params["data"]["test_size"],
+        })
+        run.set_tags({f"stage_key.{name}": key[:12] for name, key in keys.items()})
+        run.log_metrics({
+            "train_accuracy": train["train_accuracy"],
+            "test_accuracy": train["test_accuracy"],
+            "eval_accuracy": metrics["accuracy"],
+            "eval_precision": metrics["precision"],
+            "eval_recall": metrics["recall"],
+            "eval_f1_score": metrics["f1_score"],
+        })
+        if cv is not None:
+            run.log_metrics({f"cv_{name}_{stat}": cv["aggregate"][name][stat]
+                             for name in ("accuracy", "f1_score") for stat in ("mean", "std")})
+            run.log_artifact(CV_REPORT_PATH)
+        run.log_artifact(MODEL_PATH, "model_bundle")
+        run.log_artifact(METRICS_PATH)
+
+
+@profiled("pipeline")
+def main():
+    """Run the DVC pipeline in one process, recomputing only stages whose inputs changed."""
+    parser = argparse.ArgumentParser(description="Fused in-process pipeline runner")
+    parser.add_argument("--force", action="store_true", help="Recompute every stage")
+    parser.add_argument("--status", action="store_true", help="Only show which stages would run")
+    parser.add_argument("--no-mlflow", action="store_true", help="Skip MLflow logging")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    runner = PipelineRunner(cache_dir=args.cache_dir)
+    if args.status:
+        for name, status in runner.status(force=args.force).items():
+            print(f"  {name:<12} {status}")
+        return
+
+    start = time.perf_counter()
+    report, results, keys = runner.run(force=args.force)
+    for name, row in report.items():
+        print(f"  {name:<12} {row['status']:<9} {row['seconds']:6.2f}s  {keys[name][:12]}")
+
+    if any(row["status"] == "ran" for row in report.values()) and not args.no_mlflow:
+        train = results.get("train") or runner.load("train", keys)
+        metrics = results.get("evaluate") or runner.load("evaluate", keys)
+        cv = (results.get("cv") or runner.load("cv", keys)) if "cv" in keys else None
+        log_to_mlflow(load_params(runner.params_path), train, metrics, keys, cv=cv)
+    print(f"\n✅ Pipeline complete in {time.perf_counter() - start:.2f}s")
+    export_job("pipeline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+On-Demand Sampling Profiler
+- Pure-Python stack sampler: a background thread snapshots the target
+  thread(s) via sys._current_frames() every few milliseconds
+- Writes collapsed stacks ("root;caller;callee <count>" per line), the input
+  format of flamegraph.pl, inferno and speedscope
+- One file per profiled request or pipeline stage in the profiles directory,
+  rotated by total size and file count
+- Opt-in: NPK_PROFILE=1 profiles everything; the app also profiles single
+  requests for admins via ?profile=1
+
+Settings (env): NPK_PROFILE_DIR (default "profiles"), NPK_PROFILE_INTERVAL_MS
+(default 5), NPK_PROFILE_MAX_MB (default 100), NPK_PROFILE_MAX_FILES (default 200).
+"""
+
+import functools
+import os
+import re
+import sys
+import sysconfig
+import threading
+from collections import Counter
+from datetime import datetime
+
+ENABLED = os.environ.get("NPK_PROFILE", "0").lower() in ("1", "true", "yes", "on")
+PROFILE_DIR = os.environ.get("NPK_PROFILE_DIR", "profiles")
+INTERVAL = float(os.environ.get("NPK_PROFILE_INTERVAL_MS", "5")) / 1000
+MAX_BYTES = int(float(os.environ.get("NPK_PROFILE_MAX_MB", "100")) * 2 ** 20)
+MAX_FILES = int(os.environ.get("NPK_PROFILE_MAX_FILES", "200"))
+SUFFIX = ".collapsed"
+
+PROJECT_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+STDLIB = sysconfig.get_paths()["stdlib"]
+
+
+def _frame_label(code):
+    """Short, stable label for a code object: 'function (path:firstline)'."""
+    path = code.co_filename
+    if "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(PROJECT_ROOT):
+        path = os.path.relpath(path, PROJECT_ROOT)
+    elif path.startswith(STDLIB):
+        path = os.path.relpath(path, STDLIB)
+    # ';' separates frames in the collapsed format
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """Samples the stacks of one thread (or all threads) until stopped.
+
+    Stacks are aggregated into a Counter keyed by the collapsed stack string,
+    so memory grows with the number of distinct stacks, not with duration.
+    """
+
+    def __init__(self, thread_id=None, all_threads=False, interval=INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.all_threads = all_threads
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._labels = {}
+        self._halt = threading.Event()
+        self._thread = None
+
+    def _collapse(self, frame):
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = _frame_label(code)
+            parts.append(label)
+            frame = frame.f_back
+        parts.reverse()
+        return ";".join(parts)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._halt.wait(self.interval):
+            frames = sys._current_frames()
+            if self.all_threads:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident != own:
+                        self.stacks[f"{names.get(ident, ident)};{self._collapse(frame)}"] += 1
+            else:
+                frame = frames.get(self.thread_id)
+                if frame is not None:
+                    self.stacks[self._collapse(frame)] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="npk-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._halt.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+
+def rotate(directory=PROFILE_DIR, max_bytes=MAX_BYTES, max_files=MAX_FILES):
+    """Delete the oldest profiles until the directory is within both caps."""
+    try:
+        entries = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(SUFFIX)]
+    except FileNotFoundError:
+        return
+    entries.sort(key=os.path.getmtime)
+    total = sum(os.path.getsize(p) for p in entries)
+    while entries and (total > max_bytes or len(entries) > max_files):
+        oldest = entries.pop(0)
+        total -= os.path.getsize(oldest)
+        os.remove(oldest)
+
+
+def write_collapsed(stacks, label, directory=PROFILE_DIR):
+    """Write a collapsed-stack profile, rotate the directory and return the file path."""
+    os.makedirs(directory, exist_ok=True)
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "-", label).strip("-") or "profile"
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(directory, f"{stamp}-{safe}{SUFFIX}")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        for stack, n in stacks.most_common():
+            f.write(f"{stack} {n}\n")
+    os.replace(tmp, path)
+    rotate(directory)
+    return path
+
+
+def list_profiles(directory=PROFILE_DIR, limit=50):
+    """Return (path, size, mtime) for the newest profiles, newest first."""
+    try:
+        paths = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(SUFFIX)]
+    except FileNotFoundError:
+        return []
+    stats = [(p, os.path.getsize(p), os.path.getmtime(p)) for p in paths]
+    return sorted(stats, key=lambda s: s[2], reverse=True)[:limit]
+
+
+class profile:
+    """Context manager profiling the enclosed block when enabled.
+
+    Disabled (the default unless NPK_PROFILE=1) it only checks a flag. After
+    the block, `path` holds the written file (None when nothing was written).
+    """
+
+    def __init__(self, label, enabled=None, all_threads=False, directory=None):
+        self.label = label
+        self.enabled = ENABLED if enabled is None else enabled
+        self.all_threads = all_threads
+        self.directory = directory or PROFILE_DIR
+        self.path = None
+        self._profiler = None
+
+    def __enter__(self):
+        if self.enabled:
+            self._profiler = SamplingProfiler(all_threads=self.all_threads).start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profiler is not None:
+            stacks = self._profiler.stop()
+            if stacks:
+                self.path = write_collapsed(stacks, self.label, self.directory)
+        return False
+
+
+def profiled(label, all_threads=False):
+    """Decorator form of `profile`, for `python -m src.*` entry points."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile(label, all_threads=all_threads) as p:
+                result = fn(*args, **kwargs)
+            if p.path:
+                print(f"🔥 Profile written to {p.path}")
+            return result
+        return wrapper
+    return decorate
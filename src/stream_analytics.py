@@ -0,0 +1,148 @@
+"""
+Streaming Soil Analytics
+- Keeps per-field running state: EWMA of N/P/K and health score, health trend
+  and predicted-crop stability
+- Updates in O(1) per reading; never revisits history
+- Emits events only when a threshold is crossed:
+    band_change    smoothed nutrient moves into a different ICAR band
+    grade_change   smoothed health score moves into a different health grade
+    crop_change    a new top crop has held for `crop_stability` readings
+"""
+
+from collections import deque
+
+from src.agronomy import get_nutrient_status, get_health_grade
+
+NUTRIENTS = ("N", "P", "K")
+
+
+class FieldState:
+    """Running statistics for one (user, field) stream."""
+
+    __slots__ = (
+        "count", "last_ts", "ewma", "bands", "health", "health_trend", "grade",
+        "crop", "crop_run", "candidate", "candidate_run",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.last_ts = None
+        self.ewma = [0.0, 0.0, 0.0]
+        self.bands = [None, None, None]
+        self.health = 0.0
+        self.health_trend = 0.0
+        self.grade = None
+        self.crop = None
+        self.crop_run = 0
+        self.candidate = None
+        self.candidate_run = 0
+
+    def snapshot(self):
+        """Return the state as a plain dict."""
+        return {
+            "count": self.count,
+            "last_ts": self.last_ts,
+            "ewma": dict(zip(NUTRIENTS, self.ewma)),
+            "bands": dict(zip(NUTRIENTS, self.bands)),
+            "health": self.health,
+            "health_trend": self.health_trend,
+            "grade": self.grade,
+            "crop": self.crop,
+            "crop_stable_for": self.crop_run,
+        }
+
+
+class StreamAnalyzer:
+    """Per-field online analytics over scored readings.
+
+    alpha is the EWMA smoothing factor (higher reacts faster). A change of
+    top crop is only reported once the new crop has been predicted for
+    `crop_stability` consecutive readings, so single noisy readings do not
+    flap the recommendation.
+    """
+
+    def __init__(self, alpha=0.2, crop_stability=3, max_events=1000, on_event=None):
+        self.alpha = alpha
+        self.crop_stability = crop_stability
+        self.on_event = on_event
+        self.events = deque(maxlen=max_events)
+        self._fields = {}
+
+    def state(self, user_id, field_id):
+        """Return a snapshot of a field's running state, or None if unseen."""
+        st = self._fields.get((user_id, field_id))
+        return st.snapshot() if st is not None else None
+
+    def update_batch(self, readings):
+        """Feed scored reading dicts (user_id, field_id, ts, N, P, K, health, crop) and return new events."""
+        events = []
+        for r in readings:
+            events.extend(self.update(
+                r["user_id"], r["field_id"], r["N"], r["P"], r["K"],
+                r["health"], r.get("crop"), r.get("ts"),
+            ))
+        return events
+
+    def update(self, user_id, field_id, n, p, k, health, crop=None, ts=None):
+        """Fold one reading into its field's state and return any events it triggers."""
+        key = (user_id, field_id)
+        st = self._fields.get(key)
+        first = st is None
+        if first:
+            st = self._fields[key] = FieldState()
+
+        a = self.alpha
+        events = []
+        base = {"user_id": user_id, "field_id": field_id, "ts": ts}
+
+        # Nutrient EWMAs and ICAR bands
+        for j, value in enumerate((n, p, k)):
+            st.ewma[j] = value if first else a * value + (1 - a) * st.ewma[j]
+            band = get_nutrient_status(st.ewma[j], NUTRIENTS[j])[0]
+            if not first and band != st.bands[j]:
+                events.append(dict(base, type="band_change", nutrient=NUTRIENTS[j],
+                                   previous=st.bands[j], current=band, value=round(st.ewma[j], 2)))
+            st.bands[j] = band
+
+        # Health EWMA, trend (EWMA of its per-reading change) and grade
+        if first:
+            st.health = health
+        else:
+            previous = st.health
+            st.health = a * health + (1 - a) * previous
+            st.health_trend = a * (st.health - previous) + (1 - a) * st.health_trend
+        grade = get_health_grade(st.health)[0]
+        if not first and grade != st.grade:
+            events.append(dict(base, type="grade_change", previous=st.grade, current=grade,
+                               value=round(st.health, 1)))
+        st.grade = grade
+
+        # Predicted-crop stability window
+        if crop is not None:
+            if crop == st.crop:
+                st.crop_run += 1
+                st.candidate, st.candidate_run = None, 0
+            else:
+                if crop == st.candidate:
+                    st.candidate_run += 1
+                else:
+                    st.candidate, st.candidate_run = crop, 1
+                if st.crop is None or st.candidate_run >= self.crop_stability:
+                    if st.crop is not None:
+                        events.append(dict(base, type="crop_change", previous=st.crop, current=crop,
+                                           stable_for=st.candidate_run))
+                    st.crop, st.crop_run = crop, st.candidate_run
+                    st.candidate, st.candidate_run = None, 0
+
+        st.count += 1
+        st.last_ts = ts
+
+        for event in events:
+            self.events.append(event)
+            if self.on_event is not None:
+                self.on_event(event)
+        return events
+
+    def recent_events(self, limit=100):
+        """Return up to `limit` most recent events, newest last."""
+        return list(self.events)[-limit:]
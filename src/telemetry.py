@@ -0,0 +1,288 @@
+"""
+Hot-Path Instrumentation
+- `timed` decorator and `timer` context manager record latency histograms
+  (per metric name + labels); every histogram also carries its call count
+- `count` increments plain counters
+- Exports Prometheus text format (`render_prometheus`, `serve`) and a
+  percentile snapshot for the in-app admin page
+- Disabled with NPK_TELEMETRY=0: decorators then return the function
+  unchanged and `timer` hands back a shared no-op context
+
+Percentiles come from a bounded window of the most recent samples per
+series; Prometheus buckets and counts are cumulative since process start.
+"""
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ENABLED = os.environ.get("NPK_TELEMETRY", "1").lower() not in ("0", "false", "no", "off")
+
+# Upper bounds in seconds (Prometheus `le`), spanning sub-millisecond predictions to training runs
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, float("inf"))
+WINDOW = 2048
+
+HELP = {
+    "npk_model_load_seconds": "Time to load the model bundle from disk",
+    "npk_prediction_seconds": "Crop prediction latency",
+    "npk_scoring_seconds": "Agronomy scoring latency",
+    "npk_page_render_seconds": "Streamlit page render latency",
+    "npk_pipeline_stage_seconds": "ML pipeline stage duration",
+    "npk_ingest_batch_seconds": "Ingestion batch scoring + write latency",
+    "npk_ingest_readings": "Probe readings by ingestion outcome",
+    "npk_model_swaps": "Served and shadow model (re)loads by outcome",
+    "npk_shadow_seconds": "Shadow candidate scoring latency",
+    "npk_shadow_requests": "Shadow-scored readings by agreement with the served model",
+    "npk_model_cache_requests": "Tenant model cache lookups by outcome (hit, miss, wait)",
+    "npk_model_cache_evictions": "Tenant bundles evicted from the model cache",
+}
+
+
+class Histogram:
+    """Cumulative bucket counts plus a ring of recent samples for one series."""
+
+    __slots__ = ("buckets", "count", "total", "recent", "_pos", "_lock")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = np.zeros(WINDOW)
+        self._pos = 0
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self.buckets = [0] * len(BUCKETS)
+            self.count = 0
+            self.total = 0.0
+            self._pos = 0
+
+    def observe(self, value):
+        with self._lock:
+            self.buckets[bisect_left(BUCKETS, value)] += 1
+            self.count += 1
+            self.total += value
+            self.recent[self._pos % WINDOW] = value
+            self._pos += 1
+
+    def window(self):
+        """Return a copy of the recent samples, oldest order not preserved."""
+        with self._lock:
+            return self.recent[:min(self._pos, WINDOW)].copy()
+
+
+class Registry:
+    """Metric families keyed by name; series within a family keyed by sorted label pairs."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, labels):
+        key = (name, labels)
+        h = self.histograms.get(key)
+        if h is None:
+            with self._lock:
+                h = self.histograms.setdefault(key, Histogram())
+        return h
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self):
+        """Zero every series in place; decorated functions keep their histogram references."""
+        with self._lock:
+            for h in self.histograms.values():
+                h.clear()
+            self.counters.clear()
+
+
+REGISTRY = Registry()
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+# ─── Recording ───────────────────────────────────────────────────────────────
+
+class _Timer:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+def timer(name, **labels):
+    """Context manager recording the block's wall time into histogram `name`."""
+    if not ENABLED:
+        return _NOOP
+    return _Timer(REGISTRY.histogram(name, _labels(labels)))
+
+
+def timed(name, **labels):
+    """Decorator recording each call's wall time into histogram `name`."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        hist = REGISTRY.histogram(name, _labels(labels))
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def observe(name, seconds, **labels):
+    """Record a duration measured elsewhere."""
+    if ENABLED:
+        REGISTRY.histogram(name, _labels(labels)).observe(seconds)
+
+
+def count(name, amount=1, **labels):
+    """Increment counter `name`."""
+    if ENABLED:
+        REGISTRY.inc(name, _labels(labels), amount)
+
+
+# ─── Export ──────────────────────────────────────────────────────────────────
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+def render_prometheus(registry=REGISTRY):
+    """Render all metrics in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    families = {}
+    for (name, labels), h in sorted(registry.histograms.items()):
+        families.setdefault(name, []).append((labels, h))
+    for name, series in families.items():
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, h in series:
+            with h._lock:
+                buckets, total, n = list(h.buckets), h.total, h.count
+            cumulative = 0
+            for bound, c in zip(BUCKETS, buckets):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {total}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {n}")
+
+    counters = {}
+    for (name, labels), value in sorted(registry.counters.items()):
+        counters.setdefault(name, []).append((labels, value))
+    for name, series in counters.items():
+        lines.append(f"# HELP {name}_total {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name}_total counter")
+        for labels, value in series:
+            lines.append(f"{name}_total{_fmt_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot(registry=REGISTRY):
+    """Return one dict per histogram series with count, mean and recent p50/p95/p99/max in ms."""
+    rows = []
+    for (name, labels), h in sorted(registry.histograms.items()):
+        if not h.count:
+            continue
+        recent = h.window() * 1000
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99])
+        rows.append({
+            "metric": name,
+            "labels": ", ".join(f"{k}={v}" for k, v in labels),
+            "count": h.count,
+            "mean_ms": h.total / h.count * 1000,
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "max_ms": recent.max(),
+        })
+    return rows
+
+
+def write_textfile(path, registry=REGISTRY):
+    """Atomically write the current metrics to `path` (node_exporter textfile collector format)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus(registry))
+    os.replace(tmp, path)
+
+
+def export_job(job):
+    """For batch jobs: write metrics to $NPK_METRICS_DIR/<job>.prom when that variable is set."""
+    directory = os.environ.get("NPK_METRICS_DIR")
+    if ENABLED and directory:
+        write_textfile(os.path.join(directory, f"{job}.prom"))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=9464):
+    """Start a background /metrics endpoint and return the server.
+
+    Binds to loopback by default; pass host="0.0.0.0" to let a remote
+    Prometheus scrape it.
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="npk-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,231 @@
+"""
+NPK Time-Series Utilities
+- Downsamples long reading histories with Largest-Triangle-Three-Buckets (LTTB)
+- Maintains rolling mean/min/max per nutrient with O(1) amortized updates
+- Keeps an incrementally synced in-memory series per field for charting
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+
+NUTRIENTS = ("N", "P", "K")
+
+
+def lttb_indices(x, y, threshold):
+    """Return the indices of the points kept by LTTB downsampling.
+
+    The first and last points are always kept. When the series already has
+    `threshold` points or fewer, every index is returned.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket edges for the n-2 interior points, split into threshold-2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the final point for the last bucket)
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], edges[i + 2]
+            avg_x = x[nlo:nhi].mean()
+            avg_y = y[nlo:nhi].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+
+        # Pick the point forming the largest triangle with the previous pick
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+
+    return keep
+
+
+def downsample(x, y, threshold):
+    """Return (x, y) reduced to at most `threshold` points with LTTB."""
+    idx = lttb_indices(x, y, threshold)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+class RollingWindow:
+    """Moving mean, min and max over the last `window` values.
+
+    Min and max use monotonic deques, so each push is O(1) amortized
+    regardless of the window size.
+    """
+
+    __slots__ = ("window", "_values", "_sum", "_mins", "_maxs", "_count")
+
+    def __init__(self, window):
+        self.window = window
+        self._values = deque()
+        self._sum = 0.0
+        self._mins = deque()  # (index, value), values increasing
+        self._maxs = deque()  # (index, value), values decreasing
+        self._count = 0
+
+    def push(self, value):
+        """Add a value and return the (mean, min, max) of the current window."""
+        i = self._count
+        self._count += 1
+
+        self._values.append(value)
+        self._sum += value
+        if len(self._values) > self.window:
+            self._sum -= self._values.popleft()
+
+        while self._mins and self._mins[-1][1] >= value:
+            self._mins.pop()
+        self._mins.append((i, value))
+        while self._maxs and self._maxs[-1][1] <= value:
+            self._maxs.pop()
+        self._maxs.append((i, value))
+
+        oldest = i - self.window + 1
+        if self._mins[0][0] < oldest:
+            self._mins.popleft()
+        if self._maxs[0][0] < oldest:
+            self._maxs.popleft()
+
+        return self._sum / len(self._values), self._mins[0][1], self._maxs[0][1]
+
+
+class FieldSeries:
+    """Append-only series of one field's readings with rolling aggregates.
+
+    `sync` pulls only readings newer than the last one seen from a
+    HistoryStore, so keeping the series current costs O(new readings).
+    Arrays grow geometrically; read them through the properties, which
+    return views of the filled part.
+    """
+
+    def __init__(self, window=20, capacity=1024):
+        self.window = window
+        self.first_id = None
+        self.last_id = 0
+        self._len = 0
+        self._lock = threading.Lock()
+        self._alloc(capacity)
+        self._rolling = [RollingWindow(window) for _ in NUTRIENTS]
+
+    def _alloc(self, capacity):
+        self._ts = np.empty(capacity)
+        self._values = np.empty((capacity, len(NUTRIENTS)))
+        self._mean = np.empty((capacity, len(NUTRIENTS)))
+        self._min = np.empty((capacity, len(NUTRIENTS)))
+        self._max = np.empty((capacity, len(NUTRIENTS)))
+
+    def _grow(self, needed):
+        capacity = len(self._ts)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = (self._ts, self._values, self._mean, self._min, self._max)
+        self._alloc(capacity)
+        for new_arr, old_arr in zip((self._ts, self._values, self._mean, self._min, self._max), old):
+            new_arr[:self._len] = old_arr[:self._len]
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def ts(self):
+        return self._ts[:self._len]
+
+    @property
+    def values(self):
+        return self._values[:self._len]
+
+    @property
+    def rolling_mean(self):
+        return self._mean[:self._len]
+
+    @property
+    def rolling_min(self):
+        return self._min[:self._len]
+
+    @property
+    def rolling_max(self):
+        return self._max[:self._len]
+
+    def reset(self):
+        """Drop all readings and rolling state."""
+        self.first_id = None
+        self.last_id = 0
+        self._len = 0
+        self._rolling = [RollingWindow(self.window) for _ in NUTRIENTS]
+
+    def extend(self, rows):
+        """Append reading dicts (id, ts, N, P, K) in id order."""
+        if not rows:
+            return
+        self._grow(self._len + len(rows))
+        for row in rows:
+            i = self._len
+            self._ts[i] = row["ts"]
+            for j, nut in enumerate(NUTRIENTS):
+                v = row[nut]
+                self._values[i, j] = v
+                self._mean[i, j], self._min[i, j], self._max[i, j] = self._rolling[j].push(v)
+            self._len += 1
+        if self.first_id is None:
+            self.first_id = rows[0]["id"]
+        self.last_id = rows[-1]["id"]
+
+    def sync(self, store, user_id, field_id, batch_size=10000):
+        """Pull readings added to the store since the last sync.
+
+        If the field's oldest reading is no longer the one the series started
+        from (the field was cleared), the series is rebuilt from scratch.
+        """
+        with self._lock:
+            first = store.since(user_id, field_id, 0, limit=1)
+            if not first or first[0]["id"] != self.first_id:
+                self.reset()
+            while True:
+                rows = store.since(user_id, field_id, self.last_id, limit=batch_size)
+                self.extend(rows)
+                if len(rows) < batch_size:
+                    break
+
+    def chart_points(self, max_points):
+        """Return LTTB-downsampled (x, y) pairs per nutrient for raw values and rolling means.
+
+        x is the 1-based reading number. The payload is at most `max_points`
+        points per trace however long the history grows.
+        """
+        with self._lock:
+            x = np.arange(1, self._len + 1)
+            raw, rolling = {}, {}
+            for j, nut in enumerate(NUTRIENTS):
+                raw[nut] = downsample(x, self.values[:, j], max_points)
+                rolling[nut] = downsample(x, self.rolling_mean[:, j], max_points)
+            return raw, rolling
+
+    def latest_rolling(self):
+        """Return the current rolling mean/min/max per nutrient, or None if empty."""
+        with self._lock:
+            if self._len == 0:
+                return None
+            i = self._len - 1
+            return {
+                nut: {
+                    "mean": float(self._mean[i, j]),
+                    "min": float(self._min[i, j]),
+                    "max": float(self._max[i, j]),
+                }
+                for j, nut in enumerate(NUTRIENTS)
+            }
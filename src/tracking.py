@@ -0,0 +1,402 @@
+"""
+Background MLflow Tracking
+- Stands in for the fluent MLflow calls the pipeline stages make (log_params,
+  log_metrics, set_tags, log_artifact, log_model) and takes them off the
+  critical path: calls are queued and a background thread performs them,
+  importing mlflow there too
+- Params, metrics and tags queued back to back for a run are coalesced into
+  MlflowClient.log_batch calls, within MLflow's per-batch limits
+- Artifacts are snapshotted when logged, so files rewritten afterwards are
+  recorded as they were; logged models must not be mutated afterwards
+- The queue is flushed at interpreter exit (or by `flush()`). A failed
+  tracking call is reported on stderr and never fails the stage
+- NPK_MLFLOW_MODE picks the mode: "async" (default), "sync" (the same calls,
+  inline, errors raised), "offline" (a compact JSONL journal per run under
+  NPK_MLFLOW_JOURNAL, default mlruns-journal/, replayed later with
+  `python -m src.tracking import`) or "off"
+
+Usage:
+    NPK_MLFLOW_MODE=offline python -m src.train
+    python -m src.tracking import                  # replay mlruns-journal/ into MLflow
+"""
+
+import argparse
+import atexit
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+DEFAULT_JOURNAL_DIR = "mlruns-journal"
+JOURNAL_FILE = "journal.jsonl"
+IMPORTED_FILE = "imported"
+MODES = ("async", "sync", "offline", "off")
+BATCHABLE = ("params", "metrics", "tags")
+MAX_BATCH_METRICS = 1000
+MAX_BATCH_PARAMS = 100
+MAX_BATCH_TAGS = 100
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+# ─── Backends ────────────────────────────────────────────────────────────────
+
+class MlflowBackend:
+    """Performs tracking calls with MlflowClient (one client per tracking URI)."""
+
+    def __init__(self):
+        self._clients = {}
+
+    def _client(self, tracking_uri):
+        if tracking_uri not in self._clients:
+            from mlflow.tracking import MlflowClient
+
+            self._clients[tracking_uri] = MlflowClient(tracking_uri=tracking_uri)
+        return self._clients[tracking_uri]
+
+    def start(self, tracking_uri, experiment_name, run_name, start_ms):
+        client = self._client(tracking_uri)
+        experiment = client.get_experiment_by_name(experiment_name)
+        experiment_id = experiment.experiment_id if experiment else client.create_experiment(experiment_name)
+        return client.create_run(experiment_id, start_time=start_ms, run_name=run_name).info.run_id
+
+    def log_batch(self, tracking_uri, run_id, params, metrics, tags):
+        from mlflow.entities import Metric, Param, RunTag
+
+        client = self._client(tracking_uri)
+        params = [Param(k, v) for k, v in params.items()]
+        tags = [RunTag(k, v) for k, v in tags.items()]
+        metrics = [Metric(k, v, ts, step) for k, v, ts, step in metrics]
+        while params or tags or metrics:
+            client.log_batch(run_id, metrics=metrics[:MAX_BATCH_METRICS], params=params[:MAX_BATCH_PARAMS],
+                             tags=tags[:MAX_BATCH_TAGS])
+            params, tags = params[MAX_BATCH_PARAMS:], tags[MAX_BATCH_TAGS:]
+            metrics = metrics[MAX_BATCH_METRICS:]
+
+    def log_artifact(self, tracking_uri, run_id, path, artifact_path):
+        self._client(tracking_uri).log_artifact(run_id, path, artifact_path)
+
+    def log_model(self, tracking_uri, run_id, model, name):
+        import mlflow
+        import mlflow.sklearn
+
+        mlflow.set_tracking_uri(tracking_uri)
+        # The fluent run stack is thread-local, so this resumes the run on this thread only
+        with mlflow.start_run(run_id=run_id):
+            mlflow.sklearn.log_model(model, name)
+
+    def end(self, tracking_uri, run_id, status, end_ms):
+        self._client(tracking_uri).set_terminated(run_id, status, end_time=end_ms)
+
+
+class JournalBackend:
+    """Writes each run to <root>/<id>/journal.jsonl, with its artifacts and models beside it."""
+
+    def __init__(self, root=DEFAULT_JOURNAL_DIR):
+        self.root = root
+
+    def _write(self, run_id, record):
+        with open(os.path.join(self.root, run_id, JOURNAL_FILE), "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def start(self, tracking_uri, experiment_name, run_name, start_ms):
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.join(self.root, run_id))
+        self._write(run_id, {"op": "start", "uri": tracking_uri, "experiment": experiment_name,
+                             "name": run_name, "time": start_ms})
+        return run_id
+
+    def log_batch(self, tracking_uri, run_id, params, metrics, tags):
+        record = {"op": "batch"}
+        if params:
+            record["params"] = params
+        if metrics:
+            record["metrics"] = metrics
+        if tags:
+            record["tags"] = tags
+        self._write(run_id, record)
+
+    def log_artifact(self, tracking_uri, run_id, path, artifact_path):
+        dest_dir = os.path.join(self.root, run_id, "artifacts", uuid.uuid4().hex[:8])
+        os.makedirs(dest_dir)
+        dest = os.path.join(dest_dir, os.path.basename(path))
+        shutil.copy2(path, dest)
+        self._write(run_id, {"op": "artifact", "path": os.path.relpath(dest, os.path.join(self.root, run_id)),
+                             "artifact_path": artifact_path})
+
+    def log_model(self, tracking_uri, run_id, model, name):
+        import joblib
+
+        os.makedirs(os.path.join(self.root, run_id, "models"), exist_ok=True)
+        rel = os.path.join("models", f"{name}.pkl")
+        joblib.dump(model, os.path.join(self.root, run_id, rel))
+        self._write(run_id, {"op": "model", "path": rel, "name": name})
+
+    def end(self, tracking_uri, run_id, status, end_ms):
+        self._write(run_id, {"op": "end", "status": status, "time": end_ms})
+
+
+# ─── Runs ────────────────────────────────────────────────────────────────────
+
+class Run:
+    """A tracked run. Logging methods snapshot their arguments, queue them and return."""
+
+    def __init__(self, tracker, run_name, mlflow_config):
+        self.tracker = tracker
+        self.run_name = run_name
+        self.tracking_uri = mlflow_config["tracking_uri"]
+        self.experiment_name = mlflow_config["experiment_name"]
+        self.failed = False
+        self._id = None
+        self._created = threading.Event()
+        self._ended = False
+        tracker._submit(self, "start", _now_ms())
+
+    @property
+    def run_id(self):
+        """The MLflow run id (journal id offline, None when off); waits for the run to be created."""
+        self._created.wait()
+        return self._id
+
+    def log_params(self, params):
+        self.tracker._submit(self, "params", {k: str(v) for k, v in params.items()})
+
+    def log_metrics(self, metrics, step=None):
+        ts = _now_ms()
+        self.tracker._submit(self, "metrics", [(k, float(v), ts, step or 0) for k, v in metrics.items()])
+
+    def log_metric(self, key, value, step=None):
+        self.log_metrics({key: value}, step=step)
+
+    def set_tags(self, tags):
+        self.tracker._submit(self, "tags", {k: str(v) for k, v in tags.items()})
+
+    def log_artifact(self, path, artifact_path=None):
+        self.tracker._submit(self, "artifact", (self.tracker._snapshot(path), artifact_path))
+
+    def log_model(self, model, name):
+        self.tracker._submit(self, "model", (model, name))
+
+    def end(self, status="FINISHED"):
+        if not self._ended:
+            self._ended = True
+            self.tracker._submit(self, "end", (status, _now_ms()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.end("FAILED" if exc_type else "FINISHED")
+        return False
+
+
+class Tracker:
+    """Queues tracking calls for a background thread (or runs them inline in "sync" mode)."""
+
+    def __init__(self, mode=None, journal_dir=None, backend=None):
+        self.mode = mode or os.environ.get("NPK_MLFLOW_MODE", "async")
+        if self.mode not in MODES:
+            raise ValueError(f"NPK_MLFLOW_MODE must be one of {MODES}, got {self.mode!r}")
+        self.journal_dir = journal_dir or os.environ.get("NPK_MLFLOW_JOURNAL", DEFAULT_JOURNAL_DIR)
+        if backend is None:
+            backend = JournalBackend(self.journal_dir) if self.mode == "offline" else MlflowBackend()
+        self.backend = backend
+        self.errors = []
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._staging = None
+
+    def start_run(self, run_name, mlflow_config):
+        """A new run in `mlflow_config`'s experiment (the `mlflow` section of params.yaml)."""
+        return Run(self, run_name, mlflow_config)
+
+    def flush(self):
+        """Block until every queued call has been performed."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _shutdown(self):
+        self.flush()
+        if self._staging is not None:
+            shutil.rmtree(self._staging, ignore_errors=True)
+
+    def _snapshot(self, path):
+        if self.mode in ("sync", "off"):
+            return path
+        with self._lock:
+            if self._staging is None:
+                self._staging = tempfile.mkdtemp(prefix="npk-mlflow-")
+        dest_dir = os.path.join(self._staging, uuid.uuid4().hex[:8])
+        os.makedirs(dest_dir)
+        dest = os.path.join(dest_dir, os.path.basename(path))
+        shutil.copy2(path, dest)
+        return dest
+
+    def _submit(self, run, op, payload):
+        if self.mode == "off":
+            run._created.set()
+        elif self.mode == "sync":
+            with self._lock:
+                self._execute(run, [(op, payload)], raise_errors=True)
+        else:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._work, name="npk-mlflow", daemon=True)
+                    self._thread.start()
+                    atexit.register(self._shutdown)
+            self._queue.put((run, op, payload))
+
+    def _work(self):
+        carry = None
+        while True:
+            item = carry if carry is not None else self._queue.get()
+            carry = None
+            run, op, payload = item
+            batch, taken = [(op, payload)], 1
+            # Coalesce whatever params / metrics / tags for this run are already queued
+            while op in BATCHABLE:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt[0] is run and nxt[1] in BATCHABLE:
+                    batch.append(nxt[1:])
+                    taken += 1
+                else:
+                    carry = nxt
+                    break
+            try:
+                self._execute(run, batch)
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+    def _execute(self, run, batch, raise_errors=False):
+        op, payload = batch[0]
+        if run.failed:
+            return
+        try:
+            if op == "start":
+                run._id = self.backend.start(run.tracking_uri, run.experiment_name, run.run_name, payload)
+            elif op in BATCHABLE:
+                params, metrics, tags = {}, [], {}
+                for kind, data in batch:
+                    if kind == "params":
+                        params.update(data)
+                    elif kind == "metrics":
+                        metrics.extend(data)
+                    else:
+                        tags.update(data)
+                self.backend.log_batch(run.tracking_uri, run._id, params, metrics, tags)
+            elif op == "artifact":
+                path, artifact_path = payload
+                try:
+                    self.backend.log_artifact(run.tracking_uri, run._id, path, artifact_path)
+                finally:
+                    if path.startswith(self._staging or "\0"):
+                        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            elif op == "model":
+                self.backend.log_model(run.tracking_uri, run._id, *payload)
+            elif op == "end":
+                self.backend.end(run.tracking_uri, run._id, *payload)
+        except Exception as exc:
+            if op == "start":
+                run.failed = True
+            self.errors.append((run.run_name, op, exc))
+            if raise_errors:
+                raise
+            print(f"⚠️  MLflow {op} for run {run.run_name!r} failed: {type(exc).__name__}: {exc}", file=sys.stderr)
+        finally:
+            if op == "start":
+                run._created.set()
+
+
+_TRACKER = None
+
+
+def get_tracker():
+    """The process-wide tracker, configured from the environment on first use."""
+    global _TRACKER
+    if _TRACKER is None:
+        _TRACKER = Tracker()
+    return _TRACKER
+
+
+def start_run(run_name, mlflow_config):
+    """Start a run on the process-wide tracker; use as a context manager."""
+    return get_tracker().start_run(run_name, mlflow_config)
+
+
+# ─── Journal Import ──────────────────────────────────────────────────────────
+
+def import_journal(run_dir, tracking_uri=None, backend=None):
+    """Replay one offline run into MLflow, keeping its timestamps; returns the MLflow run id.
+
+    A run already imported returns its recorded id without logging again. Once
+    the run is created, failed calls are reported on stderr and skipped.
+    """
+    marker = os.path.join(run_dir, IMPORTED_FILE)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            return f.read().strip()
+    backend = backend or MlflowBackend()
+    run_id = uri = None
+    with open(os.path.join(run_dir, JOURNAL_FILE)) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    for record in records:
+        op = record["op"]
+        if op == "start":
+            uri = tracking_uri or record["uri"]
+            run_id = backend.start(uri, record["experiment"], record["name"], record["time"])
+            continue
+        try:
+            if op == "batch":
+                backend.log_batch(uri, run_id, record.get("params", {}),
+                                  [tuple(m) for m in record.get("metrics", [])], record.get("tags", {}))
+            elif op == "artifact":
+                backend.log_artifact(uri, run_id, os.path.join(run_dir, record["path"]), record["artifact_path"])
+            elif op == "model":
+                import joblib
+
+                backend.log_model(uri, run_id, joblib.load(os.path.join(run_dir, record["path"])), record["name"])
+            elif op == "end":
+                backend.end(uri, run_id, record["status"], record["time"])
+        except Exception as exc:
+            # The run exists now; a retry would duplicate it, so report and go on
+            print(f"⚠️  MLflow {op} for journal {os.path.basename(run_dir)!r} failed: "
+                  f"{type(exc).__name__}: {exc}", file=sys.stderr)
+    with open(marker, "w") as f:
+        f.write(f"{run_id}\n")
+    return run_id
+
+
+def main():
+    """Replay offline journals into MLflow."""
+    parser = argparse.ArgumentParser(description="Background MLflow tracking utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Replay offline run journals into MLflow")
+    imp.add_argument("journal_dir", nargs="?", default=os.environ.get("NPK_MLFLOW_JOURNAL", DEFAULT_JOURNAL_DIR))
+    imp.add_argument("--tracking-uri", help="Override the tracking URI recorded in the journals")
+    args = parser.parse_args()
+
+    runs = sorted(d for d in os.listdir(args.journal_dir)
+                  if os.path.isfile(os.path.join(args.journal_dir, d, JOURNAL_FILE))) \
+        if os.path.isdir(args.journal_dir) else []
+    new = [d for d in runs if not os.path.exists(os.path.join(args.journal_dir, d, IMPORTED_FILE))]
+    backend = MlflowBackend()
+    for d in new:
+        run_id = import_journal(os.path.join(args.journal_dir, d), args.tracking_uri, backend)
+        print(f"  {d} → {run_id}")
+    print(f"✅ Imported {len(new)} run(s); {len(runs) - len(new)} already imported")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,23 @@ Model Training Module
 - Loads preprocessed data
 - Trains RandomForestClassifier with params from params.yaml
 - Logs experiment to MLflow
-- Saves model bundle (.pkl)
+- Saves model bundle (.pkl), including the compiled raw-input forest
+- Tracking goes through src.tracking: MLflow calls run on a background
+  thread (or into an offline journal), off the training critical path
 """
 
 import os
 import yaml
 import numpy as np
 import joblib
-import mlflow
-import mlflow.sklearn
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score
 
+from src import tracking
+from src.compiled_model import compile_bundle
+from src.profiling import profiled
+from src.telemetry import timed, export_job
+
 
 def load_params(params_path="params.yaml"):
     """Load parameters from params.yaml."""
@@ -22,6 +27,7 @@ def load_params(params_path="params.yaml"):
         return yaml.safe_load(f)
 
 
+@timed("npk_pipeline_stage_seconds", stage="load_preprocessed")
 def load_preprocessed(input_dir="data/processed"):
     """Load preprocessed data artifacts."""
     data = {
@@ -37,6 +43,7 @@ def load_preprocessed(input_dir="data/processed"):
     return data
 
 
+@timed("npk_pipeline_stage_seconds", stage="train_model")
 def train_model(X_train, y_train, model_params):
     """Train a RandomForestClassifier."""
     model = RandomForestClassifier(
@@ -45,46 +52,51 @@ def train_model(X_train, y_train, model_params):
         min_samples_split=model_params["min_samples_split"],
         min_samples_leaf=model_params["min_samples_leaf"],
         random_state=model_params["random_state"],
-        n_jobs=-1,
+        n_jobs=model_params.get("n_jobs", -1),
     )
     model.fit(X_train, y_train)
     print(f"Model trained: RandomForestClassifier with {model_params['n_estimators']} estimators")
     return model
 
 
-def save_model_bundle(model, scaler, label_encoder, metadata, output_path="models/npk_crop_model.pkl"):
-    """Save the complete model bundle for the Streamlit app."""
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
+def build_model_bundle(model, scaler, label_encoder, metadata, accuracy=None):
+    """The model bundle the Streamlit app loads, with its compiled forest."""
     bundle = {
         "model": model,
         "scaler": scaler,
         "label_encoder": label_encoder,
         "feature_names": metadata["feature_names"],
         "target_names": metadata["target_names"],
-        "accuracy": None,  # Will be set after evaluation
+        "accuracy": accuracy,
     }
+    # Served predictor: scaler folded into the trees, see src.compiled_model
+    bundle["compiled"] = compile_bundle(bundle)
+    return bundle
+
+
+@timed("npk_pipeline_stage_seconds", stage="save_model_bundle")
+def save_model_bundle(model, scaler, label_encoder, metadata, output_path="models/npk_crop_model.pkl"):
+    """Save the complete model bundle for the Streamlit app."""
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    bundle = build_model_bundle(model, scaler, label_encoder, metadata)  # accuracy set after evaluation
     joblib.dump(bundle, output_path)
     print(f"Model bundle saved to {output_path}")
     return bundle
 
 
+@profiled("train")
 def main():
     """Run the full training pipeline with MLflow tracking."""
     params = load_params()
     model_params = params["model"]
-    mlflow_config = params["mlflow"]
-
-    # Set up MLflow
-    mlflow.set_tracking_uri(mlflow_config["tracking_uri"])
-    mlflow.set_experiment(mlflow_config["experiment_name"])
 
     # Load data
     data = load_preprocessed()
 
-    with mlflow.start_run(run_name="rf-training"):
+    with tracking.start_run("rf-training", params["mlflow"]) as run:
         # Log parameters
-        mlflow.log_params({
+        run.log_params({
             "n_estimators": model_params["n_estimators"],
             "max_depth": model_params["max_depth"],
             "min_samples_split": model_params["min_samples_split"],
@@ -99,7 +111,7 @@ def main():
         train_acc = accuracy_score(data["y_train"], model.predict(data["X_train"]))
         test_acc = accuracy_score(data["y_test"], model.predict(data["X_test"]))
 
-        mlflow.log_metrics({
+        run.log_metrics({
             "train_accuracy": train_acc,
             "test_accuracy": test_acc,
         })
@@ -115,13 +127,14 @@ def main():
         joblib.dump(bundle, "models/npk_crop_model.pkl")
 
         # Log model to MLflow
-        mlflow.sklearn.log_model(model, "random_forest_model")
+        run.log_model(model, "random_forest_model")
 
         # Log the full bundle as artifact
-        mlflow.log_artifact("models/npk_crop_model.pkl", "model_bundle")
+        run.log_artifact("models/npk_crop_model.pkl", "model_bundle")
 
         print(f"\n✅ Training complete! MLflow run logged.")
-        print(f"   Run ID: {mlflow.active_run().info.run_id}")
+        print(f"   Run ID: {run.run_id}")
+    export_job("train")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,28 @@
+"""
+Unit Tests for the Streamlit entry point's cold-start behaviour
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+APP_PATH = os.path.join(ROOT, "app", "npk_crop_recommendation_app.py")
+
+
+# ─── Test Lazy Imports ────────────────────────────────────────────────────────
+
+class TestLazyImports:
+    """Heavy modules must not load just because the app module was imported."""
+
+    def test_app_import_defers_heavy_modules(self):
+        """Importing the app leaves pandas, Plotly Express, joblib and scikit-learn unloaded."""
+        pytest.importorskip("streamlit")
+        code = (
+            "import runpy, sys\n"
+            f"runpy.run_path({APP_PATH!r}, run_name='npk_app')\n"
+            "print(','.join(m for m in ('pandas', 'plotly.express', 'joblib', 'sklearn') if m in sys.modules))\n"
+        )
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        assert out.stdout.strip().splitlines()[-1:] in ([], [""])
@@ -0,0 +1,47 @@
+"""
+Unit Tests for the bundle memory report
+"""
+
+import os
+import sys
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.bundle_memory import _measure, component_bytes, render
+
+MODEL_PATH = "models/npk_crop_model.pkl"
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return [_measure((MODEL_PATH, variant, "data/Crop_recommendation.csv")) for variant in ("bundle", "serving-uint8")]
+
+
+class TestBundleMemory:
+    """Tests for per-variant measurements."""
+
+    def test_components_cover_bundle(self):
+        """Both the sklearn trees and the compiled forest are counted."""
+        import joblib
+        from src.compiled_model import compiled_forest
+
+        model_data = joblib.load(MODEL_PATH)
+        forest = compiled_forest(model_data)
+        parts = component_bytes(model_data)
+        assert parts["sklearn_trees"] > 0 and parts["compiled_nodes"] > 0
+        assert parts["compiled_nodes"] + parts["compiled_lookup"] == forest.nbytes
+
+    def test_compact_serving_view_is_smaller(self, rows):
+        """The compacted serving view keeps less resident and passes the accuracy check."""
+        bundle, compact = rows
+        assert "sklearn_trees" not in compact["components"]
+        assert compact["traced_bytes"] < bundle["traced_bytes"]
+        assert compact["pickled_bytes"] < bundle["pickled_bytes"] / 5
+        assert compact["check"]["compact_accuracy"] == compact["check"]["accuracy"]
+        assert compact["components"]["compiled_nodes"] < compact["reference_compiled_bytes"]
+
+    def test_render_lists_every_variant(self, rows):
+        text = render(rows, MODEL_PATH)
+        assert "bundle" in text and "serving-uint8" in text and "dataset predictions change" in text
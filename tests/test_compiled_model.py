@@ -0,0 +1,192 @@
+"""
+Unit Tests for the compiled raw-input forest
+"""
+
+import os
+import pickle
+import sys
+import numpy as np
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.compiled_model import (
+    CompiledForest, boundary_probes, check_compaction, check_equivalence, compact_forest, compile_bundle,
+    float32_thresholds, fold_thresholds, quantize_rows,
+)
+from src.inference import predict_codes, predict_top_k
+
+
+@pytest.fixture(scope="module")
+def model_data():
+    import joblib
+    return joblib.load("models/npk_crop_model.pkl")
+
+
+@pytest.fixture(scope="module")
+def forest(model_data):
+    return compile_bundle(model_data)
+
+
+# ─── Test Threshold Folding ───────────────────────────────────────────────────
+
+class TestFolding:
+    """Tests for moving split thresholds from scaled to raw space."""
+
+    def test_folded_threshold_is_exact_boundary(self):
+        """T still goes left after scaling and float32 rounding; the next float goes right."""
+        rng = np.random.default_rng(0)
+        t = rng.normal(0, 2, 5000)
+        mean, scale = rng.uniform(0, 200, 5000), rng.uniform(0.5, 60, 5000)
+        folded = fold_thresholds(t, mean, scale)
+
+        def scaled(x):
+            return ((x - mean) / scale).astype(np.float32)
+
+        assert (scaled(folded) <= t).all()
+        assert (scaled(np.nextafter(folded, np.inf)) > t).all()
+
+    def test_accounts_for_float32_rounding(self):
+        """Raw values just above t * scale + mean still round down onto t and go left."""
+        folded = fold_thresholds(np.array([0.5, np.inf]), np.zeros(2), np.ones(2))
+        assert folded[0] > 0.5 and np.float32(folded[0]) == 0.5
+        assert np.float32(np.nextafter(folded[0], np.inf)) > 0.5
+        assert folded[1] == np.inf
+
+
+# ─── Test Compiled Forest ─────────────────────────────────────────────────────
+
+class TestCompiledForest:
+    """Tests for the served predictor against the sklearn pipeline."""
+
+    def test_matches_sklearn_bit_for_bit(self, model_data, forest):
+        """Probabilities equal scaler + forest exactly, including readings on every threshold."""
+        X = np.random.default_rng(1).uniform(-20, 400, size=(20000, 3))
+        check_equivalence({**model_data, "compiled": forest},
+                          np.vstack([X, boundary_probes(forest, [90.0, 45.0, 45.0])]))
+
+    def test_walked_trees_match_grids(self, forest):
+        """Trees too large for a rank grid are walked and land on the same leaves."""
+        walked = CompiledForest(forest.feature, forest.threshold, forest.children, forest.roots,
+                                forest.depth, forest.leaf_proba, forest.classes, forest.class_names,
+                                max_grid_cells=0)
+        X = np.random.default_rng(2).uniform(0, 300, size=(3000, 3))
+        assert (walked._grid_row < 0).all()
+        assert (walked.apply(X) == forest.apply(X)).all()
+
+    def test_serves_without_preprocessing(self, model_data, forest):
+        """A bundle holding only the compiled forest predicts the same crops and top-k."""
+        X = np.random.default_rng(3).uniform(0, 300, size=(2000, 3))
+        served = {"compiled": pickle.loads(pickle.dumps(forest))}
+        assert (predict_codes(X, served) == predict_codes(X, model_data)).all()
+        for a, b in zip(predict_top_k(X, served, 3), predict_top_k(X, model_data, 3)):
+            assert (a == b).all()
+        assert served["compiled"].decode(np.array([5])).tolist() == ["Rice"]
+
+    def test_pickle_omits_lookup_tables(self, forest):
+        """Only the node arrays are pickled; rank grids are rebuilt on load."""
+        assert len(pickle.dumps(forest)) < forest.nbytes / 2
+
+    def test_rejects_non_finite_readings(self, forest):
+        """NaN and infinity are refused, as the sklearn pipeline does."""
+        with pytest.raises(ValueError, match="NaN"):
+            forest.predict_proba([[np.nan, 10, 10]])
+
+
+# ─── Test Early-Exit Voting ───────────────────────────────────────────────────
+
+class TestAnytime:
+    """Tests for anytime voting with a guarantee flag and a time budget."""
+
+    def test_unbounded_matches_full_vote(self, forest):
+        """Without a budget every answer is guaranteed and equals the full forest."""
+        import pandas as pd
+        X = np.vstack([pd.read_csv("data/Crop_recommendation.csv")[["N", "P", "K"]].to_numpy(float),
+                       np.random.default_rng(4).uniform(0, 300, size=(3000, 3))])
+        codes, used, guaranteed = forest.predict_anytime(X)
+        assert guaranteed.all()
+        assert (codes == forest.predict_codes(X)).all()
+        assert (used < len(forest.roots)).mean() > 0.5  # most dataset readings exit early
+
+    def test_exhausted_budget_flags_unsettled_answers(self, forest):
+        """With no time left, readings stop at the first check; only settled ones claim a guarantee."""
+        X = np.random.default_rng(5).uniform(0, 300, size=(3000, 3))
+        codes, used, guaranteed = forest.predict_anytime(X, budget=0.0)
+        assert (used == forest._first_exit).all()
+        assert 0 < guaranteed.sum() < len(X)
+        assert (codes[guaranteed] == forest.predict_codes(X[guaranteed])).all()
+
+
+# ─── Test Compaction ──────────────────────────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def compact(forest):
+    return compact_forest(forest, "uint8")
+
+
+@pytest.fixture(scope="module")
+def dataset(model_data):
+    import pandas as pd
+    df = pd.read_csv("data/Crop_recommendation.csv")
+    return df[["N", "P", "K"]].to_numpy(float), model_data["label_encoder"].transform(df["Crop"])
+
+
+class TestCompaction:
+    """Tests for the narrow-dtype forest and its equivalence check."""
+
+    def test_decimal_readings_reach_same_leaves(self, forest, compact, dataset):
+        """Readings with up to two decimals take every branch they took before compaction."""
+        X = np.round(np.random.default_rng(6).uniform(0, 400, size=(50000, 3)), 2)
+        X = np.vstack([X, dataset[0], np.round(boundary_probes(forest, [90.0, 45.0, 45.0]), 2)])
+        assert (compact.apply(X) == forest.apply(X)).all()
+
+    def test_float32_thresholds_keep_float32_readings(self):
+        """A reading that is a float32 value stays on its side of the rounded threshold."""
+        t = np.random.default_rng(7).uniform(0, 300, 5000)
+        t32 = float32_thresholds(t)
+        below = np.nextafter(t.astype(np.float32), np.float32(-np.inf)).astype(np.float64)
+        assert ((below <= t) == (below <= t32)).all()
+        assert (float32_thresholds(np.array([np.inf, -np.inf])) == [np.inf, -np.inf]).all()
+
+    def test_quantized_leaves_sum_to_total(self):
+        """uint8 leaves keep each distribution's mass at exactly 255 units."""
+        proba = np.random.default_rng(8).dirichlet(np.ones(10), 500)
+        q = quantize_rows(np.vstack([proba, np.zeros((1, 10))]))
+        assert q.dtype == np.uint8 and (q[:-1].sum(axis=1) == 255).all() and q[-1].sum() == 0
+        assert np.abs(q[:-1] / 255 - proba).max() <= 1 / 255
+
+    def test_smaller_with_same_accuracy(self, forest, compact, dataset):
+        """Compaction shrinks the forest and its pickle without changing dataset predictions."""
+        assert compact.nbytes < 0.85 * forest.nbytes
+        assert len(pickle.dumps(compact)) < len(pickle.dumps(forest)) / 4
+        summary = check_compaction(forest, compact, *dataset)
+        assert summary["disagreements"] == 0 and summary["accuracy"] == summary["compact_accuracy"]
+        assert summary["max_proba_error"] < 1e-3
+
+    def test_round_trips_and_votes_early(self, compact, dataset):
+        """The pickled compact forest predicts the same; anytime voting still matches its full vote."""
+        X = dataset[0]
+        loaded = pickle.loads(pickle.dumps(compact))
+        assert loaded.leaf_total == 255 and (loaded.predict_codes(X) == compact.predict_codes(X)).all()
+        codes, _, guaranteed = compact.predict_anytime(X)
+        assert guaranteed.all() and (codes == compact.predict_codes(X)).all()
+
+    def test_walked_compact_trees_match_grids(self, compact):
+        """Narrow node ids do not overflow on the tree-walking path."""
+        walked = compact_forest(CompiledForest(compact.feature, compact.threshold, compact.children, compact.roots,
+                                               compact.depth, compact.leaf_proba, compact.classes,
+                                               compact.class_names, max_grid_cells=0), "float16")
+        X = np.random.default_rng(9).uniform(0, 300, size=(3000, 3))
+        assert (walked._grid_row < 0).all()
+        assert (walked.apply(X) == compact.apply(X)).all()
+
+    def test_check_refuses_changed_predictions(self, forest, dataset):
+        """A forest that predicts differently fails the equivalence check."""
+        state = forest.__getstate__()
+        state["leaf_proba"] = np.roll(state["leaf_proba"], 1, axis=1)
+        shifted = CompiledForest(**state)
+        with pytest.raises(ValueError, match="change after compaction"):
+            check_compaction(forest, shifted, *dataset)
+        with pytest.raises(ValueError, match="drops accuracy"):
+            check_compaction(forest, shifted, *dataset, max_disagreement=1.0)
@@ -0,0 +1,61 @@
+"""
+Unit Tests for the parallel cross-validation stage
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.cross_validation import cross_validate, fold_assignments, load_dataset
+
+MODEL_PARAMS = {"n_estimators": 10, "max_depth": 6, "min_samples_split": 2, "min_samples_leaf": 1,
+                "random_state": 42}
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return load_dataset("data/Crop_recommendation.csv")
+
+
+@pytest.fixture(scope="module")
+def serial(dataset):
+    return cross_validate(*dataset, MODEL_PARAMS, n_splits=4, workers=1)
+
+
+class TestFolds:
+    """Tests for the precomputed fold assignment."""
+
+    def test_stratified(self, dataset):
+        """Every crop is spread evenly over the folds."""
+        _, y = dataset
+        folds = fold_assignments(y, 5, random_state=0)
+        assert folds.dtype == np.int8 and set(folds) == set(range(5))
+        for c in np.unique(y):
+            counts = np.bincount(folds[y == c], minlength=5)
+            assert counts.max() - counts.min() <= 1
+
+
+class TestCrossValidate:
+    """Tests for per-fold and aggregate metrics."""
+
+    def test_report(self, dataset, serial):
+        """Each row is tested exactly once and the aggregate summarizes the folds."""
+        assert serial["n_splits"] == 4 and len(serial["folds"]) == 4
+        assert sum(f["test_rows"] for f in serial["folds"]) == len(dataset[1])
+        accuracies = [f["accuracy"] for f in serial["folds"]]
+        assert serial["aggregate"]["accuracy"]["mean"] == pytest.approx(np.mean(accuracies))
+        assert serial["aggregate"]["accuracy"]["std"] == pytest.approx(np.std(accuracies, ddof=1))
+        assert 0.8 < serial["aggregate"]["accuracy"]["mean"] <= 1.0
+        assert all(f["fit_seconds"] > 0 for f in serial["folds"])
+
+    def test_pool_matches_serial(self, dataset, serial):
+        """Folds scored in worker processes give the same metrics as in process."""
+        parallel = cross_validate(*dataset, MODEL_PARAMS, n_splits=4, workers=2)
+        assert parallel["workers"] == 2
+        assert {f["pid"] for f in parallel["folds"]}.isdisjoint({os.getpid()})
+        for a, b in zip(serial["folds"], parallel["folds"]):
+            assert a["fold"] == b["fold"] and a["accuracy"] == b["accuracy"] and a["f1_score"] == b["f1_score"]
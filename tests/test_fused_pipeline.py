@@ -0,0 +1,114 @@
+"""
+Unit Tests for the fused in-process pipeline runner
+"""
+
+import json
+import os
+import shutil
+import sys
+import pytest
+import yaml
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.pipeline import PipelineRunner
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+WORKSPACE_FILES = ("dvc.yaml", "params.yaml", "data/Crop_recommendation.csv", "src/data_preprocessing.py",
+                   "src/train.py", "src/compiled_model.py", "src/evaluate.py", "src/cross_validation.py")
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """A copy of the DVC inputs with a small forest, as the working directory."""
+    for rel in WORKSPACE_FILES:
+        os.makedirs(tmp_path / os.path.dirname(rel), exist_ok=True)
+        shutil.copy(os.path.join(ROOT, rel), tmp_path / rel)
+    params = yaml.safe_load((tmp_path / "params.yaml").read_text())
+    params["model"]["n_estimators"] = 10
+    params["cv"].update(n_splits=3, workers=1)
+    (tmp_path / "params.yaml").write_text(yaml.safe_dump(params))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def set_param(workspace, section, key, value):
+    params = yaml.safe_load((workspace / "params.yaml").read_text())
+    params[section][key] = value
+    (workspace / "params.yaml").write_text(yaml.safe_dump(params))
+
+
+def statuses(report):
+    return {name: row["status"] for name, row in report.items()}
+
+
+# ─── Test Runner ──────────────────────────────────────────────────────────────
+
+class TestPipelineRunner:
+    """Tests for stage caching and DVC-compatible outputs."""
+
+    def test_writes_dvc_outs(self, workspace):
+        """A cold run computes every stage and writes the outs the dvc.yaml commands write."""
+        report, results, _ = PipelineRunner().run()
+        assert statuses(report) == {"preprocess": "ran", "train": "ran", "evaluate": "ran", "cv": "ran"}
+        assert sorted(os.listdir("data/processed")) == [
+            "X_test.npy", "X_train.npy", "label_encoder.pkl", "metadata.pkl", "scaler.pkl",
+            "y_test.npy", "y_train.npy"]
+        import joblib
+        bundle = joblib.load("models/npk_crop_model.pkl")
+        assert bundle["accuracy"] == results["train"]["test_accuracy"]
+        assert "compiled" in bundle and len(bundle["model"].estimators_) == 10
+        metrics = json.loads(open("reports/metrics.json").read())
+        assert metrics["accuracy"] == round(bundle["accuracy"], 4)
+
+    def test_unchanged_inputs_are_not_recomputed(self, workspace):
+        """A second run loads nothing and leaves the outs alone."""
+        PipelineRunner().run()
+        mtime = os.path.getmtime("models/npk_crop_model.pkl")
+        report, results, _ = PipelineRunner().run()
+        assert set(statuses(report).values()) == {"cached"}
+        assert results == {}
+        assert os.path.getmtime("models/npk_crop_model.pkl") == mtime
+        assert set(PipelineRunner().status().values()) == {"cached"}
+
+    def test_param_change_reruns_downstream_only(self, workspace):
+        """Changing a model param recomputes train, evaluate and cv, not preprocessing."""
+        PipelineRunner().run()
+        set_param(workspace, "model", "max_depth", 4)
+        assert PipelineRunner().status() == {"preprocess": "cached", "train": "stale", "evaluate": "stale",
+                                             "cv": "stale"}
+        report, _, _ = PipelineRunner().run()
+        assert statuses(report) == {"preprocess": "cached", "train": "ran", "evaluate": "ran", "cv": "ran"}
+        set_param(workspace, "model", "max_depth", 10)
+        report, _, _ = PipelineRunner().run()
+        assert statuses(report) == {"preprocess": "cached", "train": "restored", "evaluate": "restored",
+                                    "cv": "restored"}
+
+    def test_edited_or_missing_outs_are_restored(self, workspace):
+        """Outs changed behind the runner's back are rewritten from the cache."""
+        PipelineRunner().run()
+        expected = open("reports/metrics.json").read()
+        with open("reports/metrics.json", "w") as f:
+            f.write("{}")
+        shutil.rmtree("data/processed")
+        report, _, _ = PipelineRunner().run()
+        assert statuses(report) == {"preprocess": "restored", "train": "cached", "evaluate": "restored",
+                                    "cv": "cached"}
+        assert open("reports/metrics.json").read() == expected
+        assert os.path.exists("data/processed/X_train.npy")
+
+    def test_code_change_invalidates_stage(self, workspace):
+        """Editing a stage's source file is a dependency change."""
+        PipelineRunner().run()
+        with open("src/evaluate.py", "a") as f:
+            f.write("\n# touched\n")
+        assert PipelineRunner().status() == {"preprocess": "cached", "train": "cached", "evaluate": "stale",
+                                             "cv": "cached"}
+
+    def test_unknown_stage_rejected(self, workspace):
+        """Stages without an in-process implementation are refused."""
+        with open("dvc.yaml", "a") as f:
+            f.write("  deploy:\n    cmd: ./deploy.sh\n")
+        with pytest.raises(ValueError, match="deploy"):
+            PipelineRunner()
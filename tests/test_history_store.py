@@ -0,0 +1,88 @@
+"""
+Unit Tests for the persistent NPK reading history store
+"""
+
+import os
+import sys
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.history_store import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a fresh on-disk store."""
+    s = HistoryStore(str(tmp_path / "history.db"))
+    yield s
+    s.close()
+
+
+def _reading(field, ts, n, p=50.0, k=80.0, user="u1"):
+    return {"user_id": user, "field_id": field, "ts": ts, "N": n, "P": p, "K": k}
+
+
+# ─── Test Writes & Aggregates ─────────────────────────────────────────────────
+
+class TestHistoryWrites:
+    """Tests for batched writes and running aggregates."""
+
+    def test_batch_returns_consecutive_ids(self, store):
+        """A batch insert returns one id per reading."""
+        ids = store.add_readings([_reading("A", t, 100 + t) for t in range(5)])
+        assert ids == list(range(ids[0], ids[0] + 5))
+        assert store.count("u1", "A") == 5
+
+    def test_aggregates_accumulate_across_batches(self, store):
+        """Aggregates merge correctly over multiple batches."""
+        store.add_readings([_reading("A", 1, 10), _reading("A", 2, 30)])
+        store.add_readings([_reading("A", 0, 50), _reading("B", 5, 999)])
+        agg = store.aggregates("u1", "A")
+        assert agg["count"] == 3
+        assert agg["mean"]["N"] == pytest.approx(30.0)
+        assert agg["min"]["N"] == 10 and agg["max"]["N"] == 50
+        assert agg["first_ts"] == 0 and agg["last_ts"] == 2
+        assert store.fields("u1") == ["A", "B"]
+
+    def test_clear_removes_field_only(self, store):
+        """Clearing a field leaves other fields untouched."""
+        store.add_readings([_reading("A", 1, 10), _reading("B", 1, 20)])
+        store.clear("u1", "A")
+        assert store.count("u1", "A") == 0
+        assert store.aggregates("u1", "A") is None
+        assert store.count("u1", "B") == 1
+
+    def test_persists_across_instances(self, tmp_path):
+        """Readings survive reopening the database."""
+        path = str(tmp_path / "history.db")
+        HistoryStore(path).add_reading("u1", "A", 100, 50, 80, crop="Rice")
+        rows = HistoryStore(path).page("u1", "A")
+        assert len(rows) == 1 and rows[0]["crop"] == "Rice"
+
+
+# ─── Test Queries ─────────────────────────────────────────────────────────────
+
+class TestHistoryQueries:
+    """Tests for paginated and time-range queries."""
+
+    def test_pagination_newest_first(self, store):
+        """Pages walk the history from newest to oldest without overlap."""
+        store.add_readings([_reading("A", t, t) for t in range(10)])
+        first = store.page("u1", "A", limit=4)
+        second = store.page("u1", "A", limit=4, offset=4)
+        assert [r["ts"] for r in first] == [9, 8, 7, 6]
+        assert [r["ts"] for r in second] == [5, 4, 3, 2]
+
+    def test_time_range_is_half_open(self, store):
+        """time_range includes start and excludes end."""
+        store.add_readings([_reading("A", t, t) for t in range(10)])
+        rows = store.time_range("u1", "A", start_ts=3, end_ts=6)
+        assert [r["ts"] for r in rows] == [3, 4, 5]
+        assert len(store.time_range("u1", "A")) == 10
+
+    def test_users_are_isolated(self, store):
+        """Queries are scoped to the requesting user."""
+        store.add_readings([_reading("A", 1, 10, user="u1"), _reading("A", 1, 20, user="u2")])
+        assert [r["N"] for r in store.page("u2", "A")] == [20]
@@ -0,0 +1,140 @@
+"""
+Unit Tests for incremental forest retraining
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.compiled_model import check_equivalence
+from src.incremental_train import load_batch, reservoir_update, update_bundle
+
+
+@pytest.fixture(scope="module")
+def model_data():
+    import joblib
+    return joblib.load("models/npk_crop_model.pkl")
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return load_batch("data/Crop_recommendation.csv")
+
+
+def make_batch(dataset, n, seed, crops=None):
+    """Noisy resample of the dataset, optionally limited to some crops."""
+    X, names = dataset
+    rng = np.random.default_rng(seed)
+    pool = np.flatnonzero(np.isin(names, crops)) if crops else np.arange(len(X))
+    idx = rng.choice(pool, n)
+    return X[idx] + rng.normal(0, 2, (n, 3)), names[idx]
+
+
+@pytest.fixture(scope="module")
+def grown(model_data, dataset):
+    X, crops = make_batch(dataset, 300, seed=1)
+    return update_bundle(model_data, X, crops, n_trees=10, reservoir_size=500, seed=dataset)
+
+
+# ─── Test Reservoir ───────────────────────────────────────────────────────────
+
+class TestReservoir:
+    """Tests for the uniform sample of all rows seen."""
+
+    def test_size_and_count(self):
+        """The sample fills up to its size, then replaces rows; `seen` counts everything."""
+        rng = np.random.default_rng(0)
+        X_res, y_res, seen = reservoir_update(np.empty((0, 3)), np.empty(0, int), 0,
+                                              np.zeros((80, 3)), np.zeros(80, int), 100, rng)
+        assert len(X_res) == 80 and seen == 80
+        X_res, y_res, seen = reservoir_update(X_res, y_res, seen, np.ones((920, 3)), np.ones(920, int), 100, rng)
+        assert len(X_res) == 100 and seen == 1000
+        assert 0 < (y_res == 0).sum() < 30  # about 8 of 100 expected from the first 80 rows
+
+    def test_uniform(self):
+        """Every row has about the same chance of being in the sample."""
+        rng = np.random.default_rng(1)
+        hits = np.zeros(200)
+        for _ in range(300):
+            _, y_res, _ = reservoir_update(np.empty((0, 3)), np.empty(0, int), 0,
+                                           np.zeros((200, 3)), np.arange(200), 20, rng)
+            hits[y_res] += 1
+        assert hits[:100].sum() == pytest.approx(hits[100:].sum(), rel=0.15)
+
+
+# ─── Test Incremental Updates ─────────────────────────────────────────────────
+
+class TestUpdateBundle:
+    """Tests for growing, retiring and evaluating the forest."""
+
+    def test_adds_trees_on_batch_and_reservoir(self, model_data, grown):
+        """New trees fit on the reservoir plus the batch's training rows only."""
+        bundle, summary = grown
+        assert summary["trees"] == 110 and summary["trees_retired"] == 0
+        assert summary["fit_rows"] == 500 + 240 and summary["holdout_rows"] == 60
+        assert bundle["incremental"]["tree_batches"] == [0] * 100 + [1] * 10
+        assert len(model_data["model"].estimators_) == 100  # input bundle untouched
+        assert "incremental" not in model_data
+
+    def test_compiled_forest_matches_grown_model(self, grown):
+        """The recompiled forest still equals scaler + sklearn on the grown model."""
+        bundle, _ = grown
+        check_equivalence(bundle, np.random.default_rng(2).uniform(0, 300, size=(3000, 3)))
+
+    def test_budget_retires_oldest_trees(self, grown, dataset):
+        """Past the tree budget the oldest trees go first."""
+        bundle, _ = grown
+        X, crops = make_batch(dataset, 200, seed=3)
+        bundle2, summary = update_bundle(bundle, X, crops, n_trees=10, tree_budget=105, reservoir_size=500)
+        assert summary["trees_retired"] == 15 and summary["trees"] == 105
+        assert bundle2["incremental"]["tree_batches"] == [0] * 85 + [1] * 10 + [2] * 10
+        assert bundle2["model"].estimators_[-20:-10] == bundle["model"].estimators_[-10:]
+        assert summary["holdout_rows"] == 100  # rolling holdout keeps earlier batches' rows
+
+    def test_new_trees_get_fresh_seeds(self, grown, dataset):
+        """At the tree budget, successive batches still grow differently seeded trees."""
+        bundle, _ = grown
+        seeds = []
+        for batch_seed in (8, 9):
+            X, crops = make_batch(dataset, 100, seed=batch_seed)
+            bundle, _ = update_bundle(bundle, X, crops, n_trees=5, tree_budget=110, reservoir_size=500)
+            seeds.append({tree.random_state for tree in bundle["model"].estimators_[-5:]})
+        assert not seeds[0] & seeds[1]
+        assert bundle["model"].random_state == grown[0]["model"].random_state
+
+    def test_empty_batch_refused(self, grown):
+        with pytest.raises(ValueError, match="no readings"):
+            update_bundle(grown[0], np.empty((0, 3)), np.array([], dtype=str))
+
+    def test_chunk_mode_tops_up_missing_crops(self, grown, dataset):
+        """A batch of two crops still trains trees that vote over every crop."""
+        bundle, _ = grown
+        X, crops = make_batch(dataset, 100, seed=4, crops=["Rice", "Wheat"])
+        bundle2, summary = update_bundle(bundle, X, crops, n_trees=5, mode="chunk", reservoir_size=500)
+        assert 80 + 8 <= summary["fit_rows"] <= 80 + 8 * 40  # at most the batch's 40 rows per crop
+        proba = bundle2["model"].predict_proba(bundle2["scaler"].transform(X))
+        assert proba.shape == (100, 10)
+
+    def test_unknown_crop_refused(self, grown):
+        """Crops outside the label encoder need a retrain from scratch."""
+        with pytest.raises(ValueError, match="Quinoa"):
+            update_bundle(grown[0], [[50, 50, 50]], np.array(["Quinoa"]))
+
+    def test_first_update_needs_seed(self, model_data, dataset):
+        """Without incremental state the reservoir must be seeded from the training data."""
+        X, crops = make_batch(dataset, 50, seed=5)
+        with pytest.raises(ValueError, match="seed"):
+            update_bundle(model_data, X, crops)
+
+    def test_rejected_when_holdout_accuracy_drops(self, grown, dataset):
+        """An update is flagged when it loses more than the allowed holdout accuracy."""
+        X, crops = make_batch(dataset, 200, seed=6)
+        shuffled = np.random.default_rng(7).permutation(crops)  # labels unrelated to readings
+        _, summary = update_bundle(grown[0], X, shuffled, n_trees=50, mode="chunk", reservoir_size=500,
+                                   tree_budget=50, holdout_fraction=0, max_accuracy_drop=0.0)
+        assert summary["holdout_accuracy"] < summary["previous_accuracy"]
+        assert not summary["accepted"]
@@ -0,0 +1,93 @@
+"""
+Unit Tests for top-k crop inference
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.agronomy import predict_crop, predict_crops
+from src.inference import decode, predict_top_k, top_crops, top_k_rows
+
+
+@pytest.fixture(scope="module")
+def model_data():
+    import joblib
+    return joblib.load("models/npk_crop_model.pkl")
+
+
+# ─── Test Top-K Selection ─────────────────────────────────────────────────────
+
+class TestTopKRows:
+    """Tests for row-wise argpartition top-k."""
+
+    def test_matches_stable_sort(self):
+        """Ties (including across the k-th place) resolve exactly like a stable sort."""
+        proba = np.random.default_rng(0).integers(0, 3, size=(2000, 12)).astype(float)
+        full = np.argsort(-proba, axis=1, kind="stable")
+        for top in (1, 2, 5, 11, 12):
+            idx, vals = top_k_rows(proba, top)
+            assert (idx == full[:, :top]).all()
+            assert (vals == np.take_along_axis(proba, full[:, :top], axis=1)).all()
+
+    def test_top_larger_than_classes(self):
+        """Asking for more classes than exist returns every class."""
+        idx, _ = top_k_rows(np.array([[0.2, 0.5, 0.3]]), 10)
+        assert idx.tolist() == [[1, 2, 0]]
+
+
+# ─── Test Model Outputs ───────────────────────────────────────────────────────
+
+class TestPredictTopK:
+    """Tests for integer-coded batch outputs and the UI-edge helpers."""
+
+    def test_first_column_is_model_prediction(self, model_data):
+        """Top-1 codes equal the forest's own predict()."""
+        X = np.random.default_rng(1).uniform(0, 300, size=(500, 3))
+        codes, probs = predict_top_k(X, model_data, top=3)
+        expected = model_data["model"].predict(model_data["scaler"].transform(X))
+        assert codes.dtype == np.uint8 and codes.shape == (500, 3)
+        assert (codes[:, 0] == expected).all()
+        assert (np.diff(probs, axis=1) <= 0).all()
+        assert (decode(codes[:, 0], model_data) == predict_crops(X, model_data)).all()
+
+    def test_top_crops_matches_sorted_dict(self, model_data):
+        """The UI helper returns the head of the sorted full probability dict."""
+        best, probs = predict_crop(100.0, 50.0, 80.0, model_data)
+        expected = sorted(probs.items(), key=lambda x: x[1], reverse=True)[:3]
+        assert top_crops(100.0, 50.0, 80.0, model_data, top=3) == expected
+        assert expected[0][0] == best
+
+
+# ─── Test Parallel Batch Prediction ───────────────────────────────────────────
+
+class TestParallelPredictor:
+    """Tests for the process-pool executor and its memory-mapped buffers."""
+
+    def test_pool_matches_serial(self, model_data, tmp_path):
+        """Forked workers fill the shared output with the serial predictions."""
+        from src.inference import predict_codes
+        from src.parallel_inference import ParallelPredictor
+
+        X = np.random.default_rng(2).uniform(0, 300, size=(20000, 3))
+        codes_ref, probs_ref = predict_top_k(X, model_data, top=3)
+        with ParallelPredictor(model_data, workers=2, task_rows=4096, chunk_rows=4096) as predictor:
+            assert (predictor.predict(X) == predict_codes(X, model_data)).all()
+            codes, probs = predictor.predict(X, top=3)
+            np.save(tmp_path / "x.npy", X)
+            on_disk = predictor.predict(str(tmp_path / "x.npy"), out=str(tmp_path / "codes.npy"))
+        assert (codes == codes_ref).all()
+        assert np.allclose(probs, probs_ref, atol=1e-6)
+        assert isinstance(on_disk, np.memmap) and (np.load(tmp_path / "codes.npy") == codes_ref[:, 0]).all()
+
+    def test_cache_chunk_rows(self):
+        """Chunks are a power of two, bounded to amortize per-call overhead."""
+        from src.parallel_inference import cache_chunk_rows, MAX_CHUNK_ROWS, MIN_CHUNK_ROWS
+
+        assert cache_chunk_rows(10, cache_bytes=2 << 20) == 8192
+        assert cache_chunk_rows(10, cache_bytes=1024) == MIN_CHUNK_ROWS
+        assert cache_chunk_rows(10, cache_bytes=1 << 30) == MAX_CHUNK_ROWS
@@ -0,0 +1,162 @@
+"""
+Unit Tests for the streaming NPK probe ingestion service
+"""
+
+import os
+import sys
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+import joblib
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.history_store import HistoryStore
+from src.ingest import RingBuffer, IngestPipeline, parse_reading, serve
+from src.stream_analytics import StreamAnalyzer
+
+
+def _post(url, payload):
+    req = urllib.request.Request(url, data=payload.encode(), method="POST")
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def _raw_post(port, content_length, body=b""):
+    """POST /readings with a hand-written Content-Length header; returns the status code."""
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        header = "" if content_length is None else f"Content-Length: {content_length}\r\n"
+        sock.sendall(f"POST /readings HTTP/1.1\r\nHost: x\r\n{header}\r\n".encode() + body)
+        return int(sock.makefile("rb").readline().split()[1])
+
+
+# ─── Test Ring Buffer ─────────────────────────────────────────────────────────
+
+class TestRingBuffer:
+    """Tests for the bounded ingestion buffer."""
+
+    def test_fifo_across_wraparound(self):
+        """Items come out in order even after the buffer wraps."""
+        buf = RingBuffer(4)
+        assert buf.put_many([1, 2, 3])
+        assert buf.get_batch(2, timeout=0) == [1, 2]
+        assert buf.put_many([4, 5, 6])
+        assert buf.get_batch(10, timeout=0) == [3, 4, 5, 6]
+
+    def test_backpressure_when_full(self):
+        """A batch that does not fit is rejected after the timeout."""
+        buf = RingBuffer(3)
+        assert buf.put_many([1, 2])
+        assert not buf.put_many([3, 4], timeout=0.05)
+        assert len(buf) == 2
+
+
+# ─── Test Ingestion Pipeline ──────────────────────────────────────────────────
+
+class TestIngestPipeline:
+    """Tests for parsing, scoring and batch writes."""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return HistoryStore(str(tmp_path / "history.db"))
+
+    def test_parse_reading_validates(self):
+        """Missing or negative nutrients are rejected; field defaults to probe."""
+        r = parse_reading({"probe": "p1", "N": 100, "P": 50, "K": 80})
+        assert r["field_id"] == "p1"
+        with pytest.raises(ValueError):
+            parse_reading({"probe": "p1", "N": 100, "P": 50})
+        with pytest.raises(ValueError):
+            parse_reading({"probe": "p1", "N": -1, "P": 50, "K": 80})
+
+    @pytest.mark.parametrize("bad", ["nan", "inf", "-inf", float("nan")])
+    def test_parse_reading_rejects_non_finite(self, bad):
+        """NaN and infinite nutrients are rejected instead of poisoning the batch."""
+        with pytest.raises(ValueError, match="finite"):
+            parse_reading({"probe": "p1", "N": bad, "P": 50, "K": 80})
+
+    def test_http_ingest_scores_and_stores(self, store):
+        """Readings posted over HTTP are scored and written to the store."""
+        pipeline = IngestPipeline(store, joblib.load("models/npk_crop_model.pkl"),
+                                  batch_size=8, flush_interval=0.05, analyzer=StreamAnalyzer()).start()
+        server = serve(pipeline, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/readings"
+        try:
+            body = "\n".join(json.dumps({"probe": f"p{i % 3}", "field": "A", "N": 100 + i, "P": 50, "K": 80})
+                             for i in range(20))
+            assert _post(url, body) == (202, {"accepted": 20})
+            assert _post(url, '{"probe": "p1"}')[0] == 400
+            with urllib.request.urlopen(url.replace("/readings", "/metrics")) as resp:
+                assert 'npk_ingest_readings_total{status="received"}' in resp.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+            pipeline.stop()
+
+        assert store.count("default", "A") == 20
+        rows = store.page("default", "A", limit=1)
+        assert rows[0]["crop"] is not None
+        latest = pipeline.latest("p1")
+        assert 0 <= latest["health"] <= 100 and isinstance(latest["crop"], str)
+        assert pipeline.analyzer.state("default", "A")["count"] == 20
+
+    def test_failed_write_is_retried(self, store, monkeypatch):
+        """A batch whose store write fails once is retried, not dropped."""
+        add_readings, calls = store.add_readings, []
+
+        def flaky(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            return add_readings(batch)
+
+        monkeypatch.setattr(store, "add_readings", flaky)
+        pipeline = IngestPipeline(store, batch_size=8, flush_interval=0.05, retry_delay=0.01).start()
+        pipeline.submit([parse_reading({"probe": "p", "field": "A", "N": i, "P": 1, "K": 1}) for i in range(5)])
+        pipeline.stop()
+        stats = pipeline.snapshot_stats()
+        assert calls == [5, 5] and store.count("default", "A") == 5
+        assert stats["written"] == 5 and stats["retried"] == 5 and stats["failed"] == 0
+
+    def test_bad_content_length_rejected(self, store):
+        """Malformed or oversized Content-Length is answered before any body is read."""
+        pipeline = IngestPipeline(store, capacity=4)  # worker not started
+        server = serve(pipeline, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        handler = server.RequestHandlerClass
+        try:
+            for bad in ("abc", "-5", None):
+                assert _raw_post(server.server_port, bad) == 400
+            # Claims more than fits, with none of it sent: refused without waiting for the body
+            assert _raw_post(server.server_port, handler.MAX_BODY_BYTES + 1) == 413
+            reading = json.dumps({"probe": "p", "N": 1, "P": 1, "K": 1}).encode()
+            assert _raw_post(server.server_port, len(reading), reading) == 202
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert handler.MAX_BODY_BYTES == 4 * 512
+        assert pipeline.snapshot_stats()["received"] == 1
+
+    def test_full_buffer_returns_503(self, store):
+        """Producers get a 503 when the worker cannot keep up."""
+        pipeline = IngestPipeline(store, capacity=2)  # worker not started
+        server = serve(pipeline, port=0, submit_timeout=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/readings"
+        try:
+            reading = json.dumps([{"probe": "p", "N": 1, "P": 1, "K": 1}] * 2)
+            assert _post(url, reading)[0] == 202
+            status, _ = _post(url, reading)
+            assert status == 503
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert pipeline.snapshot_stats()["rejected"] == 2
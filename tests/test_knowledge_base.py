@@ -0,0 +1,139 @@
+"""
+Unit Tests for the compiled agronomy knowledge base
+"""
+
+import json
+import os
+import sys
+import numpy as np
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src import agronomy
+from src.knowledge_base import DEFAULT_KB_PATH, KnowledgeBase, load_knowledge_base
+
+
+def _document():
+    with open(DEFAULT_KB_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ─── Test Loading ─────────────────────────────────────────────────────────────
+
+class TestLoading:
+    """Tests for compiling the versioned data file."""
+
+    def test_crop_ids_match_label_encoder(self):
+        """Crop ids follow the committed model's label encoder order."""
+        import joblib
+        model_data = joblib.load("models/npk_crop_model.pkl")
+        kb = load_knowledge_base()
+        kb.check_classes(model_data["label_encoder"].classes_)
+        assert kb.crops == tuple(model_data["label_encoder"].classes_)
+
+    def test_mismatched_classes_rejected(self):
+        """A model trained on different crops fails the alignment check."""
+        with pytest.raises(ValueError, match="do not match"):
+            load_knowledge_base().check_classes(["Rice", "Wheat"])
+
+    def test_unsupported_version_rejected(self):
+        """Data files with another schema version are refused."""
+        doc = _document()
+        doc["version"] = 99
+        with pytest.raises(ValueError, match="version"):
+            KnowledgeBase(doc)
+
+    def test_unknown_season_crop_rejected(self):
+        """Seasons may only list catalogued crops."""
+        doc = _document()
+        doc["seasons"][0]["crops"].append("Quinoa")
+        with pytest.raises(ValueError, match="Quinoa"):
+            KnowledgeBase(doc)
+
+    def test_read_only(self):
+        """Compiled tables cannot be reassigned or written through."""
+        kb = load_knowledge_base()
+        with pytest.raises(AttributeError):
+            kb.crops = ()
+        with pytest.raises(ValueError):
+            kb.req_mid[0, 0] = 0
+
+
+# ─── Test Compiled Tables ─────────────────────────────────────────────────────
+
+class TestTables:
+    """Tests for the precomputed arrays and the legacy dict views."""
+
+    def test_precomputed_ranges(self):
+        """Midpoints, tolerances and families are derived per crop id."""
+        kb = agronomy.KB
+        rice = kb.crop_id("Rice")
+        assert kb.req_low[rice].tolist() == [80, 40, 40]
+        assert kb.req_mid[rice].tolist() == [100, 50, 50]
+        assert kb.tolerance[rice].tolist() == [12, 10, 10]
+        assert kb.families[kb.family_id[rice]] == "cereal"
+        assert kb.season_mask[kb.seasons.index("Kharif"), rice]
+
+    def test_rotation_rank_matrix(self):
+        """The rank matrix mirrors each family's ordered preference list."""
+        kb = agronomy.KB
+        for fam, preferred in agronomy.ROTATION_RULES.items():
+            row = kb.rotation_rank[kb.families.index(fam)]
+            assert [kb.families[i] for i in np.argsort(np.where(row < 0, 99, row))[:len(preferred)]] == preferred
+
+    def test_legacy_tables_keep_file_order(self):
+        """Display dicts keep the data file's crop order, not the id order."""
+        assert list(agronomy.CROP_NUTRIENT_IMPACT)[:3] == ["Rice", "Wheat", "Corn"]
+        assert agronomy.CROP_REQUIREMENTS["Tomato"]["K"] == (150, 200)
+        assert agronomy.SOIL_NPK_BENCHMARKS["N"]["optimal_range"] == (108, 215)
+
+    def test_vectorized_fit_matches_scalar(self):
+        """Array scoring returns exactly the per-crop scalar scores."""
+        rng = np.random.default_rng(0)
+        for n, p, k in rng.uniform(-10, 400, size=(200, 3)).tolist():
+            expected = [(c, agronomy.crop_suitability(n, p, k, c)) for c in agronomy.CROP_REQUIREMENTS]
+            expected.sort(key=lambda x: x[1], reverse=True)
+            assert agronomy.rank_crop_suitability(n, p, k) == expected
+
+    def test_band_boundaries(self):
+        """ICAR bands are half-open; values outside all bands fall back to the last."""
+        assert agronomy.get_nutrient_status(49.9, "N")[0] == "Very Low"
+        assert agronomy.get_nutrient_status(50, "N")[0] == "Low"
+        assert agronomy.get_nutrient_status(999, "N")[0] == "Very High"
+        assert agronomy.get_nutrient_status(-1, "K")[0] == "Very High"
+
+
+# ─── Test Catalogue Queries ───────────────────────────────────────────────────
+
+class TestCatalogueQueries:
+    """Tests for top-k selection and the family / season indexes."""
+
+    def test_top_k_matches_full_sort(self):
+        """Truncated rankings are exact prefixes of the full ranking."""
+        rng = np.random.default_rng(1)
+        for n, p, k in rng.uniform(0, 300, size=(100, 3)).tolist():
+            full = agronomy.rank_crop_suitability(n, p, k)
+            for top in (1, 3, 5):
+                assert agronomy.rank_crop_suitability(n, p, k, top=top) == full[:top]
+        for crop in agronomy.CROP_NUTRIENT_IMPACT:
+            assert agronomy.suggest_rotation(crop, top=3) == agronomy.suggest_rotation(crop)[:3]
+
+    def test_indexes_filter_candidates(self):
+        """Season and family filters only return crops from that group."""
+        kb = agronomy.KB
+        ranked = agronomy.rank_crop_suitability(100, 50, 50, season="Rabi")
+        assert sorted(c for c, _ in ranked) == sorted(agronomy.CROP_SEASONS["Rabi"]["crops"])
+        cereals = {kb.crops[i] for i in kb.crops_in(family="cereal")}
+        assert cereals == {"Rice", "Wheat", "Corn", "Barley"}
+        assert [kb.crops[i] for i in kb.crops_in(season="Zaid", family="allium")] == ["Onion"]
+        assert all(s["crop"] in agronomy.CROP_SEASONS["Zaid"]["crops"]
+                   for s in agronomy.suggest_rotation("Rice", season="Zaid"))
+
+    def test_top_k_helper(self):
+        """top_k returns the k largest indices, largest first, ties in index order."""
+        values = np.array([3, 9, 1, 9, 5])
+        assert agronomy.top_k(values, 3).tolist() == [1, 3, 4]
+        assert agronomy.top_k(values, None).tolist() == [1, 3, 4, 0, 2]
+        assert agronomy.top_k(values, 0).tolist() == []
@@ -0,0 +1,165 @@
+"""
+Unit Tests for the multi-tenant model cache
+"""
+
+import os
+import sys
+import threading
+import numpy as np
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src import model_cache
+from src.inference import predict_codes
+from src.model_cache import ModelCache, bundle_nbytes, list_tenants, serving_view
+from src.model_registry import ModelRegistry
+
+
+@pytest.fixture(scope="module")
+def model_data():
+    import joblib
+    return joblib.load("models/npk_crop_model.pkl")
+
+
+@pytest.fixture(scope="module")
+def tenant_root(tmp_path_factory, model_data):
+    """Three bundle-file tenants plus one registry tenant."""
+    import joblib
+    root = tmp_path_factory.mktemp("tenants")
+    bundle = {k: v for k, v in model_data.items() if k != "compiled"}
+    for i, name in enumerate(("north", "south", "east")):
+        joblib.dump({**bundle, "accuracy": 0.9 + i / 100}, root / f"{name}.pkl")
+    registry = ModelRegistry(str(root / "coop"))
+    registry.register(str(root / "north.pkl"), None, activate=True)
+    registry.register(str(root / "south.pkl"), None)
+    return str(root)
+
+
+# ─── Test Serving Views ───────────────────────────────────────────────────────
+
+class TestServingView:
+    """Tests for the reduced bundles the cache holds."""
+
+    def test_predicts_like_full_bundle(self, model_data):
+        """Dropping the estimator and scaler does not change predictions."""
+        view = serving_view(dict(model_data))
+        assert "model" not in view and "scaler" not in view
+        X = np.random.default_rng(0).uniform(0, 300, size=(2000, 3))
+        assert (predict_codes(X, view) == predict_codes(X, model_data)).all()
+
+    def test_resident_size_dominated_by_compiled_forest(self, model_data):
+        """The size estimate counts the compiled arrays and lookup tables."""
+        view = serving_view(dict(model_data))
+        assert view["compiled"].nbytes < bundle_nbytes(view) < view["compiled"].nbytes + (1 << 20)
+
+
+# ─── Test Cache ───────────────────────────────────────────────────────────────
+
+class TestModelCache:
+    """Tests for lazy loading, eviction and single-flight loads."""
+
+    def test_lists_tenants(self, tenant_root):
+        """Bundle files and registry directories are both tenants."""
+        assert list_tenants(tenant_root) == ["coop", "east", "north", "south"]
+
+    def test_lazy_load_and_hit(self, tenant_root):
+        """Bundles load on first request and are then served from memory."""
+        cache = ModelCache(tenant_root)
+        assert "north" not in cache
+        first = cache.get("north")
+        assert cache.get("north") is first and first["accuracy"] == 0.9
+        assert cache.stats()[0]["hits"] == 1
+
+    def test_lru_eviction_under_cap(self, tenant_root):
+        """Past the memory cap the least recently used tenant is evicted."""
+        probe = ModelCache(tenant_root)
+        probe.get("north")
+        size = probe.resident_bytes
+        cache = ModelCache(tenant_root, max_bytes=int(size * 2.5))
+        cache.get("north")
+        cache.get("south")
+        cache.get("north")  # south is now least recently used
+        cache.get("east")
+        assert [row["tenant"] for row in cache.stats()] == ["north", "east"]
+        assert cache.evictions == 1 and cache.resident_bytes <= cache.max_bytes
+
+    def test_compact_tenants(self, tenant_root):
+        """Compact mode serves narrower forests with the same crops, so more tenants fit."""
+        full, compact = ModelCache(tenant_root), ModelCache(tenant_root, compact="uint8")
+        view = compact.get("north")
+        assert view["compiled"].leaf_proba.dtype == np.uint8
+        assert compact.resident_bytes < 0.85 * full.get("north")["compiled"].nbytes
+        X = np.round(np.random.default_rng(1).uniform(0, 300, size=(2000, 3)), 2)
+        assert (predict_codes(X, view) == predict_codes(X, full.get("north"))).all()
+
+    def test_newest_bundle_kept_over_cap(self, tenant_root):
+        """A cap smaller than one bundle still serves the latest tenant."""
+        cache = ModelCache(tenant_root, max_bytes=1)
+        cache.get("north")
+        assert cache.get("south")["accuracy"] == 0.91
+        assert len(cache) == 1 and "south" in cache
+
+    def test_single_flight(self, tenant_root, monkeypatch):
+        """Concurrent first requests for a tenant share one load."""
+        import joblib
+        calls = []
+        real_load = joblib.load
+
+        def slow_load(path):
+            calls.append(path)
+            threading.Event().wait(0.2)
+            return real_load(path)
+
+        monkeypatch.setattr(joblib, "load", slow_load)
+        cache = ModelCache(tenant_root)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("east"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+        assert len(results) == 8 and all(r is results[0] for r in results)
+
+    def test_unknown_and_invalid_tenants(self, tenant_root):
+        """Missing tenants raise FileNotFoundError and path-like ids are refused; neither is cached."""
+        cache = ModelCache(tenant_root)
+        with pytest.raises(FileNotFoundError):
+            cache.get("west")
+        with pytest.raises(ValueError):
+            cache.get("../north")
+        assert len(cache) == 0
+
+    def test_registry_tenant_follows_active(self, tenant_root):
+        """A registry tenant reloads once its ACTIVE pointer moves."""
+        cache = ModelCache(tenant_root, check_interval=0)
+        assert cache.get("coop")["accuracy"] == 0.9
+        registry = ModelRegistry(os.path.join(tenant_root, "coop"))
+        registry.activate("v0002")
+        try:
+            assert cache.get("coop")["accuracy"] == 0.91
+            assert cache.stats()[-1]["version"] == "v0002"
+        finally:
+            registry.activate("v0001")
+
+    def test_failed_validation_not_cached(self, tenant_root):
+        """A refused bundle raises for the caller and is retried on the next request."""
+        refuse = [True]
+
+        def validate(md):
+            if refuse[0]:
+                raise ValueError("class mismatch")
+
+        cache = ModelCache(tenant_root, validate=validate)
+        with pytest.raises(ValueError, match="class mismatch"):
+            cache.get("north")
+        refuse[0] = False
+        assert cache.get("north")["accuracy"] == 0.9
+
+    def test_cli_reports_residency(self, tenant_root, capsys, monkeypatch):
+        """The warm-up command loads every tenant within the cap."""
+        monkeypatch.setattr(sys, "argv", ["model_cache", "--root", tenant_root, "--max-mb", "1024"])
+        model_cache.main()
+        assert "4/4 tenants resident" in capsys.readouterr().out
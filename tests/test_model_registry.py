@@ -0,0 +1,140 @@
+"""
+Unit Tests for the model registry, hot-swap and shadow scoring
+"""
+
+import json
+import os
+import sys
+import numpy as np
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.model_registry import LiveModel, ModelRegistry
+
+
+@pytest.fixture(scope="module")
+def bundles(tmp_path_factory):
+    """Two bundle files with the same model but different content (accuracy field)."""
+    import joblib
+    model_data = joblib.load("models/npk_crop_model.pkl")
+    model_data.pop("compiled", None)
+    root = tmp_path_factory.mktemp("bundles")
+    paths = []
+    for i, accuracy in enumerate((0.91, 0.93)):
+        path = root / f"bundle{i}.pkl"
+        joblib.dump({**model_data, "accuracy": accuracy}, path)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def registry(tmp_path, bundles):
+    metrics = tmp_path / "metrics.json"
+    metrics.write_text(json.dumps({"accuracy": 0.93, "f1_weighted": 0.92}))
+    reg = ModelRegistry(str(tmp_path / "registry"))
+    reg.register(bundles[0], str(metrics), activate=True)
+    reg.register(bundles[1], str(metrics))
+    return reg
+
+
+# ─── Test Registry ────────────────────────────────────────────────────────────
+
+class TestRegistry:
+    """Tests for versioned bundles and their metadata."""
+
+    def test_versions_and_metadata(self, registry, bundles):
+        """Each distinct bundle gets a version with hash, size, metrics and latency."""
+        assert registry.versions() == ["v0001", "v0002"]
+        assert registry.active() == "v0001"
+        meta = registry.meta("v0002")
+        assert meta["size_bytes"] == os.path.getsize(bundles[1])
+        assert len(meta["sha256"]) == 64
+        assert meta["metrics"]["f1_weighted"] == 0.92
+        assert meta["accuracy"] == 0.93
+        assert meta["latency"]["single_p50_ms"] > 0 and meta["latency"]["batch_rows_per_s"] > 0
+
+    def test_identical_bundle_registered_once(self, registry, bundles):
+        """Re-registering the same content returns the existing version."""
+        assert registry.register(bundles[1], None) == "v0002"
+        assert registry.versions() == ["v0001", "v0002"]
+
+    def test_unknown_version_rejected(self, registry):
+        """Pointers can only name registered versions."""
+        with pytest.raises(ValueError, match="Unknown model version"):
+            registry.activate("v0099")
+        assert registry.active() == "v0001"
+
+
+# ─── Test Live Serving ────────────────────────────────────────────────────────
+
+class TestLiveModel:
+    """Tests for in-process hot-swap and shadow scoring."""
+
+    def test_hot_swap(self, registry):
+        """Activating another version switches the served bundle on the next check."""
+        live = LiveModel(registry, check_interval=0)
+        first = live.get()
+        assert live.version == "v0001" and first["accuracy"] == 0.91
+        registry.activate("v0002")
+        assert live.get()["accuracy"] == 0.93 and live.version == "v0002"
+        assert first["accuracy"] == 0.91  # requests holding the old bundle are unaffected
+
+    def test_broken_version_keeps_serving(self, registry, capsys):
+        """A bundle failing its hash check or validation leaves the current one in service."""
+        attempts = []
+
+        def validate(md):
+            attempts.append(md["accuracy"])
+            if md["accuracy"] >= 0.92:
+                raise ValueError("accuracy out of range")
+
+        live = LiveModel(registry, check_interval=0, validate=validate)
+        assert live.get()["accuracy"] == 0.91
+        registry.activate("v0002")
+        for _ in range(5):
+            assert live.get()["accuracy"] == 0.91 and live.version == "v0001"
+        assert attempts == [0.91, 0.93]  # the refused version is loaded once, not on every check
+        assert capsys.readouterr().err.count("v0002 refused") == 1
+        registry.activate("v0001")
+        live.get()
+        registry.activate("v0002")
+        live.get()
+        assert attempts == [0.91, 0.93, 0.93]  # a new switch to it tries again
+        with open(registry.bundle_path("v0001"), "ab") as f:
+            f.write(b"tampered")
+        with pytest.raises(ValueError, match="sha256"):
+            registry.load("v0001")
+
+    def test_broken_shadow_keeps_serving(self, registry, capsys):
+        """A tampered shadow candidate is dropped; the active bundle keeps serving."""
+        with open(registry.bundle_path("v0002"), "ab") as f:
+            f.write(b"tampered")
+        registry.set_shadow("v0002")
+        live = LiveModel(registry, check_interval=0, shadow_sample_rate=1.0)
+        assert live.get()["accuracy"] == 0.91 and live.version == "v0001"
+        assert live.shadow is None
+        assert "v0002" in capsys.readouterr().err
+        assert live.get()["accuracy"] == 0.91  # not reloaded on every request
+        assert capsys.readouterr().err == ""
+        live.close()
+
+    def test_shadow_records_agreement(self, registry):
+        """Sampled requests are rescored by the candidate and compared."""
+        live = LiveModel(registry, check_interval=0, shadow_sample_rate=1.0)
+        registry.set_shadow("v0002")
+        model_data = live.get()
+        assert live.shadow is not None and live.shadow.version == "v0002"
+        from src.agronomy import predict_crops
+        X = np.random.default_rng(0).uniform(0, 300, size=(50, 3))
+        for row in X:
+            live.observe(row, predict_crops(row, model_data), 0.001)
+        live.shadow.join()
+        stats = live.shadow.stats()
+        assert stats["scored"] == 50 and stats["agreement"] == 1.0
+        assert "latency_delta_p95_ms" in stats
+        registry.set_shadow(None)
+        live.get()
+        assert live.shadow is None
+        live.close()
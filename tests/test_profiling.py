@@ -0,0 +1,59 @@
+"""
+Unit Tests for the on-demand sampling profiler
+"""
+
+import os
+import sys
+import time
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src import profiling
+
+
+def _busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+# ─── Test Sampling ────────────────────────────────────────────────────────────
+
+class TestSampling:
+    """Tests for stack sampling and collapsed output."""
+
+    def test_profile_writes_collapsed_stacks(self, tmp_path):
+        """An enabled block writes 'frame;frame count' lines naming the hot function."""
+        with profiling.profile("stage", enabled=True, directory=str(tmp_path)) as p:
+            _busy_wait(0.1)
+        assert p.path is not None and p.path.endswith("-stage.collapsed")
+        lines = open(p.path).read().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert any("_busy_wait (tests/test_profiling.py" in line for line in lines)
+
+    def test_disabled_profile_writes_nothing(self, tmp_path):
+        """A disabled block neither samples nor creates files."""
+        with profiling.profile("stage", enabled=False, directory=str(tmp_path)) as p:
+            _busy_wait(0.02)
+        assert p.path is None
+        assert os.listdir(tmp_path) == []
+
+
+# ─── Test Rotation ────────────────────────────────────────────────────────────
+
+class TestRotation:
+    """Tests for the profiles directory caps."""
+
+    def test_oldest_profiles_removed_first(self, tmp_path):
+        """Rotation keeps the newest files within the count and size caps."""
+        for i in range(5):
+            path = tmp_path / f"{i}.collapsed"
+            path.write_text("a;b 1\n" * 10)
+            os.utime(path, (1000 + i, 1000 + i))
+        profiling.rotate(str(tmp_path), max_bytes=10 ** 6, max_files=3)
+        assert sorted(os.listdir(tmp_path)) == ["2.collapsed", "3.collapsed", "4.collapsed"]
+        profiling.rotate(str(tmp_path), max_bytes=100, max_files=10)
+        assert os.listdir(tmp_path) == ["4.collapsed"]
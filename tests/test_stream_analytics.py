@@ -0,0 +1,77 @@
+"""
+Unit Tests for streaming soil analytics and change detection
+"""
+
+import os
+import sys
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.agronomy import compute_soil_health
+from src.stream_analytics import StreamAnalyzer
+
+
+def _feed(analyzer, n, p, k, crop=None, field="A"):
+    return analyzer.update("u", field, n, p, k, compute_soil_health(n, p, k), crop)
+
+
+# ─── Test Running State ───────────────────────────────────────────────────────
+
+class TestRunningState:
+    """Tests for EWMA state and health trend."""
+
+    def test_ewma_converges(self):
+        """The smoothed value moves geometrically towards a new level."""
+        a = StreamAnalyzer(alpha=0.5)
+        _feed(a, 100, 20, 90)
+        _feed(a, 200, 20, 90)
+        assert a.state("u", "A")["ewma"]["N"] == pytest.approx(150.0)
+        assert a.state("u", "A")["count"] == 2
+
+    def test_health_trend_sign(self):
+        """A degrading soil produces a negative health trend."""
+        a = StreamAnalyzer(alpha=0.3)
+        for n in range(160, 20, -10):
+            _feed(a, n, 18, 90)
+        assert a.state("u", "A")["health_trend"] < 0
+
+    def test_fields_are_independent(self):
+        """State is tracked separately per field."""
+        a = StreamAnalyzer()
+        _feed(a, 100, 20, 90, field="A")
+        assert a.state("u", "B") is None
+
+
+# ─── Test Change Events ───────────────────────────────────────────────────────
+
+class TestChangeEvents:
+    """Tests for threshold-crossing events."""
+
+    def test_no_events_while_steady(self):
+        """Steady readings emit nothing after the baseline."""
+        a = StreamAnalyzer()
+        events = [e for _ in range(20) for e in _feed(a, 160, 18, 90, crop="Rice")]
+        assert events == []
+
+    def test_band_change_emitted_once(self):
+        """Crossing into a new ICAR band emits exactly one band_change."""
+        a = StreamAnalyzer(alpha=1.0)
+        _feed(a, 160, 18, 90)
+        events = _feed(a, 30, 18, 90) + _feed(a, 30, 18, 90)
+        bands = [e for e in events if e["type"] == "band_change"]
+        assert len(bands) == 1
+        assert (bands[0]["nutrient"], bands[0]["previous"], bands[0]["current"]) == ("N", "Medium", "Very Low")
+
+    def test_crop_change_needs_stability(self):
+        """A new top crop is only reported after it holds for the window."""
+        received = []
+        a = StreamAnalyzer(crop_stability=3, on_event=received.append)
+        for crop in ["Rice", "Rice", "Wheat", "Rice", "Wheat", "Wheat"]:
+            _feed(a, 160, 18, 90, crop=crop)
+        assert not any(e["type"] == "crop_change" for e in received)
+        _feed(a, 160, 18, 90, crop="Wheat")
+        changes = [e for e in received if e["type"] == "crop_change"]
+        assert len(changes) == 1 and changes[0]["current"] == "Wheat"
+        assert a.state("u", "A")["crop"] == "Wheat"
@@ -0,0 +1,97 @@
+"""
+Unit Tests for latency instrumentation and Prometheus export
+"""
+
+import os
+import sys
+import urllib.request
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src import telemetry
+from src.telemetry import Registry, render_prometheus, snapshot
+
+
+# ─── Test Recording ───────────────────────────────────────────────────────────
+
+class TestRecording:
+    """Tests for the decorator, context manager and counters."""
+
+    def test_timed_preserves_result_and_records(self):
+        """Decorated functions return normally and add one sample per call."""
+        @telemetry.timed("test_timed_seconds", fn="double")
+        def double(x):
+            return 2 * x
+
+        assert double(4) == 8
+        assert double.__name__ == "double"
+        h = telemetry.REGISTRY.histogram("test_timed_seconds", (("fn", "double"),))
+        assert h.count == 1
+
+    def test_exceptions_are_still_timed(self):
+        """A raising call is recorded and the exception propagates."""
+        @telemetry.timed("test_raise_seconds")
+        def boom():
+            raise ValueError("x")
+
+        with pytest.raises(ValueError):
+            boom()
+        assert telemetry.REGISTRY.histogram("test_raise_seconds", ()).count == 1
+
+    def test_reset_keeps_decorated_series_live(self):
+        """After a reset, decorated functions keep reporting into the registry."""
+        @telemetry.timed("test_reset_seconds")
+        def noop():
+            pass
+
+        noop()
+        telemetry.REGISTRY.reset()
+        noop()
+        assert telemetry.REGISTRY.histogram("test_reset_seconds", ()).count == 1
+
+    def test_window_percentiles(self):
+        """Snapshot percentiles are computed over the recent window in ms."""
+        reg = Registry()
+        h = reg.histogram("lat_seconds", ())
+        for v in range(1, 101):
+            h.observe(v / 1000)
+        row = snapshot(reg)[0]
+        assert row["count"] == 100
+        assert row["p50_ms"] == pytest.approx(50.5)
+        assert row["max_ms"] == pytest.approx(100)
+
+
+# ─── Test Export ──────────────────────────────────────────────────────────────
+
+class TestExport:
+    """Tests for the Prometheus text format and HTTP endpoint."""
+
+    def test_buckets_are_cumulative(self):
+        """Bucket counts accumulate and +Inf equals the sample count."""
+        reg = Registry()
+        h = reg.histogram("lat_seconds", (("page", "About"),))
+        for v in (0.0002, 0.003, 0.003, 120.0):
+            h.observe(v)
+        reg.inc("hits", (), 3)
+        text = render_prometheus(reg)
+        assert "# TYPE lat_seconds histogram" in text
+        assert 'lat_seconds_bucket{page="About",le="0.0005"} 1' in text
+        assert 'lat_seconds_bucket{page="About",le="0.005"} 3' in text
+        assert 'lat_seconds_bucket{page="About",le="+Inf"} 4' in text
+        assert 'lat_seconds_count{page="About"} 4' in text
+        assert "hits_total 3" in text
+
+    def test_metrics_endpoint(self):
+        """serve() exposes the global registry at /metrics."""
+        telemetry.observe("test_endpoint_seconds", 0.01)
+        server = telemetry.serve("127.0.0.1", 0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as resp:
+                body = resp.read().decode()
+                assert resp.headers["Content-Type"].startswith("text/plain")
+        finally:
+            server.shutdown()
+        assert "test_endpoint_seconds_count 1" in body
@@ -0,0 +1,78 @@
+"""
+Unit Tests for NPK time-series downsampling and rolling aggregates
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.history_store import HistoryStore
+from src.timeseries import lttb_indices, downsample, RollingWindow, FieldSeries
+
+
+# ─── Test Downsampling ────────────────────────────────────────────────────────
+
+class TestDownsampling:
+    """Tests for LTTB downsampling."""
+
+    def test_output_size_is_bounded(self):
+        """Long series are reduced to exactly the threshold, keeping endpoints."""
+        x = np.arange(100000)
+        y = np.sin(x / 500.0)
+        idx = lttb_indices(x, y, 500)
+        assert len(idx) == 500
+        assert idx[0] == 0 and idx[-1] == len(x) - 1
+        assert np.all(np.diff(idx) > 0)
+
+    def test_short_series_unchanged(self):
+        """Series shorter than the threshold are returned as-is."""
+        x, y = downsample(np.arange(10), np.arange(10) * 2.0, 50)
+        assert list(x) == list(range(10))
+
+    def test_keeps_spikes(self):
+        """An isolated spike survives downsampling."""
+        y = np.zeros(10000)
+        y[4321] = 100.0
+        _, ds_y = downsample(np.arange(10000), y, 100)
+        assert ds_y.max() == 100.0
+
+
+# ─── Test Rolling Aggregates ──────────────────────────────────────────────────
+
+class TestRollingAggregates:
+    """Tests for incremental rolling mean/min/max."""
+
+    def test_matches_bruteforce(self):
+        """Incremental stats match a brute-force window at every step."""
+        rng = np.random.default_rng(0)
+        values = rng.uniform(0, 200, 500)
+        rw = RollingWindow(7)
+        for i, v in enumerate(values):
+            mean, lo, hi = rw.push(v)
+            window = values[max(0, i - 6):i + 1]
+            assert mean == pytest.approx(window.mean())
+            assert lo == window.min() and hi == window.max()
+
+    def test_field_series_syncs_incrementally(self, tmp_path):
+        """FieldSeries pulls only new readings and rebuilds after a clear."""
+        store = HistoryStore(str(tmp_path / "history.db"))
+        rows = [{"user_id": "u", "field_id": "A", "ts": t, "N": t, "P": 1, "K": 2} for t in range(30)]
+        store.add_readings(rows[:20])
+
+        series = FieldSeries(window=5)
+        series.sync(store, "u", "A")
+        assert len(series) == 20
+
+        store.add_readings(rows[20:])
+        series.sync(store, "u", "A")
+        assert len(series) == 30
+        assert series.latest_rolling()["N"]["mean"] == pytest.approx(27.0)
+
+        store.clear("u", "A")
+        store.add_readings(rows[:3])
+        series.sync(store, "u", "A")
+        assert len(series) == 3
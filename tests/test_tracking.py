@@ -0,0 +1,158 @@
+"""
+Unit Tests for background MLflow tracking
+"""
+
+import os
+import sys
+import threading
+import pytest
+
+# Ensure project root is in path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.tracking import JournalBackend, Tracker, import_journal
+
+MLFLOW_CONFIG = {"tracking_uri": "mlruns", "experiment_name": "npk-test"}
+
+
+class RecordingBackend:
+    """Records calls; `start` blocks until released so calls pile up in the queue."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def start(self, tracking_uri, experiment_name, run_name, start_ms):
+        self.release.wait(5)
+        self.calls.append(("start", run_name))
+        return f"id-{run_name}"
+
+    def log_batch(self, tracking_uri, run_id, params, metrics, tags):
+        self.calls.append(("batch", run_id, params, metrics, tags))
+
+    def log_artifact(self, tracking_uri, run_id, path, artifact_path):
+        with open(path) as f:
+            self.calls.append(("artifact", run_id, f.read(), artifact_path))
+
+    def log_model(self, tracking_uri, run_id, model, name):
+        raise RuntimeError("model store unavailable")
+
+    def end(self, tracking_uri, run_id, status, end_ms):
+        self.calls.append(("end", run_id, status))
+
+
+@pytest.fixture
+def backend():
+    return RecordingBackend()
+
+
+# ─── Test Background Tracking ─────────────────────────────────────────────────
+
+class TestTracker:
+    """Tests for queuing, batching and error handling."""
+
+    def test_calls_are_coalesced_into_batches(self, backend):
+        """Params, metrics and tags queued while the backend is busy become one log_batch."""
+        tracker = Tracker(mode="async", backend=backend)
+        with tracker.start_run("rf", MLFLOW_CONFIG) as run:
+            run.log_params({"n_estimators": 100})
+            for step in range(20):
+                run.log_metrics({"accuracy": step / 20}, step=step)
+            run.set_tags({"stage": "train"})
+        backend.release.set()
+        tracker.flush()
+        assert [c[0] for c in backend.calls] == ["start", "batch", "end"]
+        _, run_id, params, metrics, tags = backend.calls[1]
+        assert run_id == "id-rf" and params == {"n_estimators": "100"} and tags == {"stage": "train"}
+        assert [(m[0], m[1], m[3]) for m in metrics] == [("accuracy", s / 20, s) for s in range(20)]
+        assert backend.calls[2] == ("end", "id-rf", "FINISHED")
+        assert run.run_id == "id-rf"
+
+    def test_artifact_snapshot_taken_at_log_time(self, backend, tmp_path):
+        """A file rewritten after log_artifact is logged with its earlier contents."""
+        path = tmp_path / "metrics.json"
+        path.write_text("first")
+        tracker = Tracker(mode="async", backend=backend)
+        with tracker.start_run("rf", MLFLOW_CONFIG) as run:
+            run.log_artifact(str(path), "reports")
+            path.write_text("second")
+        backend.release.set()
+        tracker.flush()
+        assert ("artifact", "id-rf", "first", "reports") in backend.calls
+        assert os.listdir(tracker._staging) == []
+
+    def test_failures_reported_not_raised(self, backend, capsys):
+        """A failing call is reported on stderr; the rest of the run is still logged."""
+        backend.release.set()
+        tracker = Tracker(mode="async", backend=backend)
+        with tracker.start_run("rf", MLFLOW_CONFIG) as run:
+            run.log_model(object(), "random_forest_model")
+            run.log_metric("accuracy", 0.97)
+        tracker.flush()
+        assert "model store unavailable" in capsys.readouterr().err
+        assert [c[0] for c in backend.calls] == ["start", "batch", "end"]
+        assert tracker.errors[0][:2] == ("rf", "model")
+
+    def test_sync_mode_raises(self, backend):
+        """In sync mode calls run inline and errors propagate, as direct MLflow calls would."""
+        backend.release.set()
+        tracker = Tracker(mode="sync", backend=backend)
+        run = tracker.start_run("rf", MLFLOW_CONFIG)
+        assert backend.calls == [("start", "rf")]
+        with pytest.raises(RuntimeError, match="unavailable"):
+            run.log_model(object(), "random_forest_model")
+
+    def test_off_mode_is_a_no_op(self, backend):
+        """With tracking off nothing reaches the backend and no thread starts."""
+        tracker = Tracker(mode="off", backend=backend)
+        with tracker.start_run("rf", MLFLOW_CONFIG) as run:
+            run.log_metric("accuracy", 0.97)
+        assert run.run_id is None and backend.calls == [] and tracker._thread is None
+
+    def test_unknown_mode_rejected(self):
+        with pytest.raises(ValueError, match="NPK_MLFLOW_MODE"):
+            Tracker(mode="eventually")
+
+
+# ─── Test Offline Journal ─────────────────────────────────────────────────────
+
+class TestJournal:
+    """Tests for offline journals and their import into MLflow."""
+
+    def test_import_replays_run(self, tmp_path, monkeypatch):
+        """A journaled run lands in MLflow with its params, metrics, artifacts and status."""
+        from mlflow.tracking import MlflowClient
+
+        monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+        (tmp_path / "report.txt").write_text("ok")
+        tracker = Tracker(mode="offline", journal_dir=str(tmp_path / "journal"))
+        with tracker.start_run("rf", MLFLOW_CONFIG) as run:
+            run.log_params({"max_depth": 10})
+            run.log_metrics({"accuracy": 0.5}, step=0)
+            run.log_metrics({"accuracy": 0.9}, step=1)
+            run.log_artifact(str(tmp_path / "report.txt"))
+        tracker.flush()
+        run_dir = tmp_path / "journal" / run.run_id
+        assert (run_dir / "journal.jsonl").exists()
+
+        uri = str(tmp_path / "mlruns")
+        run_id = import_journal(str(run_dir), tracking_uri=uri)
+        client = MlflowClient(tracking_uri=uri)
+        imported = client.get_run(run_id)
+        assert imported.data.params == {"max_depth": "10"}
+        assert [m.value for m in client.get_metric_history(run_id, "accuracy")] == [0.5, 0.9]
+        assert imported.info.status == "FINISHED" and imported.info.run_name == "rf"
+        assert [a.path for a in client.list_artifacts(run_id)] == ["report.txt"]
+        assert import_journal(str(run_dir), tracking_uri=uri) == run_id  # already imported
+        assert len(client.search_runs([imported.info.experiment_id])) == 1
+
+    def test_journal_backend_copies_artifacts(self, tmp_path):
+        """Journal artifacts are copies, independent of the original file."""
+        src = tmp_path / "a.txt"
+        src.write_text("v1")
+        backend = JournalBackend(str(tmp_path / "journal"))
+        run_id = backend.start("mlruns", "npk-test", "rf", 0)
+        backend.log_artifact("mlruns", run_id, str(src), None)
+        src.write_text("v2")
+        (copy,) = (tmp_path / "journal" / run_id / "artifacts").glob("*/a.txt")
+        assert copy.read_text() == "v1"